@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+AI pipeline benchmark: /api/ai/execute and /api/ai/chat against the fake LLM provider
+
+Starts benchmarks/fake_llm_server.py (or uses --provider-url), points the
+server's OpenAI-compatible client at it via LLM_BASE_URL, and drives the app
+in-process with a fixed concurrency. Uses a dedicated benchmark database.
+Reports throughput, latency percentiles, and the server's own pool/breaker
+and fast-path counters, so the numbers cover the real provider client path
+rather than the demo-key mock.
+
+Usage:
+    python benchmarks/ai_pipeline.py [--endpoint execute|chat|stream]
+        [--requests 500] [--concurrency 32] [--profile typical] [--no-fast-path]
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+# server imports backend.services.* lazily, which needs the repository root too
+sys.path.insert(0, str(BENCH_DIR.parent.parent))
+
+BENCH_DB_NAME = os.environ.get('BENCH_DB_NAME', 'operai_bench')
+BENCH_USERS = 20
+# Mix of phrasings the intent fast path resolves and ones that need the provider
+MESSAGES = [
+    "show my tasks",
+    "kal ka leave laga do",
+    "how is everything looking overall",
+    "what did my lead assign me this sprint and what is blocked",
+    "aaj WFH mark karo",
+    "summarize my notifications",
+    "which of my tasks should I pick up first given the deadlines",
+]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def wait_for_provider(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get(f"{url}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Fake provider at {url} did not come up")
+
+
+async def create_users(client: httpx.AsyncClient):
+    tokens = []
+    for i in range(BENCH_USERS):
+        user = {"email": f"ai{i}@bench.local", "name": f"AI Bench {i}", "password": "bench123", "role": "employee"}
+        await client.post("/api/auth/register", json=user)
+        response = await client.post("/api/auth/login", json={"email": user["email"], "password": user["password"]})
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+
+async def run_load(client, tokens, endpoint: str, total: int, concurrency: int):
+    path = "/api/ai/chat" if endpoint in ("chat", "stream") else "/api/ai/execute"
+    accept = "text/event-stream" if endpoint == "stream" else "application/json"
+    jobs = iter(enumerate(itertools.islice(itertools.cycle(MESSAGES), total)))
+    samples, failures = [], 0
+
+    async def worker():
+        nonlocal failures
+        for index, message in jobs:
+            headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}", "Accept": accept}
+            body = {"message": message, "session_id": f"bench-{index % len(tokens)}"}
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=body, headers=headers)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                failures += 1
+                continue
+            samples.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, failures, time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=["execute", "chat", "stream"], default="execute")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--profile", default="typical", help="fake provider profile (fast, typical, brownout)")
+    parser.add_argument("--provider-url", help="use an already running fake provider instead of starting one")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--no-fast-path", action="store_true", help="send every execute request to the provider")
+    args = parser.parse_args()
+
+    provider = None
+    provider_url = args.provider_url
+    if not provider_url:
+        provider_url = f"http://127.0.0.1:{args.port}"
+        provider = subprocess.Popen([
+            sys.executable, str(BENCH_DIR / "fake_llm_server.py"), "--port", str(args.port), "--profile", args.profile
+        ])
+
+    try:
+        await wait_for_provider(provider_url)
+
+        import server
+
+        # .env may carry a real Gemini key; the benchmark always goes through the fake OpenAI route
+        os.environ.pop('GOOGLE_API_KEY', None)
+        os.environ['OPENAI_API_KEY'] = 'sk-fake-bench'
+        server.LLM_BASE_URL = f"{provider_url}/v1"
+        server.db = server.client[BENCH_DB_NAME]
+        await server.client.drop_database(BENCH_DB_NAME)
+        await server.ensure_indexes()
+        server.ai_message_writer.start()
+        if args.no_fast_path:
+            server.intent_fast_path.enabled = False
+            server.plan_cache.get = lambda message, role: None
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            tokens = await create_users(client)
+            print(f"{args.endpoint}: {args.requests} requests, concurrency {args.concurrency}, provider profile {args.profile}")
+            samples, failures, elapsed = await run_load(client, tokens, args.endpoint, args.requests, args.concurrency)
+
+        await server.ai_message_writer.stop()
+        samples.sort()
+        if samples:
+            print(f"\n{'throughput':<14}{len(samples) / elapsed:>10.1f} req/s")
+            print(f"{'mean ms':<14}{statistics.mean(samples):>10.1f}")
+            for label, fraction in [("p50 ms", 0.5), ("p95 ms", 0.95), ("p99 ms", 0.99)]:
+                print(f"{label:<14}{percentile(samples, fraction):>10.1f}")
+        print(f"{'failures':<14}{failures:>10}")
+
+        for pool in server.llm_registry.stats():
+            print(f"\nprovider pool {pool['provider']}/{pool['model']}: timeouts={pool['timeouts']} retries={pool['retries']} "
+                  f"hedges={pool['hedges']} breaker={pool['breaker']['state']} peak_in_flight={pool['peak_in_flight']}")
+        fast_path = server.intent_fast_path.stats()
+        print(f"intent fast path: hit_rate={fast_path['hit_rate']} llm_fallbacks={fast_path['llm_fallbacks']}")
+        async with httpx.AsyncClient() as http:
+            print(f"fake provider: {(await http.get(f'{provider_url}/stats')).json()}")
+
+        await server.client.drop_database(BENCH_DB_NAME)
+    finally:
+        if provider:
+            provider.terminate()
+            provider.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
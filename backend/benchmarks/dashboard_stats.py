@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Dashboard stats benchmark: sequential count_documents vs $facet/concurrent version
+
+Seeds a dedicated benchmark database (default 100k tasks) and times
+GET /api/dashboard/stats logic for each role with both implementations.
+
+Usage:
+    python benchmarks/dashboard_stats.py [--tasks 100000] [--runs 50] [--keep]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+from server import (  # noqa: E402
+    AttendanceStatus, LeaveStatus, TaskStatus, UserRole, compute_dashboard_stats
+)
+
+BENCH_DB_NAME = os.environ.get('BENCH_DB_NAME', 'operai_bench')
+INSERT_BATCH = 5000
+
+
+async def legacy_dashboard_stats(database, user_id: str, role: str):
+    """The pre-$facet implementation: one sequential count per statistic"""
+    if role in [UserRole.ADMIN, UserRole.HR]:
+        total_employees = await database.users.count_documents({})
+        total_tasks = await database.tasks.count_documents({})
+        pending_leaves = await database.leaves.count_documents({"status": LeaveStatus.PENDING})
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        present_today = await database.attendance.count_documents({
+            "date": today,
+            "status": {"$in": [AttendanceStatus.PRESENT, AttendanceStatus.WFH]}
+        })
+        return {
+            "total_employees": total_employees,
+            "total_tasks": total_tasks,
+            "pending_leaves": pending_leaves,
+            "present_today": present_today
+        }
+    elif role == UserRole.TEAM_LEAD:
+        my_tasks = await database.tasks.count_documents({"assigned_to": user_id})
+        team_tasks = await database.tasks.count_documents({"created_by": user_id})
+        team_tasks_completed = await database.tasks.count_documents({"created_by": user_id, "status": TaskStatus.COMPLETED})
+        team_tasks_pending = await database.tasks.count_documents({"created_by": user_id, "status": TaskStatus.TODO})
+        return {
+            "my_tasks": my_tasks,
+            "team_tasks": team_tasks,
+            "team_tasks_completed": team_tasks_completed,
+            "team_tasks_pending": team_tasks_pending
+        }
+    else:
+        my_tasks = await database.tasks.count_documents({"assigned_to": user_id})
+        pending_tasks = await database.tasks.count_documents({
+            "assigned_to": user_id,
+            "status": {"$in": [TaskStatus.TODO, TaskStatus.IN_PROGRESS]}
+        })
+        completed_tasks = await database.tasks.count_documents({"assigned_to": user_id, "status": TaskStatus.COMPLETED})
+        my_leaves = await database.leaves.count_documents({"user_id": user_id})
+        return {
+            "my_tasks": my_tasks,
+            "pending_tasks": pending_tasks,
+            "completed_tasks": completed_tasks,
+            "my_leaves": my_leaves
+        }
+
+
+async def seed(database, task_count: int):
+    """Seed users, tasks, leaves and attendance; returns sample user ids per role"""
+    now = datetime.now(timezone.utc)
+    leads = [str(uuid.uuid4()) for _ in range(20)]
+    employees = [str(uuid.uuid4()) for _ in range(500)]
+    users = [{"id": uid, "email": f"lead{i}@bench.local", "name": f"Lead {i}", "role": UserRole.TEAM_LEAD}
+             for i, uid in enumerate(leads)]
+    users += [{"id": uid, "email": f"emp{i}@bench.local", "name": f"Employee {i}", "role": UserRole.EMPLOYEE}
+              for i, uid in enumerate(employees)]
+    await database.users.insert_many(users)
+
+    statuses = [TaskStatus.TODO, TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED, TaskStatus.BLOCKED]
+    for start in range(0, task_count, INSERT_BATCH):
+        batch = [{
+            "id": str(uuid.uuid4()),
+            "title": f"Task {start + i}",
+            "assigned_to": random.choice(employees),
+            "created_by": random.choice(leads),
+            "status": random.choice(statuses),
+            "priority": "medium",
+            "progress": random.randint(0, 100),
+            "created_at": now - timedelta(minutes=start + i),
+            "updated_at": now,
+        } for i in range(min(INSERT_BATCH, task_count - start))]
+        await database.tasks.insert_many(batch)
+
+    await database.leaves.insert_many([{
+        "id": str(uuid.uuid4()),
+        "user_id": random.choice(employees),
+        "leave_type": "casual",
+        "start_date": now.strftime('%Y-%m-%d'),
+        "end_date": now.strftime('%Y-%m-%d'),
+        "reason": "bench",
+        "status": random.choice([LeaveStatus.PENDING, LeaveStatus.APPROVED]),
+        "created_at": now,
+        "updated_at": now,
+    } for _ in range(5000)])
+
+    await database.attendance.insert_many([{
+        "id": str(uuid.uuid4()),
+        "user_id": uid,
+        "date": now.strftime('%Y-%m-%d'),
+        "status": random.choice([AttendanceStatus.PRESENT, AttendanceStatus.WFH]),
+        "work_mode": "wfo",
+        "created_at": now,
+    } for uid in employees])
+
+    return {UserRole.HR: "hr-bench", UserRole.TEAM_LEAD: leads[0], UserRole.EMPLOYEE: employees[0]}
+
+
+async def time_runs(func, database, user_id, role, runs):
+    await func(database, user_id, role)  # warm-up
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await func(database, user_id, role)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.mean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark database afterwards")
+    args = parser.parse_args()
+
+    database = server.db = server.client[BENCH_DB_NAME]
+    await server.client.drop_database(BENCH_DB_NAME)
+    print(f"Seeding {args.tasks} tasks into {BENCH_DB_NAME}...")
+    sample_users = await seed(database, args.tasks)
+    await server.ensure_indexes()
+
+    print(f"\n{'role':<12}{'impl':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for role, user_id in sample_users.items():
+        legacy = await legacy_dashboard_stats(database, user_id, role)
+        current = await compute_dashboard_stats(database, user_id, role)
+        assert legacy == current, f"{role}: {legacy} != {current}"
+        for label, func in [("legacy", legacy_dashboard_stats), ("facet", compute_dashboard_stats)]:
+            result = await time_runs(func, database, user_id, role, args.runs)
+            print(f"{role:<12}{label:<10}{result['mean']:>10.2f}{result['p50']:>10.2f}{result['p95']:>10.2f}")
+
+    if not args.keep:
+        await server.client.drop_database(BENCH_DB_NAME)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
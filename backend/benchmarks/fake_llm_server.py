@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Fake LLM provider for offline load tests of /api/ai/chat and /api/ai/execute
+
+Speaks enough of two wire protocols for the server's real client code paths:
+  - OpenAI-compatible: POST /v1/chat/completions (JSON or `stream: true` SSE)
+  - Gemini REST:       POST /v1beta/models/{model}:generateContent
+                       POST /v1beta/models/{model}:streamGenerateContent
+
+Replies are templated: when the system prompt is the /ai/execute planner
+prompt, the local intent matcher turns the user message into an action plan
+(falling back to an empty plan); otherwise a short chat reply is returned.
+--script replaces templating with replies cycled from a JSONL file
+(one {"content": "..."} per line).
+
+Latency, token pacing and injected failures come from a profile and can be
+overridden per flag. GET /stats reports what was served and injected.
+
+Point the backend at it with LLM_BASE_URL (see server.py, LLM PROVIDERS):
+    OPENAI_API_KEY=sk-fake LLM_BASE_URL=http://127.0.0.1:8081/v1 uvicorn server:app
+    GOOGLE_API_KEY=AIza-fake LLM_BASE_URL=http://127.0.0.1:8081 uvicorn server:app
+
+The Gemini SDK's REST transport does blocking HTTP even from its async
+methods, so use the OpenAI-compatible route for throughput numbers.
+
+Usage:
+    python benchmarks/fake_llm_server.py [--port 8081] [--profile typical]
+        [--latency lognormal:800,0.5] [--token-ms 15] [--error-rate 0.02]
+        [--error-status 503] [--stall-rate 0.01] [--script replies.jsonl]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from backend.services.intent_matcher import match_intent  # noqa: E402
+
+# latency: total time for a non-streamed reply (or time to first token when
+# streaming); token_ms: gap between streamed chunks
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {"latency": "fixed:50", "token_ms": 2, "error_rate": 0.0, "stall_rate": 0.0},
+    "typical": {"latency": "lognormal:800,0.5", "token_ms": 15, "error_rate": 0.01, "stall_rate": 0.0},
+    "brownout": {"latency": "lognormal:3000,1.0", "token_ms": 40, "error_rate": 0.2, "stall_rate": 0.05},
+}
+STALL_SECONDS = 300
+CHUNK_WORDS = 3
+# Marker that only the /ai/execute planner prompt contains
+EXECUTE_PROMPT_MARKER = '"actions"'
+
+
+def parse_latency(spec: str):
+    """fixed:MS | uniform:LO,HI | lognormal:MEDIAN,SIGMA -> callable returning seconds"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(0, sigma) * median / 1000
+    raise argparse.ArgumentTypeError(f"Unknown latency distribution: {spec}")
+
+
+class FakeProvider:
+    def __init__(self, latency: str, token_ms: float, error_rate: float, error_status: int,
+                 stall_rate: float, script: Optional[Path] = None):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency(latency)
+        self.token_seconds = token_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stall_rate = stall_rate
+        self._script: Optional[Iterator[str]] = None
+        if script:
+            replies = [json.loads(line)["content"] for line in script.read_text().splitlines() if line.strip()]
+            self._script = itertools.cycle(replies)
+        self.started = time.time()
+        self.requests = 0
+        self.streams = 0
+        self.errors = 0
+        self.stalls = 0
+        self.by_route: Dict[str, int] = {}
+
+    def reply_for(self, system_prompt: str, user_message: str) -> str:
+        if self._script is not None:
+            return next(self._script)
+        if EXECUTE_PROMPT_MARKER in system_prompt:
+            match = match_intent(user_message, min_confidence=0.0)
+            plan = match.plan if match else {"thought": "No matching action", "actions": []}
+            return json.dumps(plan)
+        return f"Sure - here is what I found about: {user_message[:80]}"
+
+    async def admit(self, route: str) -> Optional[JSONResponse]:
+        """Count the request and inject a stall or an error; None means serve normally"""
+        self.requests += 1
+        self.by_route[route] = self.by_route.get(route, 0) + 1
+        roll = random.random()
+        if roll < self.stall_rate:
+            # Hangs past any sane client deadline, like a provider brownout
+            self.stalls += 1
+            await asyncio.sleep(STALL_SECONDS)
+        elif roll < self.stall_rate + self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(self.sample_latency() / 4)
+            return JSONResponse(
+                {"error": {"message": "Injected provider failure", "type": "server_error", "code": self.error_status}},
+                status_code=self.error_status
+            )
+        return None
+
+    def chunks(self, text: str) -> List[str]:
+        words = text.split(" ")
+        return [" ".join(words[i:i + CHUNK_WORDS]) + (" " if i + CHUNK_WORDS < len(words) else "")
+                for i in range(0, len(words), CHUNK_WORDS)]
+
+    async def paced(self, text: str):
+        await asyncio.sleep(self.sample_latency())
+        for index, chunk in enumerate(self.chunks(text)):
+            if index:
+                await asyncio.sleep(self.token_seconds)
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency_spec,
+            "token_ms": self.token_seconds * 1000,
+            "error_rate": self.error_rate,
+            "stall_rate": self.stall_rate,
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "streams": self.streams,
+            "errors": self.errors,
+            "stalls": self.stalls,
+            "by_route": self.by_route,
+        }
+
+
+def usage(prompt: str, completion: str) -> Dict[str, int]:
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(completion) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def create_app(provider: FakeProvider) -> FastAPI:
+    app = FastAPI(title="Fake LLM provider")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        return provider.stats()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = await provider.admit("openai")
+        if failure:
+            return failure
+        messages = body.get("messages", [])
+        system_prompt = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        user_message = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        text = provider.reply_for(system_prompt, user_message)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "fake")
+
+        if body.get("stream"):
+            provider.streams += 1
+
+            async def events():
+                created = int(time.time())
+                async for chunk in provider.paced(text):
+                    data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                            "choices": [{"index": 0, "delta": {"role": "assistant", "content": chunk}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(data)}\n\n"
+                data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                yield f"data: {json.dumps(data)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(provider.sample_latency())
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage(system_prompt + user_message, text),
+        }
+
+    def gemini_candidate(text: str, finished: bool) -> Dict[str, Any]:
+        candidate: Dict[str, Any] = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        return {"candidates": [candidate]}
+
+    async def gemini_prompt(request: Request) -> str:
+        body = await request.json()
+        return "\n".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+
+    def split_gemini_prompt(prompt: str):
+        # LlmChat sends "<system prompt>\n\nUser: <message>" as a single part
+        system_prompt, _, user_message = prompt.rpartition("\n\nUser: ")
+        return system_prompt, user_message or prompt
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        prompt = await gemini_prompt(request)
+        failure = await provider.admit("gemini")
+        if failure:
+            return failure
+        text = provider.reply_for(*split_gemini_prompt(prompt))
+        await asyncio.sleep(provider.sample_latency())
+        response = gemini_candidate(text, finished=True)
+        response["usageMetadata"] = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4}
+        return response
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str, request: Request):
+        prompt = await gemini_prompt(request)
+        failure = await provider.admit("gemini")
+        if failure:
+            return failure
+        text = provider.reply_for(*split_gemini_prompt(prompt))
+        provider.streams += 1
+        chunks = provider.chunks(text)
+        sse = request.query_params.get("alt") == "sse"
+
+        async def events():
+            # ?alt=sse gets SSE; the SDK's REST transport reads a streamed JSON array
+            if not sse:
+                yield "["
+            index = 0
+            async for chunk in provider.paced(text):
+                data = json.dumps(gemini_candidate(chunk, finished=index == len(chunks) - 1))
+                if sse:
+                    yield f"data: {data}\r\n\r\n"
+                else:
+                    yield ("," if index else "") + data
+                index += 1
+            if not sse:
+                yield "]"
+
+        return StreamingResponse(events(), media_type="text/event-stream" if sse else "application/json")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical")
+    parser.add_argument("--latency", help="fixed:MS | uniform:LO,HI | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--token-ms", type=float, help="delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--stall-rate", type=float, help="fraction of requests that hang")
+    parser.add_argument("--script", type=Path, help="JSONL of {\"content\": ...} replies, cycled")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    profile = dict(PROFILES[args.profile])
+    for key in ("latency", "token_ms", "error_rate", "stall_rate"):
+        if getattr(args, key) is not None:
+            profile[key] = getattr(args, key)
+    parse_latency(profile["latency"])
+
+    import uvicorn
+
+    provider = FakeProvider(error_status=args.error_status, script=args.script, **profile)
+    uvicorn.run(create_app(provider), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Login burst benchmark: bcrypt inline on the event loop vs the bounded hash pool
+
+Registers users in a dedicated benchmark database, then fires concurrent
+POST /api/auth/login requests in-process twice: once with verify_password
+swapped for the old synchronous pwd_context.verify ("inline"), once through
+server.password_hasher ("pool"). A probe task sleeps 10 ms in a loop
+alongside the burst; its overshoot is the event-loop stall every other
+request on the worker would see. 429s from admission control are counted
+separately from failures.
+
+Usage:
+    python benchmarks/password_hashing.py [--requests 200] [--concurrency 50]
+        [--workers 4] [--max-pending 32]
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+BENCH_DB_NAME = os.environ.get('BENCH_DB_NAME', 'operai_bench')
+BENCH_USERS = 20
+BENCH_PASSWORD = "bench123"
+PROBE_INTERVAL = 0.01
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def inline_verify(plain_password: str, hashed_password: str) -> bool:
+    """The pre-pool behaviour: bcrypt runs on the event loop thread"""
+    return server.pwd_context.verify(plain_password, hashed_password)
+
+
+async def create_users(client: httpx.AsyncClient):
+    emails = [f"login{i}@bench.local" for i in range(BENCH_USERS)]
+    for email in emails:
+        user = {"email": email, "name": email.split("@")[0], "password": BENCH_PASSWORD, "role": "employee"}
+        (await client.post("/api/auth/register", json=user)).raise_for_status()
+    return emails
+
+
+async def run_burst(client, emails, total: int, concurrency: int):
+    jobs = iter(itertools.islice(itertools.cycle(emails), total))
+    samples, rejected, failures = [], 0, 0
+    lag_ms = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lag_ms.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+    async def worker():
+        nonlocal rejected, failures
+        for email in jobs:
+            started = time.perf_counter()
+            response = await client.post("/api/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+            if response.status_code == 429:
+                rejected += 1
+            elif response.status_code != 200:
+                failures += 1
+            else:
+                samples.append((time.perf_counter() - started) * 1000)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return samples, rejected, failures, elapsed, sorted(lag_ms)
+
+
+def report(mode: str, samples, rejected, failures, elapsed, lag_ms):
+    samples.sort()
+    print(f"\n{mode}")
+    print(f"  {'throughput':<14}{len(samples) / elapsed:>10.1f} logins/s")
+    if samples:
+        print(f"  {'mean ms':<14}{statistics.mean(samples):>10.1f}")
+        for label, fraction in [("p50 ms", 0.5), ("p95 ms", 0.95), ("p99 ms", 0.99)]:
+            print(f"  {label:<14}{percentile(samples, fraction):>10.1f}")
+    if lag_ms:
+        print(f"  {'loop lag p95':<14}{percentile(lag_ms, 0.95):>10.1f} ms")
+        print(f"  {'loop lag max':<14}{lag_ms[-1]:>10.1f} ms")
+    print(f"  {'429s':<14}{rejected:>10}")
+    print(f"  {'failures':<14}{failures:>10}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=server.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=server.PASSWORD_HASH_MAX_PENDING)
+    args = parser.parse_args()
+
+    server.db = server.client[BENCH_DB_NAME]
+    await server.client.drop_database(BENCH_DB_NAME)
+    await server.ensure_indexes()
+    server.password_hasher = server.PasswordHasher(workers=args.workers, max_pending=args.max_pending)
+    pooled_verify = server.verify_password
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        emails = await create_users(client)
+        print(f"login burst: {args.requests} requests, concurrency {args.concurrency}, "
+              f"{args.workers} hash workers, max pending {args.max_pending}")
+
+        server.verify_password = inline_verify
+        report("inline (bcrypt on the event loop)", *await run_burst(client, emails, args.requests, args.concurrency))
+
+        server.verify_password = pooled_verify
+        report("pool (PasswordHasher)", *await run_burst(client, emails, args.requests, args.concurrency))
+
+    print(f"\npassword hasher: {server.password_hasher.stats()}")
+    server.password_hasher.close()
+    await server.client.drop_database(BENCH_DB_NAME)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
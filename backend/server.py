@@ -1,21 +1,37 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
+import sys
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Generic, TypeVar, Tuple, Union, Awaitable, Callable
 import uuid
+import base64
+import copy
+import hashlib
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
+from cachetools import LRUCache, TTLCache
 import jwt
 # from emergentintegrations.llm.chat import LlmChat, UserMessage  # TODO: Install emergentintegrations package
 import json
 import re
 from litellm import acompletion
+from openai import APIConnectionError, AsyncOpenAI
+import httpx
 import google.generativeai as genai
 
 
@@ -31,9 +47,21 @@ import certifi
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url, tlsCAFile=certifi.where())
+# tz_aware so native BSON dates come back as UTC-aware datetimes, matching
+# what datetime.fromisoformat() produced for the legacy string fields
+client = AsyncIOMotorClient(mongo_url, tlsCAFile=certifi.where(), tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
+# Datetime storage, audiences and notification read state live in
+# backend.services.storage, shared with the AI executor; imported after
+# load_dotenv since DATETIME_STORAGE is read at import time
+if str(ROOT_DIR.parent) not in sys.path:
+    # Started from backend/ (uvicorn server:app): make the backend package importable
+    sys.path.insert(0, str(ROOT_DIR.parent))
+from backend.services.storage import (  # noqa: E402
+    DATETIME_STORAGE, audience_keys, build_audience, db_now, is_notification_read, parse_db_datetime, to_db_datetime
+)
+
 # JWT Configuration
 JWT_SECRET = os.environ['JWT_SECRET']
 JWT_ALGORITHM = os.environ['JWT_ALGORITHM']
@@ -66,7 +94,7 @@ async def seed_demo_data():
                 "id": dept_id,
                 "name": "Engineering",
                 "description": "Engineering Department",
-                "created_at": datetime.now(timezone.utc).isoformat()
+                "created_at": db_now()
             }
             await db.departments.insert_one(dept)
             logger.info("Created Engineering department")
@@ -76,7 +104,7 @@ async def seed_demo_data():
         # 2. Create Demo Users
         # Passwords match frontend Quick Fill (Password123!)
         common_password = "Password123!"
-        hashed_password = pwd_context.hash(common_password)
+        hashed_password = await hash_password(common_password)
         
         demo_users = [
             {"email": "admin@operai.demo", "name": "Admin User", "role": "admin", "dept": None},
@@ -96,7 +124,7 @@ async def seed_demo_data():
                     "role": user_data["role"],
                     "department_id": user_data["dept"],
                     "password": hashed_password,
-                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "created_at": db_now(),
                     "is_active": True
                 }
                 await db.users.insert_one(new_user)
@@ -111,15 +139,274 @@ async def seed_demo_data():
                     {"email": user_data["email"]},
                     {"$set": update_fields}
                 )
+                user_directory.invalidate(existing["id"], existing["email"])
                 logger.info(f"Updated demo user: {user_data['email']}")
 
     except Exception as e:
         logger.error(f"Seeding error: {e}")
 
+
+# ===== DATABASE INDEXES =====
+# Declarative index manifest: collection -> list of (keys, options).
+# Every index is named explicitly so the report endpoint can diff what exists
+# against what we expect, and so re-applying the manifest is a no-op.
+INDEX_MANIFEST: Dict[str, List[Dict[str, Any]]] = {
+    "users": [
+        {"keys": [("email", ASCENDING)], "name": "email_unique", "unique": True},
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("role", ASCENDING), ("department_id", ASCENDING)], "name": "role_department"},
+    ],
+    "departments": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("name", ASCENDING)], "name": "name"},
+    ],
+    "tasks": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        # (..., created_at, id) indexes back the keyset pagination sort
+        {"keys": [("assigned_to", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "name": "assigned_to_created_at_id"},
+        {"keys": [("created_by", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "name": "created_by_created_at_id"},
+        {"keys": [("created_by", ASCENDING), ("status", ASCENDING)], "name": "created_by_status"},
+        {"keys": [("created_at", DESCENDING), ("id", DESCENDING)], "name": "created_at_id"},
+    ],
+    "attendance": [
+        {"keys": [("user_id", ASCENDING), ("date", ASCENDING)], "name": "user_date_unique", "unique": True},
+        {"keys": [("user_id", ASCENDING), ("date", DESCENDING), ("id", DESCENDING)], "name": "user_date_id"},
+        {"keys": [("date", DESCENDING), ("id", DESCENDING)], "name": "date_id"},
+        {"keys": [("date", ASCENDING), ("status", ASCENDING)], "name": "date_status"},
+    ],
+    "leaves": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "name": "user_created_at_id"},
+        {"keys": [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "name": "status_created_at_id"},
+        {"keys": [("created_at", DESCENDING), ("id", DESCENDING)], "name": "created_at_id"},
+    ],
+    "deadline_requests": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("task_id", ASCENDING), ("requested_by", ASCENDING), ("status", ASCENDING)], "name": "task_requester_status"},
+        {"keys": [("requested_by", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "name": "requester_created_at_id"},
+        {"keys": [("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], "name": "status_created_at_id"},
+        {"keys": [("created_at", DESCENDING), ("id", DESCENDING)], "name": "created_at_id"},
+    ],
+    "announcements": [
+        {"keys": [("audience", ASCENDING), ("created_at", DESCENDING)], "name": "audience_created_at"},
+    ],
+    "notifications": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("audience", ASCENDING), ("created_at", DESCENDING)], "name": "audience_created_at"},
+    ],
+    "ai_messages": [
+        {"keys": [("user_id", ASCENDING), ("session_id", ASCENDING), ("created_at", ASCENDING)], "name": "user_session_created_at"},
+        {"keys": [("user_id", ASCENDING), ("created_at", DESCENDING)], "name": "user_created_at"},
+    ],
+}
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Apply INDEX_MANIFEST idempotently. Returns created index names per collection."""
+    applied: Dict[str, List[str]] = {}
+    for collection_name, specs in INDEX_MANIFEST.items():
+        applied[collection_name] = []
+        for spec in specs:
+            options = {k: v for k, v in spec.items() if k != "keys"}
+            try:
+                name = await db[collection_name].create_index(spec["keys"], **options)
+                applied[collection_name].append(name)
+            except OperationFailure as e:
+                # Typically duplicate data under a unique index, or an existing
+                # index with the same keys but different options. Keep going so
+                # one bad index doesn't block the rest of the manifest.
+                logger.error(f"Index {collection_name}.{spec['name']} not applied: {e}")
+    return applied
+
+
+# ===== DATETIME BACKFILL =====
+# Fields that used to be written with isoformat() and are now native BSON dates
+DATETIME_FIELDS: Dict[str, List[str]] = {
+    "users": ["created_at"],
+    "departments": ["created_at"],
+    "tasks": ["created_at", "updated_at", "deadline"],
+    "attendance": ["created_at", "check_in", "check_out"],
+    "leaves": ["created_at", "updated_at"],
+    "deadline_requests": ["created_at", "updated_at"],
+    "announcements": ["created_at"],
+    "notifications": ["created_at"],
+    "notification_reads": ["last_read_at"],
+    "ai_messages": ["created_at"],
+    "ai_sessions": ["created_at", "updated_at"],
+}
+DATETIME_MIGRATION_ID = "bson_datetimes"
+DATETIME_MIGRATION_BATCH_SIZE = int(os.environ.get('DATETIME_MIGRATION_BATCH_SIZE', 500))
+# Strings keep arriving from DATETIME_STORAGE=iso workers or old pods mid-deploy, and
+# range queries on these fields skip them, so the backfill re-scans periodically (0: startup only)
+DATETIME_MIGRATION_INTERVAL_SECONDS = int(os.environ.get('DATETIME_MIGRATION_INTERVAL_SECONDS', 3600))
+
+# Keep a reference so the background task isn't garbage collected mid-run
+datetime_migration_task: Optional[asyncio.Task] = None
+datetime_migration_active = False
+
+
+async def migrate_datetimes(batch_size: int = DATETIME_MIGRATION_BATCH_SIZE) -> Dict[str, Any]:
+    """Convert ISO-string datetimes to BSON dates in bulk batches.
+
+    Every run is a fresh pass over each collection for {"$type": "string"}
+    values: nothing is ever marked done, so strings written after an earlier
+    pass are picked up by the next one. Within a pass, progress is
+    checkpointed per collection in db.migrations as the last processed _id,
+    so an interrupted pass resumes where it stopped. Strings that don't
+    parse are left untouched and counted as skipped for that pass.
+    """
+    state = await db.migrations.find_one({"_id": DATETIME_MIGRATION_ID}) or {}
+    progress = state.get("collections", {})
+    await db.migrations.update_one(
+        {"_id": DATETIME_MIGRATION_ID},
+        {"$set": {"status": "running", "started_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+    for collection_name, fields in DATETIME_FIELDS.items():
+        collection_progress = progress.get(collection_name, {"converted": 0, "skipped": 0, "last_id": None, "passes": 0})
+        if collection_progress["last_id"] is None:
+            # Starting a new pass rather than resuming one
+            collection_progress["skipped"] = 0
+
+        while True:
+            query: Dict[str, Any] = {"$or": [{field: {"$type": "string"}} for field in fields]}
+            if collection_progress["last_id"] is not None:
+                query["_id"] = {"$gt": collection_progress["last_id"]}
+
+            docs = await db[collection_name].find(
+                query, {field: 1 for field in fields}
+            ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+
+            operations = []
+            for doc in docs:
+                converted = {}
+                for field in fields:
+                    if isinstance(doc.get(field), str):
+                        try:
+                            converted[field] = parse_db_datetime(doc[field])
+                        except ValueError:
+                            collection_progress["skipped"] += 1
+                if converted:
+                    operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": converted}))
+
+            if operations:
+                await db[collection_name].bulk_write(operations, ordered=False)
+            collection_progress["converted"] += len(operations)
+            collection_progress["last_id"] = docs[-1]["_id"]
+            await db.migrations.update_one(
+                {"_id": DATETIME_MIGRATION_ID},
+                {"$set": {f"collections.{collection_name}": collection_progress}}
+            )
+
+        collection_progress["last_id"] = None
+        collection_progress["passes"] = collection_progress.get("passes", 0) + 1
+        await db.migrations.update_one(
+            {"_id": DATETIME_MIGRATION_ID},
+            {"$set": {f"collections.{collection_name}": collection_progress}}
+        )
+        progress[collection_name] = collection_progress
+        logger.info(f"Datetime backfill {collection_name}: {collection_progress['converted']} converted, {collection_progress['skipped']} skipped")
+
+    await db.migrations.update_one(
+        {"_id": DATETIME_MIGRATION_ID},
+        {"$set": {"status": "completed", "completed_at": datetime.now(timezone.utc)}}
+    )
+    return progress
+
+
+async def run_datetime_migration():
+    """Background loop: one backfill pass now, then every DATETIME_MIGRATION_INTERVAL_SECONDS"""
+    global datetime_migration_active
+    while True:
+        datetime_migration_active = True
+        try:
+            await migrate_datetimes()
+        except Exception as e:
+            # Checkpoints are already persisted; the next pass resumes from them
+            logger.error(f"Datetime backfill error: {e}")
+        finally:
+            datetime_migration_active = False
+        if DATETIME_MIGRATION_INTERVAL_SECONDS <= 0:
+            return
+        await asyncio.sleep(DATETIME_MIGRATION_INTERVAL_SECONDS)
+
+
+# ===== AUDIENCE BACKFILL =====
+AUDIENCE_COLLECTIONS = ["notifications", "announcements"]
+AUDIENCE_MIGRATION_BATCH_SIZE = int(os.environ.get('AUDIENCE_MIGRATION_BATCH_SIZE', 500))
+
+
+async def migrate_audience(batch_size: int = AUDIENCE_MIGRATION_BATCH_SIZE) -> Dict[str, int]:
+    """Derive the audience array for documents written before it existed.
+
+    Selecting on {audience: {$exists: false}} makes the pass idempotent:
+    each batch shrinks the remaining set, so no checkpoint is needed.
+    """
+    migrated = {}
+    for collection_name in AUDIENCE_COLLECTIONS:
+        count = 0
+        while True:
+            docs = await db[collection_name].find(
+                {"audience": {"$exists": False}}, {"user_id": 1, "target_roles": 1}
+            ).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            await db[collection_name].bulk_write([
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"audience": build_audience(doc.get("user_id"), doc.get("target_roles"))}}
+                )
+                for doc in docs
+            ], ordered=False)
+            count += len(docs)
+        migrated[collection_name] = count
+        if count:
+            logger.info(f"Audience backfill {collection_name}: {count} documents")
+    return migrated
+
+
 @app.on_event("startup")
 async def startup_db_client():
+    global datetime_migration_task, stats_reconcile_task, token_revocation_task
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Index bootstrap error: {e}")
+    # Feeds only match on audience, so legacy documents must carry it before serving:
+    # a failed backfill fails startup rather than silently hiding those documents
+    await migrate_audience()
     await seed_demo_data()
 
+    try:
+        execute_prompts.compile_all(ALL_ROLES)
+    except Exception as e:
+        logger.error(f"Execute prompt compile error: {e}")
+
+    llm_key = configured_llm_key()
+    if llm_key and not llm_key.startswith("sk-emergent"):
+        try:
+            # Build the provider client now so the first chat doesn't pay for it
+            llm_registry.pool(llm_key)
+        except Exception as e:
+            logger.error(f"LLM provider warm-up error: {e}")
+
+    if DATETIME_STORAGE == 'bson':
+        datetime_migration_task = asyncio.create_task(run_datetime_migration())
+    stats_reconcile_task = asyncio.create_task(run_stats_reconciliation())
+    token_revocation_task = asyncio.create_task(run_token_revocation_refresh())
+    ai_message_writer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    # Drain queued transcripts before the Mongo client goes away
+    await ai_message_writer.stop()
+    await llm_registry.close()
+    password_hasher.close()
+
 
 # ===== MODELS =====
 class TokenData(BaseModel):
@@ -136,6 +423,9 @@ class UserRole:
     INTERN = "intern"
 
 
+ALL_ROLES = [UserRole.ADMIN, UserRole.HR, UserRole.TEAM_LEAD, UserRole.EMPLOYEE, UserRole.INTERN]
+
+
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -383,13 +673,208 @@ class Notification(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
-# ===== HELPER FUNCTIONS =====
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+PageItem = TypeVar("PageItem")
+
 
+class Page(BaseModel, Generic[PageItem]):
+    items: List[PageItem]
+    limit: int
+    next_cursor: Optional[str] = None
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+
+# ===== KEYSET PAGINATION =====
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+
+def encode_cursor(sort_value: Any, doc_id: str) -> str:
+    """Opaque cursor for the last item of a page: (sort key, id) as base64 JSON"""
+    if isinstance(sort_value, datetime):
+        payload = {"t": "dt", "v": sort_value.isoformat(), "id": doc_id}
+    else:
+        payload = {"t": "s", "v": sort_value, "id": doc_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = payload["v"]
+        if payload["t"] == "dt":
+            value = parse_db_datetime(value)
+        return value, payload["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    limit: Optional[int],
+    cursor: Optional[str],
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+    """Fetch one page sorted by (sort_field desc, id desc) starting after cursor.
+
+    Returns (items, effective_limit, next_cursor). One extra document is read
+    to decide whether another page exists, so no count query is needed.
+    """
+    limit = min(max(limit or DEFAULT_PAGE_LIMIT, 1), MAX_PAGE_LIMIT)
+    
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        after_cursor = [
+            {sort_field: {"$lt": last_value}},
+            {sort_field: last_value, "id": {"$lt": last_id}},
+        ]
+        if isinstance(last_value, datetime):
+            # Rows not yet backfilled still hold ISO strings, which sort after
+            # every BSON date in descending order
+            after_cursor.append({sort_field: {"$type": "string"}})
+        query = {"$and": [query, {"$or": after_cursor}]} if query else {"$or": after_cursor}
+    
+    docs = await collection.find(query, projection if projection is not None else {"_id": 0}).sort(
+        [(sort_field, DESCENDING), ("id", DESCENDING)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1].get(sort_field), docs[-1]["id"])
+    return docs, limit, next_cursor
+
+
+# ===== NDJSON STREAMING =====
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Documents per getMore round trip, and records per chunk written to the socket
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 1000))
+STREAM_CHUNK_RECORDS = int(os.environ.get('STREAM_CHUNK_RECORDS', 200))
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def stream_ndjson(cursor, model) -> StreamingResponse:
+    """Stream a Motor cursor as one JSON record per line.
+
+    Each document is validated/encoded through the same model as the JSON
+    response, but only one chunk of records is held in memory at a time.
+    """
+    async def generate():
+        lines = []
+        try:
+            async for doc in cursor.batch_size(STREAM_BATCH_SIZE):
+                lines.append(model.model_validate(doc).model_dump_json())
+                if len(lines) >= STREAM_CHUNK_RECORDS:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+        finally:
+            # Client disconnects close the generator; free the server-side cursor
+            await cursor.close()
+    
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+# ===== PASSWORD HASHING =====
+# bcrypt costs ~250 ms of CPU per call; it runs on a small thread pool (the
+# bcrypt backend releases the GIL) so a login burst doesn't stall the loop.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+# Calls running or waiting for a worker; past this, logins get 429 instead of queueing for seconds
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt hash/verify with admission control"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING, window: int = 500):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_ms: deque = deque(maxlen=window)
+        self.run_ms: deque = deque(maxlen=window)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many sign-in requests in progress, please retry",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+            )
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        queued_at = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            return started, time.perf_counter(), result
+
+        def finished_job(future: asyncio.Future):
+            self.pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            started, finished, _ = future.result()
+            self.completed += 1
+            self.wait_ms.append((started - queued_at) * 1000)
+            self.run_ms.append((finished - started) * 1000)
+
+        future = asyncio.get_running_loop().run_in_executor(self._pool(), timed)
+        # A cancelled caller (client disconnect) doesn't stop the bcrypt job, so its
+        # slot is released when the worker finishes, not when the caller stops waiting
+        future.add_done_callback(finished_job)
+        _, _, result = await asyncio.shield(future)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": max(0, self.pending - self.workers),
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms": latency_percentiles(self.wait_ms),
+            "run_ms": latency_percentiles(self.run_ms),
+        }
+
+
+password_hasher = PasswordHasher()
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict) -> str:
@@ -406,14 +891,9 @@ def create_refresh_token(data: dict) -> str:
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
-def decode_token(token: str) -> TokenData:
+def decode_token_payload(token: str) -> Dict[str, Any]:
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return TokenData(
-            user_id=payload.get("user_id"),
-            email=payload.get("email"),
-            role=payload.get("role")
-        )
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -422,7 +902,19 @@ def decode_token(token: str) -> TokenData:
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
     token = credentials.credentials
-    return decode_token(token)
+    current_user = token_cache.get(token)
+    if current_user is None:
+        payload = decode_token_payload(token)
+        current_user = TokenData(
+            user_id=payload.get("user_id"),
+            email=payload.get("email"),
+            role=payload.get("role")
+        )
+        token_cache.put(token, current_user, payload.get("exp"))
+    # Checked on hits and misses alike: a valid signature doesn't outlive deactivation
+    if token_cache.is_revoked(current_user.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive")
+    return current_user
 
 
 def require_role(*allowed_roles: str):
@@ -459,6 +951,418 @@ def extract_json_from_response(text: str) -> dict:
         raise ValueError(f"Could not parse AI response as JSON: {str(e)}")
 
 
+# ===== CACHES =====
+SUBORDINATE_CACHE_TTL_SECONDS = int(os.environ.get('SUBORDINATE_CACHE_TTL_SECONDS', 60))
+SUBORDINATE_ROLES = [UserRole.EMPLOYEE, UserRole.INTERN]
+
+
+class SubordinateCache:
+    """In-process cache of team-lead subordinates, scoped by department.
+
+    Holds lead user_id -> department_id and department_id -> employee/intern
+    ids, each with a TTL. A lead without a department sees every
+    employee/intern, which is cached under the None department key.
+    Writes to users call invalidate_* so changes show up before the TTL.
+    """
+
+    def __init__(self, ttl_seconds: int = SUBORDINATE_CACHE_TTL_SECONDS, maxsize: int = 1024):
+        self._departments: TTLCache = TTLCache(maxsize=maxsize * 8, ttl=ttl_seconds)
+        self._members: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_department_id(self, database, user_id: str) -> Optional[str]:
+        if user_id in self._departments:
+            self.hits += 1
+            return self._departments[user_id]
+        self.misses += 1
+        user_doc = await database.users.find_one({"id": user_id}, {"_id": 0, "department_id": 1})
+        department_id = user_doc.get("department_id") if user_doc else None
+        self._departments[user_id] = department_id
+        return department_id
+
+    async def get_department_member_ids(self, database, department_id: Optional[str]) -> List[str]:
+        if department_id in self._members:
+            self.hits += 1
+            return list(self._members[department_id])
+        self.misses += 1
+        query: Dict[str, Any] = {"role": {"$in": SUBORDINATE_ROLES}}
+        if department_id:
+            query["department_id"] = department_id
+        members = await database.users.find(query, {"_id": 0, "id": 1}).to_list(None)
+        member_ids = [member["id"] for member in members]
+        self._members[department_id] = member_ids
+        return list(member_ids)
+
+    async def get_subordinate_ids(self, database, user_id: str) -> List[str]:
+        department_id = await self.get_department_id(database, user_id)
+        return await self.get_department_member_ids(database, department_id)
+
+    def invalidate_user(self, user_id: Optional[str] = None, department_id: Optional[str] = None):
+        """Drop entries affected by a user write (create, role or department change)"""
+        self.invalidations += 1
+        if user_id:
+            self._departments.pop(user_id, None)
+        self._members.pop(department_id, None)
+        # The no-department view spans every department
+        self._members.pop(None, None)
+
+    def clear(self):
+        self.invalidations += 1
+        self._departments.clear()
+        self._members.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "departments_cached": len(self._members),
+            "users_cached": len(self._departments),
+        }
+
+
+subordinate_cache = SubordinateCache()
+
+
+USER_CONTEXT_TTL_SECONDS = int(os.environ.get('USER_CONTEXT_TTL_SECONDS', 30))
+
+
+class UserContextCache:
+    """Short-TTL cache of the rendered build_user_context snapshot per user and role.
+
+    Any write to a user's tasks, leaves or attendance calls invalidate()
+    for the users whose snapshot shows that record, so the TTL only bounds
+    staleness from writes that bypass this process.
+    """
+
+    def __init__(self, ttl_seconds: int = USER_CONTEXT_TTL_SECONDS, maxsize: int = 4096):
+        self._snapshots: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str, role: str) -> Optional[str]:
+        snapshot = self._snapshots.get((user_id, role))
+        if snapshot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snapshot
+
+    def put(self, user_id: str, role: str, snapshot: str):
+        self._snapshots[(user_id, role)] = snapshot
+
+    def invalidate(self, *user_ids: Optional[str]):
+        self.invalidations += 1
+        for user_id in user_ids:
+            if not user_id:
+                continue
+            for role in ALL_ROLES:
+                self._snapshots.pop((user_id, role), None)
+
+    def clear(self):
+        self.invalidations += 1
+        self._snapshots.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "snapshots_cached": len(self._snapshots),
+        }
+
+
+user_context_cache = UserContextCache()
+
+
+PLAN_CACHE_MAXSIZE = int(os.environ.get('PLAN_CACHE_MAXSIZE', 2048))
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+
+
+class _CountingLRUCache(LRUCache):
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize=maxsize)
+        self.evictions = 0
+
+    def popitem(self):
+        self.evictions += 1
+        return super().popitem()
+
+
+class ActionPlanCache:
+    """LRU of parsed /ai/execute plans keyed by (normalized message, role, UTC date).
+
+    Only plans made entirely of read-only actions are stored, and only when
+    every email/uuid in their params also appears in the message itself, so
+    a plan never carries the original caller's identity to another user.
+    """
+
+    def __init__(self, maxsize: int = PLAN_CACHE_MAXSIZE):
+        self._plans = _CountingLRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _key(message: str, role: str) -> Tuple[str, str, str]:
+        from backend.services.intent_matcher import normalize
+        
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        return (" ".join(normalize(message)), role, today)
+
+    @staticmethod
+    def _is_portable(plan: Dict[str, Any], message: str) -> bool:
+        from backend.services.ai_actions import READ_ONLY_ACTIONS
+        
+        actions = plan.get("actions")
+        if not isinstance(actions, list) or not actions:
+            return False
+        lowered = message.lower()
+        for action in actions:
+            if not isinstance(action, dict) or action.get("name") not in READ_ONLY_ACTIONS:
+                return False
+            for value in (action.get("params") or {}).values():
+                text = str(value).lower()
+                identifiers = UUID_PATTERN.findall(text) + [token for token in text.split() if "@" in token]
+                if any(identifier not in lowered for identifier in identifiers):
+                    return False
+        return True
+
+    def get(self, message: str, role: str) -> Optional[Dict[str, Any]]:
+        plan = self._plans.get(self._key(message, role))
+        if plan is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(plan)
+
+    def put(self, message: str, role: str, plan: Dict[str, Any]) -> bool:
+        if not self._is_portable(plan, message):
+            self.rejected += 1
+            return False
+        self._plans[self._key(message, role)] = copy.deepcopy(plan)
+        self.stores += 1
+        return True
+
+    def clear(self):
+        self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "rejected": self.rejected,
+            "evictions": self._plans.evictions,
+            "size": len(self._plans),
+            "maxsize": self._plans.maxsize,
+        }
+
+
+plan_cache = ActionPlanCache()
+
+
+USER_DIRECTORY_MAXSIZE = int(os.environ.get('USER_DIRECTORY_MAXSIZE', 10000))
+USER_DIRECTORY_PROJECTION = {"_id": 0, "id": 1, "name": 1, "email": 1, "role": 1, "department_id": 1}
+
+
+class UserDirectory:
+    """Bounded LRU of id -> {id, name, email, role, department_id} for enrichment.
+
+    A secondary email -> id LRU serves email lookups. Entries are written
+    through on register and dropped on user updates; batch lookups fetch
+    only the ids that are not cached, in a single $in query.
+    """
+
+    def __init__(self, maxsize: int = USER_DIRECTORY_MAXSIZE):
+        self._by_id: LRUCache = LRUCache(maxsize=maxsize)
+        self._id_by_email: LRUCache = LRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _entry(user_doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": user_doc["id"],
+            "name": user_doc.get("name", "Unknown"),
+            "email": user_doc.get("email", "unknown@operai.demo"),
+            "role": user_doc.get("role", "employee"),
+            "department_id": user_doc.get("department_id"),
+        }
+
+    def put(self, user_doc: Dict[str, Any]) -> Dict[str, Any]:
+        entry = self._entry(user_doc)
+        self._by_id[entry["id"]] = entry
+        if user_doc.get("email"):
+            self._id_by_email[user_doc["email"]] = entry["id"]
+        return entry
+
+    async def get_many(self, database, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for user_id in set(user_ids):
+            if not user_id:
+                continue
+            entry = self._by_id.get(user_id)
+            if entry is not None:
+                found[user_id] = entry
+            else:
+                missing.append(user_id)
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if missing:
+            user_docs = await database.users.find(
+                {"id": {"$in": missing}}, USER_DIRECTORY_PROJECTION
+            ).to_list(None)
+            for user_doc in user_docs:
+                found[user_doc["id"]] = self.put(user_doc)
+        return found
+
+    async def get(self, database, user_id: str) -> Optional[Dict[str, Any]]:
+        return (await self.get_many(database, [user_id])).get(user_id)
+
+    async def get_by_email(self, database, email: str) -> Optional[Dict[str, Any]]:
+        user_id = self._id_by_email.get(email)
+        entry = self._by_id.get(user_id) if user_id else None
+        if entry is not None and entry["email"] == email:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        user_doc = await database.users.find_one({"email": email}, USER_DIRECTORY_PROJECTION)
+        return self.put(user_doc) if user_doc else None
+
+    def invalidate(self, user_id: Optional[str] = None, email: Optional[str] = None):
+        entry = self._by_id.pop(user_id, None) if user_id else None
+        if entry:
+            self._id_by_email.pop(entry["email"], None)
+        if email:
+            self._id_by_email.pop(email, None)
+
+    def clear(self):
+        self._by_id.clear()
+        self._id_by_email.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._by_id),
+            "maxsize": self._by_id.maxsize,
+        }
+
+
+user_directory = UserDirectory()
+
+
+TOKEN_CACHE_MAXSIZE = int(os.environ.get('TOKEN_CACHE_MAXSIZE', 10000))
+TOKEN_REVOCATION_REFRESH_SECONDS = int(os.environ.get('TOKEN_REVOCATION_REFRESH_SECONDS', 30))
+
+
+class TokenCache:
+    """Bounded LRU of sha256(bearer token) -> verified TokenData, kept until the token's exp.
+
+    Revocation is a set of inactive user ids checked on every request,
+    cache hit or not. It is reloaded from users.is_active every
+    TOKEN_REVOCATION_REFRESH_SECONDS (so deactivations made by other
+    workers or directly in the database land within that window) and
+    updated in-process by set_active().
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_MAXSIZE):
+        self._tokens: LRUCache = LRUCache(maxsize=maxsize)
+        self._inactive: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.revoked_hits = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[TokenData]:
+        key = self._key(token)
+        entry = self._tokens.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        token_data, expires_at = entry
+        if expires_at <= time.time():
+            # Let the caller re-decode so the client gets the usual "Token expired"
+            del self._tokens[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return token_data
+
+    def put(self, token: str, token_data: TokenData, expires_at: Optional[float]):
+        if expires_at is not None:
+            self._tokens[self._key(token)] = (token_data, float(expires_at))
+
+    def is_revoked(self, user_id: str) -> bool:
+        if user_id in self._inactive:
+            self.revoked_hits += 1
+            return True
+        return False
+
+    def set_active(self, user_id: str, is_active: bool):
+        if is_active:
+            self._inactive.discard(user_id)
+        else:
+            self._inactive.add(user_id)
+
+    async def refresh_revocations(self, database):
+        inactive = await database.users.distinct("id", {"is_active": False})
+        self._inactive = set(inactive)
+        self.refreshes += 1
+
+    def clear(self):
+        self._tokens.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "size": len(self._tokens),
+            "maxsize": self._tokens.maxsize,
+            "inactive_users": len(self._inactive),
+            "revoked_hits": self.revoked_hits,
+            "revocation_refreshes": self.refreshes,
+        }
+
+
+token_cache = TokenCache()
+token_revocation_task: Optional[asyncio.Task] = None
+
+
+async def run_token_revocation_refresh():
+    """Background loop: reload inactive user ids every TOKEN_REVOCATION_REFRESH_SECONDS"""
+    while True:
+        try:
+            await token_cache.refresh_revocations(db)
+        except Exception as e:
+            logger.error(f"Token revocation refresh error: {e}")
+        await asyncio.sleep(TOKEN_REVOCATION_REFRESH_SECONDS)
+
+
 # ===== AUTH ENDPOINTS =====
 @api_router.post("/auth/register", response_model=User)
 async def register(user_data: UserCreate):
@@ -469,7 +1373,7 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     
     # Hash password
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     # Create user
     user = User(
@@ -480,10 +1384,18 @@ async def register(user_data: UserCreate):
     )
     
     doc = user.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
     doc['password'] = hashed_password
     
-    await db.users.insert_one(doc)
+    try:
+        await db.users.insert_one(doc)
+    except DuplicateKeyError:
+        # Concurrent registration for the same email lost the race on users.email_unique
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    
+    subordinate_cache.invalidate_user(user.id, user.department_id)
+    user_directory.put(doc)
+    await stats_counters.user_created(db)
     return user
 
 
@@ -495,10 +1407,11 @@ async def login(credentials: UserLogin):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
     # Verify password
-    if not verify_password(credentials.password, user_doc['password']):
+    if not await verify_password(credentials.password, user_doc['password']):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
     # Check if user is active
+    token_cache.set_active(user_doc['id'], user_doc.get('is_active', True))
     if not user_doc.get('is_active', True):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive")
     
@@ -513,8 +1426,6 @@ async def login(credentials: UserLogin):
     
     # Convert user doc to User model
     user_doc.pop('password')
-    if isinstance(user_doc.get('created_at'), str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
     user = User(**user_doc)
     
     return TokenResponse(
@@ -530,9 +1441,6 @@ async def get_me(current_user: TokenData = Depends(get_current_user)):
     if not user_doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    if isinstance(user_doc.get('created_at'), str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     return User(**user_doc)
 
 
@@ -552,9 +1460,6 @@ async def get_users(current_user: TokenData = Depends(get_current_user)):
         # Regular employees/interns cannot list users
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
     
-    for user in users:
-        if isinstance(user.get('created_at'), str):
-            user['created_at'] = datetime.fromisoformat(user['created_at'])
     return users
 
 
@@ -564,9 +1469,6 @@ async def get_user(user_id: str, current_user: TokenData = Depends(get_current_u
     if not user_doc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    if isinstance(user_doc.get('created_at'), str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     return User(**user_doc)
 
 
@@ -582,7 +1484,7 @@ async def create_department(
     )
     
     doc = department.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
     
     await db.departments.insert_one(doc)
     return department
@@ -591,9 +1493,6 @@ async def create_department(
 @api_router.get("/departments", response_model=List[Department])
 async def get_departments(current_user: TokenData = Depends(get_current_user)):
     departments = await db.departments.find({}, {"_id": 0}).to_list(1000)
-    for dept in departments:
-        if isinstance(dept.get('created_at'), str):
-            dept['created_at'] = datetime.fromisoformat(dept['created_at'])
     return departments
 
 
@@ -613,12 +1512,14 @@ async def create_task(
     )
     
     doc = task.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
+    doc['updated_at'] = to_db_datetime(doc['updated_at'])
     if doc['deadline']:
-        doc['deadline'] = doc['deadline'].isoformat()
+        doc['deadline'] = to_db_datetime(doc['deadline'])
     
     await db.tasks.insert_one(doc)
+    await stats_counters.task_created(db, doc)
+    user_context_cache.invalidate(doc["assigned_to"], doc["created_by"])
     return task
 
 
@@ -628,6 +1529,8 @@ async def get_tasks(
     priority: Optional[str] = None,
     assigned_to: Optional[str] = None,
     created_by: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: TokenData = Depends(get_current_user)
 ):
     query = {}
@@ -641,16 +1544,8 @@ async def get_tasks(
             query["created_by"] = created_by
     elif current_user.role == UserRole.TEAM_LEAD:
         # Team Lead: Can see tasks they created + tasks assigned to their subordinates
-        # Get current user's department
-        current_user_doc = await db.users.find_one({"id": current_user.user_id})
-        department_id = current_user_doc.get("department_id") if current_user_doc else None
-        
-        # Find subordinate user IDs (employees/interns in same department)
-        subordinate_query = {"role": {"$in": ["employee", "intern"]}}
-        if department_id:
-            subordinate_query["department_id"] = department_id
-        subordinates = await db.users.find(subordinate_query).to_list(1000)
-        subordinate_ids = [user["id"] for user in subordinates]
+        # (employees/interns in same department, served from the subordinate cache)
+        subordinate_ids = await subordinate_cache.get_subordinate_ids(db, current_user.user_id)
         
         # Query: tasks created by them OR tasks assigned to subordinates
         query["$or"] = [
@@ -667,7 +1562,12 @@ async def get_tasks(
     if priority:
         query["priority"] = priority
     
-    tasks = await db.tasks.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    # Keyset pagination when requested; plain list for existing clients
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        tasks, limit, next_cursor = await fetch_page(db.tasks, query, "created_at", limit, cursor)
+    else:
+        tasks = await db.tasks.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
     # Get all unique user IDs for enrichment
     all_user_ids = list(set(
@@ -675,28 +1575,12 @@ async def get_tasks(
         [task.get("created_by") for task in tasks if task.get("created_by")]
     ))
     
-    # Fetch user info in bulk
-    users = await db.users.find({"id": {"$in": all_user_ids}}).to_list(1000)
-    user_map = {
-        user["id"]: {
-            "name": user.get("name", "Unknown"),
-            "email": user.get("email", "unknown@operai.demo"),
-            "role": user.get("role", "employee")
-        }
-        for user in users
-    }
+    # Resolve user info from the shared directory (one $in for cache misses only)
+    user_map = await user_directory.get_many(db, all_user_ids)
     
     # Enrich tasks with user information
     enriched_tasks = []
     for task in tasks:
-        # Convert datetime strings
-        if isinstance(task.get('created_at'), str):
-            task['created_at'] = datetime.fromisoformat(task['created_at'])
-        if isinstance(task.get('updated_at'), str):
-            task['updated_at'] = datetime.fromisoformat(task['updated_at'])
-        if isinstance(task.get('deadline'), str):
-            task['deadline'] = datetime.fromisoformat(task['deadline'])
-        
         # Add user info
         assigned_to_info = user_map.get(task.get("assigned_to"), {"name": "Unknown", "email": "", "role": ""})
         created_by_info = user_map.get(task.get("created_by"), {"name": "Unknown", "email": "", "role": ""})
@@ -708,6 +1592,8 @@ async def get_tasks(
         
         enriched_tasks.append(task)
     
+    if paginated:
+        return {"items": enriched_tasks, "limit": limit, "next_cursor": next_cursor}
     return enriched_tasks
 
 
@@ -722,13 +1608,6 @@ async def get_task(task_id: str, current_user: TokenData = Depends(get_current_u
         if task_doc["assigned_to"] != current_user.user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
     
-    if isinstance(task_doc.get('created_at'), str):
-        task_doc['created_at'] = datetime.fromisoformat(task_doc['created_at'])
-    if isinstance(task_doc.get('updated_at'), str):
-        task_doc['updated_at'] = datetime.fromisoformat(task_doc['updated_at'])
-    if isinstance(task_doc.get('deadline'), str):
-        task_doc['deadline'] = datetime.fromisoformat(task_doc['deadline'])
-    
     return Task(**task_doc)
 
 
@@ -753,7 +1632,7 @@ async def update_task(
         if task_doc["assigned_to"] != current_user.user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Can only update your own tasks")
     
-    update_data = {"updated_at": datetime.now(timezone.utc).isoformat()}
+    update_data = {"updated_at": db_now()}
     
     if task_update.title is not None:
         update_data["title"] = task_update.title
@@ -768,9 +1647,9 @@ async def update_task(
     if task_update.notes is not None:
         update_data["notes"] = task_update.notes
     if task_update.deadline is not None:
-        old_deadline = task_doc.get("deadline")
-        new_deadline = task_update.deadline.isoformat()
-        update_data["deadline"] = new_deadline
+        old_deadline = parse_db_datetime(task_doc.get("deadline"))
+        new_deadline = parse_db_datetime(task_update.deadline)
+        update_data["deadline"] = to_db_datetime(new_deadline)
         
         # Emit notification for deadline change
         if old_deadline != new_deadline:
@@ -784,16 +1663,11 @@ async def update_task(
             )
     
     await db.tasks.update_one({"id": task_id}, {"$set": update_data})
+    await stats_counters.task_status_changed(db, task_doc, task_doc.get("status"), task_update.status)
+    user_context_cache.invalidate(task_doc["assigned_to"], task_doc.get("created_by"))
     
     updated_task = await db.tasks.find_one({"id": task_id}, {"_id": 0})
     
-    if isinstance(updated_task.get('created_at'), str):
-        updated_task['created_at'] = datetime.fromisoformat(updated_task['created_at'])
-    if isinstance(updated_task.get('updated_at'), str):
-        updated_task['updated_at'] = datetime.fromisoformat(updated_task['updated_at'])
-    if isinstance(updated_task.get('deadline'), str):
-        updated_task['deadline'] = datetime.fromisoformat(updated_task['deadline'])
-    
     return Task(**updated_task)
 
 
@@ -830,15 +1704,17 @@ async def create_deadline_request(
     )
     
     doc = deadline_request.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
     
     await db.deadline_requests.insert_one(doc)
     return deadline_request
 
 
-@api_router.get("/deadline-requests", response_model=List[DeadlineRequest])
+@api_router.get("/deadline-requests", response_model=Union[List[DeadlineRequest], Page[DeadlineRequest]])
 async def get_deadline_requests(
     status: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: TokenData = Depends(get_current_user)
 ):
     query = {}
@@ -854,13 +1730,11 @@ async def get_deadline_requests(
         if status:
             query["status"] = status
     
-    requests = await db.deadline_requests.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    if limit is not None or cursor is not None:
+        requests, limit, next_cursor = await fetch_page(db.deadline_requests, query, "created_at", limit, cursor)
+        return {"items": requests, "limit": limit, "next_cursor": next_cursor}
     
-    for req in requests:
-        if isinstance(req.get('created_at'), str):
-            req['created_at'] = datetime.fromisoformat(req['created_at'])
-        if req.get('updated_at') and isinstance(req['updated_at'], str):
-            req['updated_at'] = datetime.fromisoformat(req['updated_at'])
+    requests = await db.deadline_requests.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
     return requests
 
@@ -884,7 +1758,7 @@ async def update_deadline_request(
     update_fields = {
         "status": update_data.status,
         "responded_by": current_user.user_id,
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "updated_at": db_now()
     }
     
     if update_data.response_note:
@@ -903,10 +1777,12 @@ async def update_deadline_request(
         await db.tasks.update_one(
             {"id": task_id},
             {"$set": {
-                "deadline": new_deadline,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "deadline": to_db_datetime(parse_db_datetime(new_deadline)),
+                "updated_at": db_now()
             }}
         )
+        if task:
+            user_context_cache.invalidate(task.get("assigned_to"), task.get("created_by"))
         
         # Create notification for approval
         await create_notification(
@@ -939,11 +1815,6 @@ async def update_deadline_request(
     
     updated_request = await db.deadline_requests.find_one({"id": request_id}, {"_id": 0})
     
-    if isinstance(updated_request.get('created_at'), str):
-        updated_request['created_at'] = datetime.fromisoformat(updated_request['created_at'])
-    if updated_request.get('updated_at') and isinstance(updated_request['updated_at'], str):
-        updated_request['updated_at'] = datetime.fromisoformat(updated_request['updated_at'])
-    
     return DeadlineRequest(**updated_request)
 
 
@@ -969,11 +1840,17 @@ async def check_in(
     )
     
     doc = attendance.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
     if doc['check_in']:
-        doc['check_in'] = doc['check_in'].isoformat()
+        doc['check_in'] = to_db_datetime(doc['check_in'])
     
-    await db.attendance.insert_one(doc)
+    try:
+        await db.attendance.insert_one(doc)
+    except DuplicateKeyError:
+        # attendance.user_date_unique guards against double check-in races
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Already checked in today")
+    await stats_counters.attendance_marked(db, today, attendance.status)
+    user_context_cache.invalidate(current_user.user_id)
     return attendance
 
 
@@ -994,7 +1871,7 @@ async def check_out(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Already checked out")
     
     update_data = {
-        "check_out": datetime.now(timezone.utc).isoformat()
+        "check_out": db_now()
     }
     
     if checkout_data.notes:
@@ -1004,24 +1881,21 @@ async def check_out(
         {"user_id": current_user.user_id, "date": today},
         {"$set": update_data}
     )
+    user_context_cache.invalidate(current_user.user_id)
     
     updated_attendance = await db.attendance.find_one({"user_id": current_user.user_id, "date": today}, {"_id": 0})
     
-    if isinstance(updated_attendance.get('created_at'), str):
-        updated_attendance['created_at'] = datetime.fromisoformat(updated_attendance['created_at'])
-    if isinstance(updated_attendance.get('check_in'), str):
-        updated_attendance['check_in'] = datetime.fromisoformat(updated_attendance['check_in'])
-    if isinstance(updated_attendance.get('check_out'), str):
-        updated_attendance['check_out'] = datetime.fromisoformat(updated_attendance['check_out'])
-    
     return Attendance(**updated_attendance)
 
 
-@api_router.get("/attendance", response_model=List[Attendance])
+@api_router.get("/attendance", response_model=Union[List[Attendance], Page[Attendance]])
 async def get_attendance(
+    request: Request,
     user_id: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: TokenData = Depends(get_current_user)
 ):
     # Build query
@@ -1042,15 +1916,15 @@ async def get_attendance(
     elif end_date:
         query["date"] = {"$lte": end_date}
     
-    attendance_records = await db.attendance.find(query, {"_id": 0}).sort("date", -1).to_list(1000)
+    # Full export for payroll: unbounded, streamed line by line
+    if wants_ndjson(request):
+        return stream_ndjson(db.attendance.find(query, {"_id": 0}).sort("date", -1), Attendance)
+    
+    if limit is not None or cursor is not None:
+        attendance_records, limit, next_cursor = await fetch_page(db.attendance, query, "date", limit, cursor)
+        return {"items": attendance_records, "limit": limit, "next_cursor": next_cursor}
     
-    for record in attendance_records:
-        if isinstance(record.get('created_at'), str):
-            record['created_at'] = datetime.fromisoformat(record['created_at'])
-        if isinstance(record.get('check_in'), str):
-            record['check_in'] = datetime.fromisoformat(record['check_in'])
-        if isinstance(record.get('check_out'), str):
-            record['check_out'] = datetime.fromisoformat(record['check_out'])
+    attendance_records = await db.attendance.find(query, {"_id": 0}).sort("date", -1).to_list(1000)
     
     return attendance_records
 
@@ -1070,17 +1944,22 @@ async def apply_leave(
     )
     
     doc = leave.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
+    doc['updated_at'] = to_db_datetime(doc['updated_at'])
     
     await db.leaves.insert_one(doc)
+    await stats_counters.leave_applied(db, current_user.user_id)
+    user_context_cache.invalidate(current_user.user_id)
     return leave
 
 
-@api_router.get("/leave", response_model=List[Leave])
+@api_router.get("/leave", response_model=Union[List[Leave], Page[Leave]])
 async def get_leaves(
+    request: Request,
     user_id: Optional[str] = None,
     status: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: TokenData = Depends(get_current_user)
 ):
     query = {}
@@ -1096,13 +1975,14 @@ async def get_leaves(
         if status:
             query["status"] = status
     
-    leaves = await db.leaves.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+    if wants_ndjson(request):
+        return stream_ndjson(db.leaves.find(query, {"_id": 0}).sort("created_at", -1), Leave)
     
-    for leave in leaves:
-        if isinstance(leave.get('created_at'), str):
-            leave['created_at'] = datetime.fromisoformat(leave['created_at'])
-        if isinstance(leave.get('updated_at'), str):
-            leave['updated_at'] = datetime.fromisoformat(leave['updated_at'])
+    if limit is not None or cursor is not None:
+        leaves, limit, next_cursor = await fetch_page(db.leaves, query, "created_at", limit, cursor)
+        return {"items": leaves, "limit": limit, "next_cursor": next_cursor}
+    
+    leaves = await db.leaves.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
     return leaves
 
@@ -1120,21 +2000,18 @@ async def update_leave_status(
     update_data = {
         "status": leave_update.status,
         "approved_by": current_user.user_id,
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "updated_at": db_now()
     }
     
     if leave_update.rejection_reason:
         update_data["rejection_reason"] = leave_update.rejection_reason
     
     await db.leaves.update_one({"id": leave_id}, {"$set": update_data})
+    await stats_counters.leave_status_changed(db, leave_doc.get("status"), leave_update.status)
+    user_context_cache.invalidate(leave_doc["user_id"])
     
     updated_leave = await db.leaves.find_one({"id": leave_id}, {"_id": 0})
     
-    if isinstance(updated_leave.get('created_at'), str):
-        updated_leave['created_at'] = datetime.fromisoformat(updated_leave['created_at'])
-    if isinstance(updated_leave.get('updated_at'), str):
-        updated_leave['updated_at'] = datetime.fromisoformat(updated_leave['updated_at'])
-    
     return Leave(**updated_leave)
 
 
@@ -1152,7 +2029,8 @@ async def create_announcement(
     )
     
     doc = announcement.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
+    doc['audience'] = build_audience(None, announcement.target_roles)
     
     await db.announcements.insert_one(doc)
     
@@ -1171,57 +2049,61 @@ async def create_announcement(
 @api_router.get("/announcements", response_model=List[Announcement])
 async def get_announcements(current_user: TokenData = Depends(get_current_user)):
     # Show announcements targeted to user's role or to all roles
-    query = {
-        "$or": [
-            {"target_roles": []},
-            {"target_roles": current_user.role}
-        ]
-    }
+    query = {"audience": {"$in": audience_keys(current_user.user_id, current_user.role)}}
     
     announcements = await db.announcements.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
-    for announcement in announcements:
-        if isinstance(announcement.get('created_at'), str):
-            announcement['created_at'] = datetime.fromisoformat(announcement['created_at'])
-    
     return announcements
 
 
 # ===== AI ASSISTANT =====
 async def build_user_context(user_id: str, role: str) -> str:
     """Build context snapshot from database for AI"""
-    context_parts = []
+    cached = user_context_cache.get(user_id, role)
+    if cached is not None:
+        return cached
     
-    # Fetch recent tasks
+    # Tasks, leaves and today's attendance are independent reads: issue them together
     if role in [UserRole.EMPLOYEE, UserRole.INTERN]:
-        tasks = await db.tasks.find(
+        tasks_query = db.tasks.find(
             {"assigned_to": user_id},
             {"_id": 0, "id": 1, "title": 1, "status": 1, "deadline": 1, "priority": 1}
         ).sort("created_at", -1).limit(10).to_list(10)
-        
-        if tasks:
-            task_summary = "Your current tasks (up to 10):\n"
-            for t in tasks:
-                deadline_str = t.get('deadline', 'No deadline')
-                task_summary += f"  - [{t['status']}] {t['title']} (Priority: {t.get('priority', 'medium')}, Deadline: {deadline_str})\n"
-            context_parts.append(task_summary)
-    
     elif role == UserRole.TEAM_LEAD:
-        tasks = await db.tasks.find(
+        tasks_query = db.tasks.find(
             {"created_by": user_id},
             {"_id": 0, "id": 1, "title": 1, "status": 1, "assigned_to": 1}
         ).sort("created_at", -1).limit(10).to_list(10)
-        
-        if tasks:
-            task_summary = f"Team tasks you created (up to 10): {len(tasks)} tasks\n"
-            context_parts.append(task_summary)
+    else:
+        tasks_query = asyncio.sleep(0, result=[])
+    
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    tasks, leaves, attendance = await asyncio.gather(
+        tasks_query,
+        db.leaves.find(
+            {"user_id": user_id},
+            {"_id": 0, "status": 1, "leave_type": 1, "start_date": 1, "end_date": 1}
+        ).sort("created_at", -1).limit(5).to_list(5),
+        db.attendance.find_one(
+            {"user_id": user_id, "date": today},
+            {"_id": 0, "status": 1, "work_mode": 1, "check_in": 1, "check_out": 1}
+        )
+    )
+    
+    context_parts = []
     
-    # Fetch recent leaves
-    leaves = await db.leaves.find(
-        {"user_id": user_id},
-        {"_id": 0, "status": 1, "leave_type": 1, "start_date": 1, "end_date": 1}
-    ).sort("created_at", -1).limit(5).to_list(5)
+    # Recent tasks
+    if tasks and role in [UserRole.EMPLOYEE, UserRole.INTERN]:
+        task_summary = "Your current tasks (up to 10):\n"
+        for t in tasks:
+            deadline_str = t.get('deadline', 'No deadline')
+            task_summary += f"  - [{t['status']}] {t['title']} (Priority: {t.get('priority', 'medium')}, Deadline: {deadline_str})\n"
+        context_parts.append(task_summary)
+    elif tasks:
+        task_summary = f"Team tasks you created (up to 10): {len(tasks)} tasks\n"
+        context_parts.append(task_summary)
     
+    # Recent leaves
     if leaves:
         leave_summary = "Your recent leave requests (up to 5):\n"
         for l in leaves:
@@ -1229,12 +2111,6 @@ async def build_user_context(user_id: str, role: str) -> str:
         context_parts.append(leave_summary)
     
     # Today's attendance
-    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
-    attendance = await db.attendance.find_one(
-        {"user_id": user_id, "date": today},
-        {"_id": 0, "status": 1, "work_mode": 1, "check_in": 1, "check_out": 1}
-    )
-    
     if attendance:
         att_summary = f"Today's attendance: {attendance['status']} ({attendance['work_mode']})"
         if attendance.get('check_in'):
@@ -1243,9 +2119,521 @@ async def build_user_context(user_id: str, role: str) -> str:
             att_summary += f", Checked out: {attendance['check_out']}"
         context_parts.append(att_summary)
     
+    snapshot = ""
     if context_parts:
-        return "\n\nCONTEXT SNAPSHOT FOR THIS USER:\n" + "\n".join(context_parts)
-    return ""
+        snapshot = "\n\nCONTEXT SNAPSHOT FOR THIS USER:\n" + "\n".join(context_parts)
+    user_context_cache.put(user_id, role, snapshot)
+    return snapshot
+
+
+# Hard cap on system prompt + session memory + message; memory gets what's left
+AI_PROMPT_TOKEN_BUDGET = int(os.environ.get('AI_PROMPT_TOKEN_BUDGET', '6000'))
+session_memory = None
+
+
+def get_session_memory():
+    global session_memory
+    if session_memory is None:
+        from backend.services.session_memory import SessionMemory
+        session_memory = SessionMemory()
+    return session_memory
+
+
+async def session_prompt_block(user_id: str, session_id: Optional[str], base_prompt: str, message: str) -> str:
+    """Recent turns and rolling summary for this session, sized to fit AI_PROMPT_TOKEN_BUDGET"""
+    from backend.services.session_memory import estimate_tokens
+    
+    memory = get_session_memory()
+    doc = await memory.load(db, user_id, session_id)
+    budget = AI_PROMPT_TOKEN_BUDGET - estimate_tokens(base_prompt) - estimate_tokens(message)
+    return memory.render(doc, budget)
+
+
+AI_MESSAGE_QUEUE_SIZE = int(os.environ.get('AI_MESSAGE_QUEUE_SIZE', '1000'))
+AI_MESSAGE_BATCH_SIZE = int(os.environ.get('AI_MESSAGE_BATCH_SIZE', '100'))
+AI_MESSAGE_FLUSH_SECONDS = float(os.environ.get('AI_MESSAGE_FLUSH_SECONDS', '0.5'))
+
+
+class AIMessageWriter:
+    """Write-behind queue for ai_messages transcripts.
+
+    Responses enqueue the document and return; a background task batches
+    queued documents into insert_many once AI_MESSAGE_BATCH_SIZE accumulate
+    or AI_MESSAGE_FLUSH_SECONDS pass. When the queue is full, or the writer
+    isn't running (tests, shutdown), the insert happens inline instead.
+    """
+
+    def __init__(self, maxsize: int = AI_MESSAGE_QUEUE_SIZE, batch_size: int = AI_MESSAGE_BATCH_SIZE, flush_seconds: float = AI_MESSAGE_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        # Taken off the queue but not yet handed to a write, and the write in progress;
+        # flush() settles both, so cancelling the loop in stop() never loses documents
+        self._batch: List[Dict[str, Any]] = []
+        self._writing: Optional[asyncio.Future] = None
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.sync_writes = 0
+        self.failed = 0
+        self.max_batch = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, doc: Dict[str, Any]):
+        if self.running:
+            try:
+                self._queue.put_nowait(doc)
+                self.queued += 1
+                return
+            except asyncio.QueueFull:
+                pass
+        self.sync_writes += 1
+        await db.ai_messages.insert_one(doc)
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            # Unordered: one bad document doesn't block the rest of the batch
+            await db.ai_messages.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"ai_messages batch of {len(batch)} failed: {e}")
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(batch))
+
+    def _take(self, batch: List[Dict[str, Any]]):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _run(self):
+        while True:
+            doc = await self._queue.get()
+            self._batch = [doc]
+            deadline = time.monotonic() + self.flush_seconds
+            self._take(self._batch)
+            while len(self._batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    doc = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                # Re-read self._batch after the await: flush() may have swapped it out
+                self._batch.append(doc)
+                self._take(self._batch)
+            batch, self._batch = self._batch, []
+            if batch:
+                self._writing = asyncio.ensure_future(self._write(batch))
+                await asyncio.shield(self._writing)
+
+    async def flush(self):
+        """Write everything queued or in flight; readers call this for read-your-writes"""
+        batch, self._batch = self._batch, []
+        self._take(batch)
+        while batch:
+            await self._write(batch)
+            batch = []
+            self._take(batch)
+        if self._writing is not None and not self._writing.done():
+            await asyncio.shield(self._writing)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "depth": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "queued": self.queued,
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "sync_writes": self.sync_writes,
+            "failed": self.failed,
+        }
+
+
+ai_message_writer = AIMessageWriter()
+
+
+# ===== LLM PROVIDERS =====
+# One long-lived client per (provider, model, key) instead of per message:
+# Gemini keeps its configured gRPC channel and GenerativeModel, OpenAI-style
+# calls go through litellm with a shared AsyncOpenAI on a pooled httpx client.
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '16'))
+GEMINI_MODEL = 'gemini-2.0-flash'
+OPENAI_MODEL = 'gpt-3.5-turbo'
+# Redirects provider traffic, e.g. to benchmarks/fake_llm_server.py for offline load tests
+LLM_BASE_URL = os.environ.get('LLM_BASE_URL') or None
+# Each attempt gets LLM_TIMEOUT_SECONDS; retries stop once LLM_DEADLINE_SECONDS is spent
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '20'))
+LLM_DEADLINE_SECONDS = float(os.environ.get('LLM_DEADLINE_SECONDS', '45'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BACKOFF_SECONDS = float(os.environ.get('LLM_RETRY_BACKOFF_SECONDS', '0.5'))
+# Hedging doubles provider spend on slow calls, so it is opt-in
+LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE', 'false').lower() == 'true'
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get('LLM_BREAKER_COOLDOWN_SECONDS', '30'))
+
+
+class LlmUnavailableError(Exception):
+    """Provider call gave up: deadline spent, retries exhausted or breaker open"""
+
+    def __init__(self, reason: str, cause: Optional[BaseException] = None):
+        super().__init__(f"LLM unavailable ({reason}): {cause}" if cause else f"LLM unavailable ({reason})")
+        self.reason = reason
+        self.cause = cause
+
+
+# Besides 5xx: request timeout and rate limiting are worth retrying; other 4xx are not
+TRANSIENT_STATUS_CODES = {408, 429}
+
+
+def is_transient_llm_error(error: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx: retried and counted against the provider.
+
+    Everything else (bad key, other 4xx, a blocked response) fails the same
+    way on every attempt, so it is raised at once and leaves the breaker alone.
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError, APIConnectionError)):
+        return True
+    # openai/litellm carry status_code; google.api_core errors carry the HTTP status as code
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(error, "code", None)
+    return isinstance(status_code, int) and (status_code in TRANSIENT_STATUS_CODES or status_code >= 500)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker.
+
+    Closed passes everything. After failure_threshold failures in a row it
+    opens and rejects calls for cooldown_seconds, then goes half-open and lets
+    a single probe through: success closes it, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, cooldown_seconds: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                self.rejected += 1
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        # A probe that was cancelled without an outcome must not wedge half-open
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "retry_in_s": round(max(0.0, self.cooldown_seconds - (time.monotonic() - self.opened_at)), 1) if self.state == "open" else 0.0,
+        }
+
+
+class ProviderPool:
+    """Warm client for one provider/model, gated by a concurrency semaphore.
+
+    call() wraps a request in the resilience policy: per-attempt timeout under
+    an overall deadline, jittered retries, an optional hedge once the call
+    outlives the pool's p95, and a circuit breaker that fails fast while open.
+    """
+
+    def __init__(self, provider: str, model: str, client: Any, max_concurrency: int):
+        self.provider = provider
+        self.model = model
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = CircuitBreaker()
+        self.latency_ms: deque = deque(maxlen=500)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.saturated = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.short_circuits = 0
+        self.non_retryable = 0
+        self.queue_timeouts = 0
+
+    async def _take_slot(self, timeout: Optional[float] = None):
+        """Wait for a concurrency slot.
+
+        Waiting past timeout is our own saturation, not a provider fault: it
+        raises LlmUnavailableError("saturated") and never reaches the breaker.
+        """
+        self.requests += 1
+        if self._semaphore.locked():
+            # Every slot is busy: this request queues behind the limit
+            self.saturated += 1
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            raise LlmUnavailableError("saturated")
+        finally:
+            self.waiting -= 1
+        self.wait_seconds += time.perf_counter() - started
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _give_slot(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None):
+        await self._take_slot(timeout)
+        try:
+            yield self.client
+        finally:
+            self._give_slot()
+
+    def hedge_delay(self) -> Optional[float]:
+        if not LLM_HEDGE_ENABLED or len(self.latency_ms) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return latency_percentiles(self.latency_ms)["p95"] / 1000
+
+    async def _attempt(self, request: Callable[[Any], Awaitable[Any]], hedge: bool = False) -> Any:
+        # The caller holds the slot, so this times the provider alone
+        started = time.perf_counter()
+        result = await request(self.client)
+        self.latency_ms.append((time.perf_counter() - started) * 1000)
+        if hedge:
+            self.hedge_wins += 1
+        return result
+
+    async def _hedged(self, request: Callable[[Any], Awaitable[Any]], timeout: float, queue_timeout: float) -> Any:
+        # The per-attempt timeout starts once a slot is held; queueing is bounded by the deadline only
+        async with self.acquire(queue_timeout):
+            started = time.monotonic()
+            tasks = [asyncio.ensure_future(self._attempt(request))]
+            hedge_slot = False
+            try:
+                hedge_after = self.hedge_delay()
+                if hedge_after is not None and hedge_after < timeout:
+                    done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                    if not done:
+                        if self._semaphore.locked():
+                            # Queueing the hedge behind a full pool would only add load
+                            self.hedges_skipped += 1
+                        else:
+                            await self._take_slot()
+                            hedge_slot = True
+                            self.hedges += 1
+                            tasks.append(asyncio.ensure_future(self._attempt(request, hedge=True)))
+                error: Optional[BaseException] = None
+                remaining = max(0.0, timeout - (time.monotonic() - started))
+                for finished in asyncio.as_completed(tasks, timeout=remaining):
+                    try:
+                        return await finished
+                    except asyncio.TimeoutError:
+                        raise
+                    except Exception as e:
+                        # The other copy may still succeed
+                        error = e
+                raise error
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+                # Slots are released only once the cancelled copies have actually stopped
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if hedge_slot:
+                    self._give_slot()
+
+    async def call(self, request: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Run request(client) under the deadline/retry/hedge/breaker policy.
+
+        Raises LlmUnavailableError instead of letting a browned-out provider
+        hold the caller past the deadline.
+        """
+        deadline = time.monotonic() + LLM_DEADLINE_SECONDS
+        error: Optional[BaseException] = None
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                self.short_circuits += 1
+                raise LlmUnavailableError("circuit_open", error)
+            try:
+                result = await self._hedged(request, min(LLM_TIMEOUT_SECONDS, remaining), remaining)
+            except LlmUnavailableError:
+                # Local queue wait outlived the deadline; the provider did nothing wrong
+                raise
+            except Exception as e:
+                if not is_transient_llm_error(e):
+                    self.non_retryable += 1
+                    raise
+                error = e
+                self.failures += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                self.breaker.record_failure()
+                if attempt < LLM_MAX_RETRIES:
+                    self.retries += 1
+                    # Full jitter keeps retries from a brownout from arriving in lockstep
+                    backoff = random.uniform(0, LLM_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                    await asyncio.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+                continue
+            finally:
+                self.breaker.release()
+            self.breaker.record_success()
+            return result
+        raise LlmUnavailableError("timeout" if error is None or isinstance(error, asyncio.TimeoutError) else "error", error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "saturation": round(self.in_flight / self.max_concurrency, 3),
+            "requests": self.requests,
+            "saturated": self.saturated,
+            "avg_wait_ms": round(self.wait_seconds / self.requests * 1000, 3) if self.requests else 0.0,
+            "latency_ms": latency_percentiles(self.latency_ms),
+            "timeout_s": LLM_TIMEOUT_SECONDS,
+            "deadline_s": LLM_DEADLINE_SECONDS,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "short_circuits": self.short_circuits,
+            "non_retryable": self.non_retryable,
+            "queue_timeouts": self.queue_timeouts,
+            "breaker": self.breaker.stats(),
+        }
+
+
+class LlmProviderRegistry:
+    """Process-wide provider pools, created lazily or warmed at startup"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._pools: Dict[Tuple[str, str, str], ProviderPool] = {}
+        self._gemini_key: Optional[str] = None
+
+    @staticmethod
+    def provider_for_key(api_key: str) -> str:
+        return "gemini" if api_key.startswith("AIza") else "openai"
+
+    def _build_client(self, provider: str, api_key: str) -> Any:
+        if provider == "gemini":
+            # genai.configure is process-global; re-run it only when the key changes
+            if self._gemini_key != api_key:
+                if LLM_BASE_URL:
+                    # gRPC can't target a plain-HTTP endpoint; REST can
+                    genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": LLM_BASE_URL})
+                else:
+                    genai.configure(api_key=api_key)
+                self._gemini_key = api_key
+            return genai.GenerativeModel(GEMINI_MODEL)
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=LLM_BASE_URL,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        )
+
+    def pool(self, api_key: str) -> ProviderPool:
+        provider = self.provider_for_key(api_key)
+        model = GEMINI_MODEL if provider == "gemini" else OPENAI_MODEL
+        # Keys are identified by a digest so they never show up in metrics or logs
+        key = (provider, model, hashlib.sha256(api_key.encode()).hexdigest()[:12])
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = ProviderPool(provider, model, self._build_client(provider, api_key), self.max_concurrency)
+            self._pools[key] = pool
+        return pool
+
+    async def close(self):
+        for pool in self._pools.values():
+            if isinstance(pool.client, AsyncOpenAI):
+                await pool.client.close()
+        self._pools.clear()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [pool.stats() for pool in self._pools.values()]
+
+
+llm_registry = LlmProviderRegistry()
+
+
+def configured_llm_key() -> Optional[str]:
+    return os.environ.get('GOOGLE_API_KEY') or os.environ.get('OPENAI_API_KEY') or os.environ.get('EMERGENT_LLM_KEY')
 
 
 # Mock classes for Emergent Integrations (since package is missing)
@@ -1262,41 +2650,110 @@ class LlmChat:
     def with_model(self, provider, model):
         pass
         
-    async def send_message(self, user_message):
+    async def send_message(self, user_message, fallback: bool = True):
+        """Return the provider's reply.
+
+        When the provider is unavailable the deterministic demo reply is
+        returned, or LlmUnavailableError is raised if fallback is False so the
+        caller can choose its own fallback.
+        """
         # If using the demo key, return mock response
         if not self.api_key or self.api_key.startswith("sk-emergent"):
             return self.mock_response(user_message)
             
-        # Use Google Generative AI for Google keys
-        if self.api_key.startswith("AIza"):
-            try:
-                genai.configure(api_key=self.api_key)
-                model = genai.GenerativeModel('gemini-2.0-flash')
-                prompt = f"{self.system_message}\n\nUser: {user_message.text}"
+        pool = llm_registry.pool(self.api_key)
+        if pool.provider == "gemini":
+            # Use Google Generative AI for Google keys
+            prompt = f"{self.system_message}\n\nUser: {user_message.text}"
+            
+            async def request(model):
                 response = await model.generate_content_async(prompt)
                 return response.text
-            except Exception as e:
-                # logging.error(f"Gemini error: {e}")
-                print(f"Gemini error: {e}")
-                return f"Error connecting to Gemini: {str(e)}. Falling back to demo mode.\n\n" + self.mock_response(user_message)
+        else:
+            # Use litellm for others (OpenAI)
+            async def request(openai_client):
+                response = await acompletion(
+                    model=pool.model,
+                    messages=[
+                        {"role": "system", "content": self.system_message},
+                        {"role": "user", "content": user_message.text}
+                    ],
+                    api_key=self.api_key,
+                    api_base=LLM_BASE_URL,
+                    client=openai_client
+                )
+                return response.choices[0].message.content
+        
+        try:
+            return await pool.call(request)
+        except LlmUnavailableError as e:
+            logger.warning(f"{pool.provider} unavailable: {e}")
+            if not fallback:
+                raise
+            return self.mock_response(user_message)
 
-        # Use litellm for others (OpenAI)
+    async def stream_message(self, user_message):
+        """Yield response text chunks as the provider produces them"""
+        if not self.api_key or self.api_key.startswith("sk-emergent"):
+            yield self.mock_response(user_message)
+            return
+        
+        pool = llm_registry.pool(self.api_key)
+        if not pool.breaker.allow():
+            pool.short_circuits += 1
+            yield self.mock_response(user_message)
+            return
+        
+        started = False
         try:
-            # Auto-detect model if not set or if generic
-            model = "gpt-3.5-turbo"
-            
-            response = await acompletion(
-                model=model,
-                messages=[
-                    {"role": "system", "content": self.system_message},
-                    {"role": "user", "content": user_message.text}
-                ],
-                api_key=self.api_key
-            )
-            return response.choices[0].message.content
+            # The pool slot is held for the whole stream, not just the first byte
+            async with pool.acquire(LLM_DEADLINE_SECONDS) as provider_client:
+                if pool.provider == "gemini":
+                    prompt = f"{self.system_message}\n\nUser: {user_message.text}"
+                    response = await asyncio.wait_for(
+                        provider_client.generate_content_async(prompt, stream=True),
+                        LLM_TIMEOUT_SECONDS
+                    )
+                    async for chunk in response:
+                        if chunk.text:
+                            started = True
+                            yield chunk.text
+                else:
+                    response = await asyncio.wait_for(
+                        acompletion(
+                            model=pool.model,
+                            messages=[
+                                {"role": "system", "content": self.system_message},
+                                {"role": "user", "content": user_message.text}
+                            ],
+                            api_key=self.api_key,
+                            api_base=LLM_BASE_URL,
+                            client=provider_client,
+                            stream=True
+                        ),
+                        LLM_TIMEOUT_SECONDS
+                    )
+                    async for part in response:
+                        delta = part.choices[0].delta.content if part.choices else None
+                        if delta:
+                            started = True
+                            yield delta
+            pool.breaker.record_success()
         except Exception as e:
-            print(f"Litellm error: {e}")
-            return f"Error connecting to AI provider: {str(e)}. Falling back to demo mode.\n\n" + self.mock_response(user_message)
+            logger.warning(f"{pool.provider} stream error: {e}")
+            if is_transient_llm_error(e):
+                pool.failures += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    pool.timeouts += 1
+                pool.breaker.record_failure()
+            elif not isinstance(e, LlmUnavailableError):
+                pool.non_retryable += 1
+            if started:
+                # Tokens already went out; a fallback would garble the reply
+                raise
+            yield self.mock_response(user_message)
+        finally:
+            pool.breaker.release()
 
     def mock_response(self, user_message):
         msg = user_message.text.lower()
@@ -1312,14 +2769,112 @@ class LlmChat:
             return f"I understood: '{user_message.text}'. As this is a local demo, I can only respond to basic commands about tasks, leave, and attendance."
 
 
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def latency_percentiles(samples) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"p50": None, "p95": None}
+    ordered = sorted(samples)
+    return {
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+class StreamLatencyStats:
+    """Rolling time-to-first-token and total latency for streamed replies"""
+
+    def __init__(self, window: int = 500):
+        self.streams = 0
+        self.errors = 0
+        self.ttft_ms: deque = deque(maxlen=window)
+        self.total_ms: deque = deque(maxlen=window)
+
+    def record(self, ttft_ms: Optional[float], total_ms: float):
+        self.streams += 1
+        if ttft_ms is not None:
+            self.ttft_ms.append(ttft_ms)
+        self.total_ms.append(total_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "streams": self.streams,
+            "errors": self.errors,
+            "ttft_ms": latency_percentiles(self.ttft_ms),
+            "total_ms": latency_percentiles(self.total_ms),
+        }
+
+
+chat_stream_stats = StreamLatencyStats()
+
+
+def wants_sse(request: Request) -> bool:
+    return SSE_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_chat_reply(chat: "LlmChat", user_message: "UserMessage", ai_request: AIRequest, user_id: str) -> StreamingResponse:
+    """SSE: one `token` event per provider chunk, then `done` with latency; the AIMessage is saved at the end"""
+    async def generate():
+        started = time.perf_counter()
+        ttft_ms = None
+        parts = []
+        try:
+            async for text in chat.stream_message(user_message):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        except Exception as e:
+            chat_stream_stats.errors += 1
+            logger.error(f"AI chat stream error: {str(e)}")
+            yield sse_event("error", {"error": str(e), "session_id": ai_request.session_id})
+            return
+        
+        total_ms = (time.perf_counter() - started) * 1000
+        chat_stream_stats.record(ttft_ms, total_ms)
+        
+        ai_message = AIMessage(
+            user_id=user_id,
+            session_id=ai_request.session_id,
+            message=ai_request.message,
+            response="".join(parts),
+            action_type="chat"
+        )
+        doc = ai_message.model_dump()
+        doc['created_at'] = to_db_datetime(doc['created_at'])
+        await asyncio.gather(
+            ai_message_writer.submit(doc),
+            get_session_memory().record(db, user_id, ai_request.session_id, ai_request.message, ai_message.response)
+        )
+        
+        yield sse_event("done", {
+            "session_id": ai_request.session_id,
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round(total_ms, 1)
+        })
+    
+    # X-Accel-Buffering stops nginx-style proxies from holding tokens back
+    return StreamingResponse(
+        generate(),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @api_router.post("/ai/chat")
 async def ai_chat(
     ai_request: AIRequest,
+    request: Request,
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
         # Check for keys (prioritize real keys)
-        llm_key = os.environ.get('GOOGLE_API_KEY') or os.environ.get('OPENAI_API_KEY') or os.environ.get('EMERGENT_LLM_KEY')
+        llm_key = configured_llm_key()
         if not llm_key:
             return {
                 "response": "AI service is temporarily unavailable. Please ensure EMERGENT_LLM_KEY is configured.",
@@ -1347,6 +2902,9 @@ IMPORTANT INSTRUCTIONS:
 - If user says things like "kal ka leave", "deadline badha do", "WFH mark karo" - understand the intent
 - Provide helpful, actionable responses{user_context}
 """
+        system_message += await session_prompt_block(
+            current_user.user_id, ai_request.session_id, system_message, ai_request.message
+        )
         
         chat = LlmChat(
             api_key=llm_key,
@@ -1359,6 +2917,8 @@ IMPORTANT INSTRUCTIONS:
         
         # Send message
         user_message = UserMessage(text=ai_request.message)
+        if wants_sse(request):
+            return stream_chat_reply(chat, user_message, ai_request, current_user.user_id)
         response = await chat.send_message(user_message)
         
         # Save to database
@@ -1371,8 +2931,11 @@ IMPORTANT INSTRUCTIONS:
         )
         
         doc = ai_message.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.ai_messages.insert_one(doc)
+        doc['created_at'] = to_db_datetime(doc['created_at'])
+        await asyncio.gather(
+            ai_message_writer.submit(doc),
+            get_session_memory().record(db, current_user.user_id, ai_request.session_id, ai_request.message, response)
+        )
         
         return {"response": response, "session_id": ai_request.session_id}
     
@@ -1387,68 +2950,22 @@ IMPORTANT INSTRUCTIONS:
         }
 
 
-@api_router.post("/ai/execute")
-async def ai_execute(
-    ai_request: AIRequest,
-    current_user: TokenData = Depends(get_current_user)
-):
-    try:
-        from backend.services.ai_actions import AIActionExecutor, get_action_definitions
-        
-        # Check for keys (prioritize real keys)
-        llm_key = os.environ.get('GOOGLE_API_KEY') or os.environ.get('OPENAI_API_KEY') or os.environ.get('EMERGENT_LLM_KEY')
-        if not llm_key:
-            return {
-                "message": "AI service is temporarily unavailable. Please ensure EMERGENT_LLM_KEY is configured.",
-                "thought": "AI service unavailable",
-                "actionsExecuted": [],
-                "session_id": ai_request.session_id
-            }
-        
-        # Get current user details
-        user_doc = await db.users.find_one({"id": current_user.user_id})
-        user_email = user_doc.get("email") if user_doc else current_user.email
-        
-        # Build context from database
-        user_context = await build_user_context(current_user.user_id, current_user.role)
-        
-        # Get available actions for user's role
-        all_actions = get_action_definitions()
-        allowed_actions = [
-            a for a in all_actions 
-            if current_user.role in a["permissions"]
-        ]
-        
-        # Build actions documentation
-        actions_doc = []
-        for a in allowed_actions:
-            params_str = ", ".join([f"{k}: {v}" for k, v in a["parameters"].items()])
-            actions_doc.append(f"  {a['name']}({params_str})")
-            actions_doc.append(f"    Purpose: {a['description']}")
-        
-        actions_list = "\n".join(actions_doc)
-        
-        # Calculate dates for context
-        today = datetime.now(timezone.utc)
-        tomorrow = today + timedelta(days=1)
-        next_monday = today + timedelta(days=(7 - today.weekday()))
-        next_friday = today + timedelta(days=(4 - today.weekday()) if today.weekday() <= 4 else (11 - today.weekday()))
-        
-        system_prompt = f"""You are OperAI Intelligence - the operational AI for OperAI workforce platform.
+# ===== EXECUTE PROMPT =====
+# The /ai/execute system prompt is compiled once per role: the header, the
+# role's action list and the rules/examples never change between calls, so
+# they form a byte-identical prefix (provider-side prompt caching can hit it).
+# Per-request fields - user, dates, live context - are appended last.
+EXECUTE_PROMPT_HEADER = """You are OperAI Intelligence - the operational AI for OperAI workforce platform.
 You can EXECUTE ACTIONS in the system through natural language commands.
 
-CURRENT CONTEXT:
-User: {user_email}
-Role: {current_user.role}
-Today: {today.strftime('%Y-%m-%d')} ({today.strftime('%A')})
-Tomorrow: {tomorrow.strftime('%Y-%m-%d')}
-Next Monday: {next_monday.strftime('%Y-%m-%d')}
-Next Friday: {next_friday.strftime('%Y-%m-%d')}{user_context}
-
 AVAILABLE ACTIONS:
-{actions_list}
+@ACTIONS@
 
-IMPORTANT LANGUAGE UNDERSTANDING:
+"""
+
+# Only placeholder left after compilation is @TOMORROW@ (the leave example),
+# resolved once per day rather than per request.
+EXECUTE_PROMPT_RULES = """IMPORTANT LANGUAGE UNDERSTANDING:
 - User may use INFORMAL, CASUAL language
 - Understand mixed Hindi-English (e.g., "kal ka leave laga do", "mera deadline aage badha do", "aaj WFH mark kar do")
 - Map casual requests to the appropriate actions
@@ -1491,137 +3008,137 @@ EXAMPLES:
 
 Input: "Show my pending tasks"
 Output:
-{{
+{
   "thought": "User wants to see their todo tasks",
   "actions": [
-    {{
+    {
       "name": "list_user_tasks",
-      "params": {{"status": "todo"}}
-    }}
+      "params": {"status": "todo"}
+    }
   ]
-}}
+}
 
 Input: "Summarize my work"
 Output:
-{{
+{
   "thought": "User wants a summary of their tasks with urgent items highlighted",
   "actions": [
-    {{
+    {
       "name": "summarize_tasks",
-      "params": {{}}
-    }}
+      "params": {}
+    }
   ]
-}}
+}
 
 Input: "check my attendance"
 Output:
-{{
+{
   "thought": "User wants to see their attendance summary",
   "actions": [
-    {{
+    {
       "name": "get_attendance_summary",
-      "params": {{}}
-    }}
+      "params": {}
+    }
   ]
-}}
+}
 
 Input: "aaj ki attendance dikhao"
 Output:
-{{
+{
   "thought": "User asking for today's attendance in Hindi-English",
   "actions": [
-    {{
+    {
       "name": "get_attendance_summary",
-      "params": {{}}
-    }}
+      "params": {}
+    }
   ]
-}}
+}
 
 Input: "attendance of emp1@operai.demo"
 Output:
-{{
+{
   "thought": "User wants attendance summary for a specific employee by email",
   "actions": [
-    {{
+    {
       "name": "get_attendance_summary",
-      "params": {{
+      "params": {
         "user_email": "emp1@operai.demo"
-      }}
-    }}
+      }
+    }
   ]
-}}
+}
 
 Input: "show attendance of Ronnie"
 Output:
-{{
+{
   "thought": "User wants attendance for Ronnie. Need to identify user by email if known, otherwise ask.",
   "actions": [
-    {{
+    {
       "name": "get_attendance_summary",
-      "params": {{
+      "params": {
         "user_email": "ronnie@operai.demo"
-      }}
-    }}
+      }
+    }
   ]
-}}
+}
 
 Input: "intern ka attendance dikhado"
 Output:
-{{
+{
   "thought": "User wants attendance for intern. Need specific email to proceed.",
   "actions": [
-    {{
+    {
       "name": "get_attendance_summary",
-      "params": {{
+      "params": {
         "user_email": "intern@operai.demo"
-      }}
-    }}
+      }
+    }
   ]
-}}
+}
 
 Input: "kal ka leave laga do"
 Output:
-{{
+{
   "thought": "User wants to apply leave for tomorrow",
   "actions": [
-    {{
+    {
       "name": "apply_leave",
-      "params": {{
-        "start_date": "{tomorrow.strftime('%Y-%m-%d')}",
-        "end_date": "{tomorrow.strftime('%Y-%m-%d')}",
+      "params": {
+        "start_date": "@TOMORROW@",
+        "end_date": "@TOMORROW@",
         "leave_type": "casual",
         "reason": "Personal"
-      }}
-    }}
+      }
+    }
   ]
-}}
+}
 
 Input: "Show my team members"
 Output:
-{{
+{
   "thought": "User wants to see their direct reports",
   "actions": [
-    {{
+    {
       "name": "get_team_members",
-      "params": {{}}
-    }}
+      "params": {}
+    }
   ]
-}}
+}
 
 Input: "Show pending tasks for lead@operai.demo"
 Output:
-{{
+{
   "thought": "HR wants to view pending tasks for the team lead",
   "actions": [
-    {{
+    {
       "name": "list_user_tasks",
-      "params": {{
+      "params": {
         "user_email": "lead@operai.demo",
         "status": "todo"
-      }}
-    }}
+      }
+    }
   ]
-}}
+}
 
 GUIDELINES:
 - When user mentions an email address for task assignment, use the "assigned_to_email" parameter
@@ -1632,68 +3149,310 @@ GUIDELINES:
 
 OUTPUT FORMAT - CRITICAL:
 Return ONLY a JSON object with these keys:
-{{
+{
   "thought": "Brief explanation of what you understood in simple English",
   "actions": [
-    {{
+    {
       "name": "action_name",
-      "params": {{
+      "params": {
         "param1": "value1"
-      }}
-    }}
+      }
+    }
   ]
-}}
+}
 
 DO NOT include markdown code fences (```), extra prose, or anything outside the JSON object.
 If you can't perform an action, return empty actions array [] and explain why in 'thought'.
 """
+
+EXECUTE_PROMPT_CONTEXT = """
+CURRENT CONTEXT:
+User: {user_email}
+Role: {role}
+Today: {today} ({weekday})
+Tomorrow: {tomorrow}
+Next Monday: {next_monday}
+Next Friday: {next_friday}{user_context}
+"""
+
+
+class ExecutePromptCompiler:
+    """Per-role compiled prompt prefixes plus build-time/size metrics"""
+
+    def __init__(self, window: int = 500):
+        self._templates: Dict[str, str] = {}
+        self._allowed: Dict[str, set] = {}
+        self._daily: Dict[str, str] = {}
+        self._daily_date: Optional[str] = None
+        self.builds = 0
+        self.compiles = 0
+        self.build_ms: deque = deque(maxlen=window)
+        self.prompt_bytes: Dict[str, Dict[str, int]] = {}
+
+    def compile(self, role: str) -> str:
+        from backend.services.ai_actions import get_action_definitions
         
-        # Call AI to determine actions
-        chat = LlmChat(
-            api_key=llm_key,
-            session_id=ai_request.session_id,
-            system_message=system_prompt
+        actions_doc = []
+        allowed = set()
+        for a in get_action_definitions():
+            if role not in a["permissions"]:
+                continue
+            allowed.add(a["name"])
+            params_str = ", ".join([f"{k}: {v}" for k, v in a["parameters"].items()])
+            actions_doc.append(f"  {a['name']}({params_str})")
+            actions_doc.append(f"    Purpose: {a['description']}")
+        
+        template = EXECUTE_PROMPT_HEADER.replace("@ACTIONS@", "\n".join(actions_doc)) + EXECUTE_PROMPT_RULES
+        self._templates[role] = template
+        self._allowed[role] = allowed
+        self.compiles += 1
+        return template
+
+    def allowed_actions(self, role: str) -> set:
+        if role not in self._allowed:
+            self.compile(role)
+        return self._allowed[role]
+
+    def compile_all(self, roles: List[str]):
+        for role in roles:
+            self.compile(role)
+
+    def _prefix(self, role: str, tomorrow: str) -> str:
+        if self._daily_date != tomorrow:
+            self._daily = {}
+            self._daily_date = tomorrow
+        prefix = self._daily.get(role)
+        if prefix is None:
+            template = self._templates.get(role) or self.compile(role)
+            prefix = template.replace("@TOMORROW@", tomorrow)
+            self._daily[role] = prefix
+        return prefix
+
+    def render(self, role: str, user_email: str, user_context: str) -> str:
+        started = time.perf_counter()
+        today = datetime.now(timezone.utc)
+        tomorrow = today + timedelta(days=1)
+        next_monday = today + timedelta(days=(7 - today.weekday()))
+        next_friday = today + timedelta(days=(4 - today.weekday()) if today.weekday() <= 4 else (11 - today.weekday()))
+        
+        prefix = self._prefix(role, tomorrow.strftime('%Y-%m-%d'))
+        prompt = prefix + EXECUTE_PROMPT_CONTEXT.format(
+            user_email=user_email,
+            role=role,
+            today=today.strftime('%Y-%m-%d'),
+            weekday=today.strftime('%A'),
+            tomorrow=tomorrow.strftime('%Y-%m-%d'),
+            next_monday=next_monday.strftime('%Y-%m-%d'),
+            next_friday=next_friday.strftime('%Y-%m-%d'),
+            user_context=user_context
         )
         
-        chat.with_model("gemini", "gemini-2.5-flash")
-        user_message = UserMessage(text=ai_request.message)
-        ai_response = await chat.send_message(user_message)
+        self.builds += 1
+        self.build_ms.append((time.perf_counter() - started) * 1000)
+        self.prompt_bytes[role] = {
+            "prefix": len(prefix.encode("utf-8")),
+            "total": len(prompt.encode("utf-8")),
+        }
+        return prompt
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "compiled_roles": sorted(self._templates),
+            "compiles": self.compiles,
+            "builds": self.builds,
+            "build_ms": latency_percentiles(self.build_ms),
+            "prompt_bytes": self.prompt_bytes,
+        }
+
+
+execute_prompts = ExecutePromptCompiler()
+
+
+INTENT_FAST_PATH_ENABLED = os.environ.get('INTENT_FAST_PATH', 'true').lower() == 'true'
+INTENT_MIN_CONFIDENCE = float(os.environ.get('INTENT_MIN_CONFIDENCE', '0.9'))
+# Looser bar used only when the LLM is unavailable and the alternative is no plan at all;
+# fallback plans are limited to read-only actions, so an outage never makes writes easier
+INTENT_FALLBACK_MIN_CONFIDENCE = float(os.environ.get('INTENT_FALLBACK_MIN_CONFIDENCE', '0.6'))
+
+
+class IntentFastPath:
+    """Local intent matching in front of the LLM, with hit-rate and latency-saved accounting.
+
+    Latency saved per hit is estimated as the rolling mean of real LLM
+    round trips (measured on misses) minus the time spent matching.
+    """
+
+    def __init__(self, enabled: bool = INTENT_FAST_PATH_ENABLED, min_confidence: float = INTENT_MIN_CONFIDENCE, window: int = 500):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.requests = 0
+        self.hits = 0
+        self.by_intent: Dict[str, int] = {}
+        self.match_ms: deque = deque(maxlen=window)
+        self.llm_ms: deque = deque(maxlen=window)
+        self.saved_ms = 0.0
+        self.fallbacks = 0
+        self.fallback_hits = 0
+
+    def match(self, message: str, role: str):
+        if not self.enabled:
+            return None
+        from backend.services.intent_matcher import match_intent
         
-        # Parse AI response with robust error handling
-        try:
-            parsed = extract_json_from_response(ai_response)
-        except Exception as parse_error:
-            logger.error(f"Failed to parse AI response: {ai_response[:300]}")
-            # Fallback: treat the entire response as a message/thought
-            # Save to database
-            ai_message = AIMessage(
-                user_id=current_user.user_id,
-                session_id=ai_request.session_id,
-                message=ai_request.message,
-                response=ai_response,
-                action_type="chat",
-                actions_executed=[]
-            )
-            doc = ai_message.model_dump()
-            doc['created_at'] = doc['created_at'].isoformat()
-            await db.ai_messages.insert_one(doc)
+        self.requests += 1
+        started = time.perf_counter()
+        match = match_intent(
+            message,
+            allowed_actions=execute_prompts.allowed_actions(role),
+            min_confidence=self.min_confidence
+        )
+        match_ms = (time.perf_counter() - started) * 1000
+        self.match_ms.append(match_ms)
+        if match:
+            self.hits += 1
+            self.by_intent[match.intent] = self.by_intent.get(match.intent, 0) + 1
+            if self.llm_ms:
+                self.saved_ms += max(0.0, sum(self.llm_ms) / len(self.llm_ms) - match_ms)
+        return match
+
+    def fallback(self, message: str, role: str):
+        """Best-effort read-only local plan for when the LLM call gave up"""
+        from backend.services.ai_actions import READ_ONLY_ACTIONS
+        from backend.services.intent_matcher import match_intent
+        
+        self.fallbacks += 1
+        match = match_intent(
+            message,
+            allowed_actions=execute_prompts.allowed_actions(role) & READ_ONLY_ACTIONS,
+            min_confidence=INTENT_FALLBACK_MIN_CONFIDENCE
+        )
+        if match:
+            self.fallback_hits += 1
+        return match
+
+    def record_llm_call(self, elapsed_ms: float):
+        self.llm_ms.append(elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.requests, 4) if self.requests else 0.0,
+            "by_intent": self.by_intent,
+            "match_ms": latency_percentiles(self.match_ms),
+            "llm_ms": latency_percentiles(self.llm_ms),
+            "latency_saved_ms": round(self.saved_ms, 1),
+            "llm_fallbacks": self.fallbacks,
+            "llm_fallback_hits": self.fallback_hits,
+        }
+
+
+intent_fast_path = IntentFastPath()
+
 
+@api_router.post("/ai/execute")
+async def ai_execute(
+    ai_request: AIRequest,
+    current_user: TokenData = Depends(get_current_user)
+):
+    try:
+        from backend.services.ai_actions import AIActionExecutor
+        
+        # Check for keys (prioritize real keys)
+        llm_key = configured_llm_key()
+        if not llm_key:
             return {
-                "message": ai_response,
-                "thought": "Processed as conversational response",
+                "message": "AI service is temporarily unavailable. Please ensure EMERGENT_LLM_KEY is configured.",
+                "thought": "AI service unavailable",
                 "actionsExecuted": [],
                 "session_id": ai_request.session_id
             }
         
+        # Common phrasings resolve locally and repeated read-only plans replay from
+        # the plan cache; either way the context build and LLM round trip are skipped
+        fast_match = intent_fast_path.match(ai_request.message, current_user.role)
+        parsed = fast_match.plan if fast_match else plan_cache.get(ai_request.message, current_user.role)
+        
+        if parsed is not None:
+            user_doc = await user_directory.get(db, current_user.user_id)
+        else:
+            # Caller details and context snapshot are independent; fetch both at once
+            user_doc, user_context = await asyncio.gather(
+                user_directory.get(db, current_user.user_id),
+                build_user_context(current_user.user_id, current_user.role)
+            )
+        user_email = user_doc.get("email") if user_doc else current_user.email
+        
+        if parsed is None:
+            system_prompt = execute_prompts.render(current_user.role, user_email, user_context)
+            system_prompt += await session_prompt_block(
+                current_user.user_id, ai_request.session_id, system_prompt, ai_request.message
+            )
+            
+            # Call AI to determine actions
+            chat = LlmChat(
+                api_key=llm_key,
+                session_id=ai_request.session_id,
+                system_message=system_prompt
+            )
+            
+            chat.with_model("gemini", "gemini-2.5-flash")
+            user_message = UserMessage(text=ai_request.message)
+            llm_started = time.perf_counter()
+            degraded = False
+            try:
+                ai_response = await chat.send_message(user_message, fallback=False)
+                intent_fast_path.record_llm_call((time.perf_counter() - llm_started) * 1000)
+            except LlmUnavailableError:
+                # Provider timed out or the breaker is open: plan locally if we can,
+                # otherwise fall through to the conversational demo reply
+                degraded = True
+                fallback_match = intent_fast_path.fallback(ai_request.message, current_user.role)
+                ai_response = json.dumps(fallback_match.plan) if fallback_match else chat.mock_response(user_message)
+            
+            # Parse AI response with robust error handling
+            try:
+                parsed = extract_json_from_response(ai_response)
+            except Exception as parse_error:
+                logger.error(f"Failed to parse AI response: {ai_response[:300]}")
+                # Fallback: treat the entire response as a message/thought
+                # Save to database
+                ai_message = AIMessage(
+                    user_id=current_user.user_id,
+                    session_id=ai_request.session_id,
+                    message=ai_request.message,
+                    response=ai_response,
+                    action_type="chat",
+                    actions_executed=[]
+                )
+                doc = ai_message.model_dump()
+                doc['created_at'] = to_db_datetime(doc['created_at'])
+                await asyncio.gather(
+                    ai_message_writer.submit(doc),
+                    get_session_memory().record(db, current_user.user_id, ai_request.session_id, ai_request.message, ai_response)
+                )
+
+                return {
+                    "message": ai_response,
+                    "thought": "Processed as conversational response",
+                    "actionsExecuted": [],
+                    "session_id": ai_request.session_id
+                }
+            
+            if not degraded:
+                plan_cache.put(ai_request.message, current_user.role, parsed)
+        
         # Execute actions
-        executor = AIActionExecutor(db, current_user.user_id, current_user.role, user_email)
+        executor = AIActionExecutor(
+            db, current_user.user_id, current_user.role, user_email,
+            subordinate_cache=subordinate_cache,
+            user_directory=user_directory,
+            stats_counters=stats_counters,
+            user_context_cache=user_context_cache
+        )
         
-        results = []
-        for action in parsed.get("actions", []):
-            action_name = action.get("name")
-            params = action.get("params", {})
-            result = await executor.execute_action(action_name, params)
-            results.append(result)
+        results = await executor.execute_plan(parsed.get("actions", []))
         
         # Generate human-friendly message based on results
         def generate_friendly_message(thought, results):
@@ -1777,8 +3536,11 @@ If you can't perform an action, return empty actions array [] and explain why in
         )
         
         doc = ai_message.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.ai_messages.insert_one(doc)
+        doc['created_at'] = to_db_datetime(doc['created_at'])
+        await asyncio.gather(
+            ai_message_writer.submit(doc),
+            get_session_memory().record(db, current_user.user_id, ai_request.session_id, ai_request.message, friendly_message)
+        )
         
         return {
             "message": friendly_message,
@@ -1809,18 +3571,16 @@ async def get_ai_history(
     if session_id:
         query["session_id"] = session_id
     
+    await ai_message_writer.flush()
     history = await db.ai_messages.find(query, {"_id": 0}).sort("created_at", 1).limit(100).to_list(100)
     
-    for msg in history:
-        if isinstance(msg.get('created_at'), str):
-            msg['created_at'] = datetime.fromisoformat(msg['created_at'])
-    
     return history
 
 
 @api_router.get("/ai/sessions")
 async def get_ai_sessions(current_user: TokenData = Depends(get_current_user)):
     """Get list of AI chat sessions with metadata"""
+    await ai_message_writer.flush()
     pipeline = [
         {"$match": {"user_id": current_user.user_id}},
         {"$sort": {"created_at": -1}},
@@ -1848,20 +3608,29 @@ async def get_ai_sessions(current_user: TokenData = Depends(get_current_user)):
 
 
 # ===== DASHBOARD STATS =====
-@api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: TokenData = Depends(get_current_user)):
-    if current_user.role in [UserRole.ADMIN, UserRole.HR]:
-        # HR Dashboard stats
-        total_employees = await db.users.count_documents({})
-        total_tasks = await db.tasks.count_documents({})
-        pending_leaves = await db.leaves.count_documents({"status": LeaveStatus.PENDING})
-        
+async def _count_tasks_by_status(database, match: Dict[str, Any]) -> Dict[str, int]:
+    """Single aggregation: status -> count for tasks matching `match`"""
+    groups = await database.tasks.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    return {group["_id"]: group["count"] for group in groups}
+
+
+async def compute_dashboard_stats(database, user_id: str, role: str) -> Dict[str, int]:
+    """Dashboard counters with one round trip per collection, run concurrently"""
+    if role in [UserRole.ADMIN, UserRole.HR]:
         today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
-        present_today = await db.attendance.count_documents({
-            "date": today,
-            "status": {"$in": [AttendanceStatus.PRESENT, AttendanceStatus.WFH]}
-        })
-        
+        # Exact totals, the same counts StatsCounters.reconcile stores for the counter path
+        total_employees, total_tasks, pending_leaves, present_today = await asyncio.gather(
+            database.users.count_documents({}),
+            database.tasks.count_documents({}),
+            database.leaves.count_documents({"status": LeaveStatus.PENDING}),
+            database.attendance.count_documents({
+                "date": today,
+                "status": {"$in": [AttendanceStatus.PRESENT, AttendanceStatus.WFH]}
+            })
+        )
         return {
             "total_employees": total_employees,
             "total_tasks": total_tasks,
@@ -1869,46 +3638,276 @@ async def get_dashboard_stats(current_user: TokenData = Depends(get_current_user
             "present_today": present_today
         }
     
-    elif current_user.role == UserRole.TEAM_LEAD:
-        # Team Lead Dashboard stats
-        my_tasks = await db.tasks.count_documents({"assigned_to": current_user.user_id})
-        team_tasks = await db.tasks.count_documents({"created_by": current_user.user_id})
-        team_tasks_completed = await db.tasks.count_documents({
-            "created_by": current_user.user_id,
-            "status": TaskStatus.COMPLETED
-        })
-        team_tasks_pending = await db.tasks.count_documents({
-            "created_by": current_user.user_id,
-            "status": TaskStatus.TODO
-        })
-        
+    if role == UserRole.TEAM_LEAD:
+        facets = await database.tasks.aggregate([
+            {"$match": {"$or": [{"assigned_to": user_id}, {"created_by": user_id}]}},
+            {"$facet": {
+                "my_tasks": [
+                    {"$match": {"assigned_to": user_id}},
+                    {"$count": "count"}
+                ],
+                "team_by_status": [
+                    {"$match": {"created_by": user_id}},
+                    {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+                ]
+            }}
+        ]).to_list(1)
+        facet = facets[0] if facets else {"my_tasks": [], "team_by_status": []}
+        team_by_status = {group["_id"]: group["count"] for group in facet["team_by_status"]}
         return {
-            "my_tasks": my_tasks,
-            "team_tasks": team_tasks,
-            "team_tasks_completed": team_tasks_completed,
-            "team_tasks_pending": team_tasks_pending
+            "my_tasks": facet["my_tasks"][0]["count"] if facet["my_tasks"] else 0,
+            "team_tasks": sum(team_by_status.values()),
+            "team_tasks_completed": team_by_status.get(TaskStatus.COMPLETED, 0),
+            "team_tasks_pending": team_by_status.get(TaskStatus.TODO, 0)
         }
     
-    else:
-        # Employee/Intern Dashboard stats
-        my_tasks = await db.tasks.count_documents({"assigned_to": current_user.user_id})
-        pending_tasks = await db.tasks.count_documents({
-            "assigned_to": current_user.user_id,
-            "status": {"$in": [TaskStatus.TODO, TaskStatus.IN_PROGRESS]}
+    # Employee/Intern
+    by_status, my_leaves = await asyncio.gather(
+        _count_tasks_by_status(database, {"assigned_to": user_id}),
+        database.leaves.count_documents({"user_id": user_id})
+    )
+    return {
+        "my_tasks": sum(by_status.values()),
+        "pending_tasks": by_status.get(TaskStatus.TODO, 0) + by_status.get(TaskStatus.IN_PROGRESS, 0),
+        "completed_tasks": by_status.get(TaskStatus.COMPLETED, 0),
+        "my_leaves": my_leaves
+    }
+
+
+# ===== STATS COUNTERS =====
+# Materialized dashboard counters in db.stats_counters, one document per key:
+#   "global"            -> {"users", "tasks", "leaves_pending"}
+#   "user:<id>"         -> {"assigned": {"total", <status>...}, "created": {...}, "leaves"}
+#   "attendance:<date>" -> {"present"}  (present + wfh check-ins)
+# Write paths $inc these after the primary write; the reconciliation job
+# recomputes them from source collections to correct any drift.
+STATS_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('STATS_RECONCILE_INTERVAL_SECONDS', '900'))
+STATS_ATTENDANCE_DAYS = 7
+
+
+class StatsCounters:
+    """Incremental counter writer/reader plus the reconciliation pass"""
+
+    def __init__(self):
+        self.increments = 0
+        self.increment_errors = 0
+        self.reads = 0
+        self.fallbacks = 0
+        self.reconciliations = 0
+        self.last_reconciled_at: Optional[datetime] = None
+
+    async def _apply(self, database, increments: Dict[str, Dict[str, int]]):
+        """One bulk_write of upserting $inc per counter document"""
+        ops = [
+            UpdateOne({"_id": key}, {"$inc": fields}, upsert=True)
+            for key, fields in increments.items() if fields
+        ]
+        if not ops:
+            return
+        try:
+            await database.stats_counters.bulk_write(ops, ordered=False)
+            self.increments += len(ops)
+        except Exception as e:
+            # The primary write already succeeded; reconciliation repairs the counter
+            self.increment_errors += 1
+            logger.error(f"Stats counter update error: {e}")
+
+    async def user_created(self, database):
+        await self._apply(database, {"global": {"users": 1}})
+
+    async def task_created(self, database, task: Dict[str, Any]):
+        task_status = task.get("status", TaskStatus.TODO)
+        increments = {
+            "global": {"tasks": 1},
+            f"user:{task['assigned_to']}": {"assigned.total": 1, f"assigned.{task_status}": 1},
+        }
+        creator_key = f"user:{task['created_by']}"
+        creator_fields = {"created.total": 1, f"created.{task_status}": 1}
+        if creator_key in increments:
+            increments[creator_key].update(creator_fields)
+        else:
+            increments[creator_key] = creator_fields
+        await self._apply(database, increments)
+
+    async def task_status_changed(self, database, task: Dict[str, Any], old_status: str, new_status: str):
+        if not new_status or old_status == new_status:
+            return
+        increments: Dict[str, Dict[str, int]] = {}
+        for key, prefix in ((f"user:{task['assigned_to']}", "assigned"), (f"user:{task['created_by']}", "created")):
+            fields = increments.setdefault(key, {})
+            fields[f"{prefix}.{old_status}"] = -1
+            fields[f"{prefix}.{new_status}"] = 1
+        await self._apply(database, increments)
+
+    async def task_reassigned(self, database, task: Dict[str, Any], new_assignee_id: str):
+        old_assignee_id = task["assigned_to"]
+        if old_assignee_id == new_assignee_id:
+            return
+        task_status = task.get("status", TaskStatus.TODO)
+        await self._apply(database, {
+            f"user:{old_assignee_id}": {"assigned.total": -1, f"assigned.{task_status}": -1},
+            f"user:{new_assignee_id}": {"assigned.total": 1, f"assigned.{task_status}": 1},
         })
-        completed_tasks = await db.tasks.count_documents({
-            "assigned_to": current_user.user_id,
-            "status": TaskStatus.COMPLETED
+
+    async def leave_applied(self, database, user_id: str):
+        await self._apply(database, {
+            "global": {"leaves_pending": 1},
+            f"user:{user_id}": {"leaves": 1},
         })
-        my_leaves = await db.leaves.count_documents({"user_id": current_user.user_id})
-        
+
+    async def leave_status_changed(self, database, old_status: str, new_status: str):
+        was_pending = old_status == LeaveStatus.PENDING
+        is_pending = new_status == LeaveStatus.PENDING
+        if was_pending != is_pending:
+            await self._apply(database, {"global": {"leaves_pending": 1 if is_pending else -1}})
+
+    async def attendance_marked(self, database, date: str, attendance_status: str):
+        if attendance_status in [AttendanceStatus.PRESENT, AttendanceStatus.WFH]:
+            await self._apply(database, {f"attendance:{date}": {"present": 1}})
+
+    async def read_dashboard(self, database, user_id: str, role: str) -> Optional[Dict[str, int]]:
+        """Dashboard stats from counter documents in one find, or None before the first reconciliation"""
+        self.reads += 1
+        if role in [UserRole.ADMIN, UserRole.HR]:
+            today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+            keys = ["global", f"attendance:{today}"]
+        else:
+            keys = ["global", f"user:{user_id}"]
+
+        docs = await database.stats_counters.find({"_id": {"$in": keys}}).to_list(len(keys))
+        counters = {doc["_id"]: doc for doc in docs}
+        global_doc = counters.get("global")
+        if not global_doc or not global_doc.get("reconciled_at"):
+            # Counters were never seeded from source data; they'd under-report
+            self.fallbacks += 1
+            return None
+
+        if role in [UserRole.ADMIN, UserRole.HR]:
+            return {
+                "total_employees": global_doc.get("users", 0),
+                "total_tasks": global_doc.get("tasks", 0),
+                "pending_leaves": global_doc.get("leaves_pending", 0),
+                "present_today": counters.get(keys[1], {}).get("present", 0)
+            }
+
+        user_doc = counters.get(keys[1], {})
+        assigned = user_doc.get("assigned", {})
+        if role == UserRole.TEAM_LEAD:
+            created = user_doc.get("created", {})
+            return {
+                "my_tasks": assigned.get("total", 0),
+                "team_tasks": created.get("total", 0),
+                "team_tasks_completed": created.get(TaskStatus.COMPLETED, 0),
+                "team_tasks_pending": created.get(TaskStatus.TODO, 0)
+            }
+
         return {
-            "my_tasks": my_tasks,
-            "pending_tasks": pending_tasks,
-            "completed_tasks": completed_tasks,
-            "my_leaves": my_leaves
+            "my_tasks": assigned.get("total", 0),
+            "pending_tasks": assigned.get(TaskStatus.TODO, 0) + assigned.get(TaskStatus.IN_PROGRESS, 0),
+            "completed_tasks": assigned.get(TaskStatus.COMPLETED, 0),
+            "my_leaves": user_doc.get("leaves", 0)
         }
 
+    async def reconcile(self, database) -> Dict[str, Any]:
+        """Recompute every counter document from the source collections and overwrite it"""
+        run_id = str(uuid.uuid4())
+        since = (datetime.now(timezone.utc) - timedelta(days=STATS_ATTENDANCE_DAYS - 1)).strftime('%Y-%m-%d')
+        assigned_groups, created_groups, leave_groups, attendance_groups, users, tasks, leaves_pending = await asyncio.gather(
+            database.tasks.aggregate([
+                {"$group": {"_id": {"user": "$assigned_to", "status": "$status"}, "count": {"$sum": 1}}}
+            ]).to_list(None),
+            database.tasks.aggregate([
+                {"$group": {"_id": {"user": "$created_by", "status": "$status"}, "count": {"$sum": 1}}}
+            ]).to_list(None),
+            database.leaves.aggregate([
+                {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+            ]).to_list(None),
+            database.attendance.aggregate([
+                {"$match": {
+                    "date": {"$gte": since},
+                    "status": {"$in": [AttendanceStatus.PRESENT, AttendanceStatus.WFH]}
+                }},
+                {"$group": {"_id": "$date", "count": {"$sum": 1}}}
+            ]).to_list(None),
+            database.users.count_documents({}),
+            database.tasks.count_documents({}),
+            database.leaves.count_documents({"status": LeaveStatus.PENDING})
+        )
+
+        user_docs: Dict[str, Dict[str, Any]] = {}
+
+        def user_doc(user_id: str) -> Dict[str, Any]:
+            return user_docs.setdefault(user_id, {"kind": "user", "assigned": {"total": 0}, "created": {"total": 0}, "leaves": 0})
+
+        for prefix, groups in (("assigned", assigned_groups), ("created", created_groups)):
+            for group in groups:
+                bucket = user_doc(group["_id"]["user"])[prefix]
+                bucket[group["_id"]["status"]] = group["count"]
+                bucket["total"] += group["count"]
+        for group in leave_groups:
+            user_doc(group["_id"])["leaves"] = group["count"]
+
+        now = datetime.now(timezone.utc)
+        ops = [
+            ReplaceOne({"_id": f"user:{user_id}"}, {**doc, "run_id": run_id}, upsert=True)
+            for user_id, doc in user_docs.items()
+        ]
+        ops.extend(
+            ReplaceOne(
+                {"_id": f"attendance:{group['_id']}"},
+                {"kind": "attendance", "present": group["count"], "run_id": run_id},
+                upsert=True
+            )
+            for group in attendance_groups
+        )
+        ops.append(ReplaceOne(
+            {"_id": "global"},
+            {"users": users, "tasks": tasks, "leaves_pending": leaves_pending, "reconciled_at": now},
+            upsert=True
+        ))
+        await database.stats_counters.bulk_write(ops, ordered=False)
+        # Documents untouched by this run (users with no tasks left, old days) are stale
+        stale = await database.stats_counters.delete_many({
+            "kind": {"$in": ["user", "attendance"]},
+            "run_id": {"$ne": run_id}
+        })
+
+        self.reconciliations += 1
+        self.last_reconciled_at = now
+        return {"documents": len(ops), "removed": stale.deleted_count, "reconciled_at": now}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "increments": self.increments,
+            "increment_errors": self.increment_errors,
+            "reads": self.reads,
+            "fallbacks": self.fallbacks,
+            "reconciliations": self.reconciliations,
+            "last_reconciled_at": self.last_reconciled_at,
+        }
+
+
+stats_counters = StatsCounters()
+stats_reconcile_task: Optional[asyncio.Task] = None
+
+
+async def run_stats_reconciliation():
+    """Background loop: reconcile once at startup, then every STATS_RECONCILE_INTERVAL_SECONDS"""
+    while True:
+        try:
+            await stats_counters.reconcile(db)
+        except Exception as e:
+            logger.error(f"Stats reconciliation error: {e}")
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL_SECONDS)
+
+
+@api_router.get("/dashboard/stats")
+async def get_dashboard_stats(current_user: TokenData = Depends(get_current_user)):
+    stats = await stats_counters.read_dashboard(db, current_user.user_id, current_user.role)
+    if stats is None:
+        stats = await compute_dashboard_stats(db, current_user.user_id, current_user.role)
+    return stats
+
 
 # ===== NOTIFICATIONS =====
 async def create_notification(
@@ -1934,31 +3933,56 @@ async def create_notification(
     )
     
     doc = notification.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['created_at'] = to_db_datetime(doc['created_at'])
+    doc['audience'] = build_audience(user_id, target_roles)
     await db.notifications.insert_one(doc)
     return notification
 
 
+# Read state lives per user in db.notification_reads ({_id: user_id}), never on the
+# shared notification documents: everything created at or before last_read_at is
+# read, plus the sparse read_ids marked individually after that watermark.
+def notification_feed_query(user_id: str, role: str) -> Dict[str, Any]:
+    # One indexed $in on audience_created_at; the server merges the per-key ranges by created_at
+    return {"audience": {"$in": audience_keys(user_id, role)}}
+
+
+async def get_notification_read_state(database, user_id: str) -> Dict[str, Any]:
+    state = await database.notification_reads.find_one({"_id": user_id})
+    return state or {"last_read_at": None, "read_ids": []}
+
+
 @api_router.get("/notifications", response_model=List[Notification])
 async def get_notifications(current_user: TokenData = Depends(get_current_user)):
-    # BUGFIX: Added {"target_roles": {"$size": 0}} to include company-wide announcements (empty target_roles)
-    query = {
-        "$or": [
-            {"user_id": current_user.user_id},
-            {"target_roles": current_user.role},
-            {"target_roles": {"$size": 0}}  # Empty target_roles means all users
-        ]
-    }
-    
-    notifications = await db.notifications.find(query, {"_id": 0}).sort("created_at", -1).limit(100).to_list(100)
+    query = notification_feed_query(current_user.user_id, current_user.role)
     
-    for notif in notifications:
-        if isinstance(notif.get('created_at'), str):
-            notif['created_at'] = datetime.fromisoformat(notif['created_at'])
+    notifications, read_state = await asyncio.gather(
+        db.notifications.find(query, {"_id": 0}).sort("created_at", -1).limit(100).to_list(100),
+        get_notification_read_state(db, current_user.user_id)
+    )
+    for notification in notifications:
+        notification["is_read"] = is_notification_read(notification, read_state, current_user.user_id)
     
     return notifications
 
 
+@api_router.get("/notifications/unread-count")
+async def get_unread_notification_count(current_user: TokenData = Depends(get_current_user)):
+    read_state = await get_notification_read_state(db, current_user.user_id)
+    
+    conditions = [
+        notification_feed_query(current_user.user_id, current_user.role),
+        {"$nor": [{"user_id": current_user.user_id, "is_read": True}]}
+    ]
+    if read_state.get("last_read_at") is not None:
+        conditions.append({"created_at": {"$gt": read_state["last_read_at"]}})
+    if read_state.get("read_ids"):
+        conditions.append({"id": {"$nin": read_state["read_ids"]}})
+    
+    unread = await db.notifications.count_documents({"$and": conditions})
+    return {"unread": unread}
+
+
 @api_router.patch("/notifications/{notification_id}/read")
 async def mark_notification_read(
     notification_id: str,
@@ -1973,26 +3997,129 @@ async def mark_notification_read(
     if notif.get("user_id") and notif["user_id"] != current_user.user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot mark other users' notifications")
     
-    await db.notifications.update_one(
-        {"id": notification_id},
-        {"$set": {"is_read": True}}
-    )
+    # Ids at or below the watermark are already covered; only newer ones are recorded
+    try:
+        await db.notification_reads.update_one(
+            {
+                "_id": current_user.user_id,
+                "$or": [{"last_read_at": None}, {"last_read_at": {"$lt": notif["created_at"]}}]
+            },
+            {"$addToSet": {"read_ids": notification_id}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # State exists but its watermark already covers this notification
+        pass
     
     return {"message": "Marked as read"}
 
 
 @api_router.patch("/notifications/mark-all-read")
 async def mark_all_notifications_read(current_user: TokenData = Depends(get_current_user)):
-    query = {
-        "$or": [
-            {"user_id": current_user.user_id},
-            {"target_roles": current_user.role}
-        ]
-    }
-    
-    await db.notifications.update_many(query, {"$set": {"is_read": True}})
+    # Advancing the watermark subsumes every individually read id
+    await db.notification_reads.update_one(
+        {"_id": current_user.user_id},
+        {"$set": {"last_read_at": db_now(), "read_ids": []}},
+        upsert=True
+    )
     
     return {"message": "All notifications marked as read"}
+
+
+# ===== ADMIN =====
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: TokenData = Depends(require_role(UserRole.ADMIN))):
+    """Report per-index usage from $indexStats and diff against INDEX_MANIFEST"""
+    report = {}
+    for collection_name, specs in INDEX_MANIFEST.items():
+        stats = await db[collection_name].aggregate([{"$indexStats": {}}]).to_list(None)
+        existing = {}
+        for stat in stats:
+            accesses = stat.get("accesses", {})
+            existing[stat["name"]] = {
+                "name": stat["name"],
+                "key": dict(stat.get("key", {})),
+                "ops": accesses.get("ops", 0),
+                "since": accesses.get("since"),
+                "in_manifest": stat["name"] in {spec["name"] for spec in specs},
+            }
+        
+        expected_names = [spec["name"] for spec in specs]
+        report[collection_name] = {
+            "indexes": list(existing.values()),
+            "missing": [name for name in expected_names if name not in existing],
+            # _id_ is always there and always "used" by the storage engine
+            "unused": [name for name, info in existing.items() if info["ops"] == 0 and name != "_id_"],
+            "unmanaged": [name for name, info in existing.items() if not info["in_manifest"] and name != "_id_"],
+        }
+    
+    return report
+
+
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user: TokenData = Depends(require_role(UserRole.ADMIN))):
+    """In-process cache and pool counters for this worker"""
+    return {
+        "subordinate_cache": subordinate_cache.stats(),
+        "user_directory": user_directory.stats(),
+        "user_context_cache": user_context_cache.stats(),
+        "stats_counters": stats_counters.stats(),
+        "llm_pools": llm_registry.stats(),
+        "ai_chat_stream": chat_stream_stats.stats(),
+        "execute_prompt": execute_prompts.stats(),
+        "intent_fast_path": intent_fast_path.stats(),
+        "plan_cache": plan_cache.stats(),
+        "session_memory": get_session_memory().stats(),
+        "ai_message_writer": ai_message_writer.stats(),
+        "password_hasher": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+    }
+
+
+@api_router.post("/admin/indexes/sync")
+async def sync_indexes(current_user: TokenData = Depends(require_role(UserRole.ADMIN))):
+    """Re-apply INDEX_MANIFEST on demand (same idempotent path as startup)"""
+    applied = await ensure_indexes()
+    return {"applied": applied}
+
+
+@api_router.post("/admin/stats/reconcile")
+async def reconcile_stats(current_user: TokenData = Depends(require_role(UserRole.ADMIN))):
+    """Recompute dashboard counters now instead of waiting for the next scheduled pass"""
+    return await stats_counters.reconcile(db)
+
+
+@api_router.post("/admin/migrations/audience")
+async def run_audience_migration(current_user: TokenData = Depends(require_role(UserRole.ADMIN))):
+    """Backfill audience on any notifications/announcements still missing it"""
+    return {"migrated": await migrate_audience()}
+
+
+@api_router.get("/admin/migrations/datetimes")
+async def get_datetime_migration_status(current_user: TokenData = Depends(require_role(UserRole.ADMIN))):
+    state = await db.migrations.find_one({"_id": DATETIME_MIGRATION_ID}, {"_id": 0})
+    return {"storage": DATETIME_STORAGE, "running": datetime_migration_active, "state": state}
+
+
+@api_router.post("/admin/migrations/datetimes")
+async def start_datetime_migration(
+    restart: bool = False,
+    current_user: TokenData = Depends(require_role(UserRole.ADMIN))
+):
+    """Run a backfill pass now (resuming an interrupted one); restart=true discards checkpoints first"""
+    global datetime_migration_task
+    if datetime_migration_active:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Migration already running")
+    
+    if datetime_migration_task is not None and not datetime_migration_task.done():
+        # Between passes: cut the loop's sleep short instead of running two loops
+        datetime_migration_task.cancel()
+    if restart:
+        await db.migrations.delete_one({"_id": DATETIME_MIGRATION_ID})
+    datetime_migration_task = asyncio.create_task(run_datetime_migration())
+    return {"message": "Datetime migration started"}
+
+
 # CORS - Must be added BEFORE mounting routers
 app.add_middleware(
     CORSMiddleware,
@@ -1,18 +1,172 @@
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+import asyncio
 import logging
 import uuid
 
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from backend.services.storage import DATETIME_STORAGE, audience_keys, build_audience, db_now, is_notification_read
+
 logger = logging.getLogger(__name__)
 
 
+def to_db_deadline(value: Optional[str]) -> Any:
+    """Store an LLM-supplied YYYY-MM-DD deadline as a date; keep unparseable text as-is"""
+    if not value or DATETIME_STORAGE == 'iso':
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def deadline_sort_key(value: Any) -> datetime:
+    """Order mixed string/date deadlines; missing or unparseable ones sort last"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            value = None
+    if not isinstance(value, datetime):
+        return datetime.max.replace(tzinfo=timezone.utc)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# $addFields reproducing deadline_sort_key + priority order for a server-side $sort:
+# parseable deadlines (dates or ISO strings) first by date, then missing/unparseable,
+# ties broken by priority (urgent < high < medium < low, unknown as medium)
+URGENT_SORT_FIELDS = {
+    "_deadline_at": {"$switch": {
+        "branches": [
+            {"case": {"$eq": [{"$type": "$deadline"}, "date"]}, "then": "$deadline"},
+            {"case": {"$eq": [{"$type": "$deadline"}, "string"]},
+             "then": {"$dateFromString": {"dateString": "$deadline", "onError": None, "onNull": None}}},
+        ],
+        "default": None
+    }},
+    "_priority_rank": {"$switch": {
+        "branches": [
+            {"case": {"$eq": [{"$ifNull": ["$priority", "medium"]}, "urgent"]}, "then": 0},
+            {"case": {"$eq": [{"$ifNull": ["$priority", "medium"]}, "high"]}, "then": 1},
+            {"case": {"$eq": [{"$ifNull": ["$priority", "medium"]}, "low"]}, "then": 3},
+        ],
+        "default": 2
+    }},
+}
+URGENT_SORT_FIELDS["_deadline_unset"] = {"$cond": [{"$eq": [URGENT_SORT_FIELDS["_deadline_at"], None]}, 1, 0]}
+
+
+class BatchLoader:
+    """Request-scoped DataLoader with an identity map.
+
+    Keys requested during the same event-loop tick are fetched together by
+    one batch_fn call (typically a single $in query); every key is fetched at
+    most once per request, misses included, and later loads return the same
+    document object. Writes queued by the executor patch the mapped documents
+    so reads later in the plan see them.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Awaitable[Dict[Any, Dict[str, Any]]]]):
+        self._batch_fn = batch_fn
+        self._docs: Dict[Any, Optional[Dict[str, Any]]] = {}
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self.loads = 0
+        self.hits = 0
+        self.batches = 0
+        self.fetched = 0
+
+    async def load(self, key: Any) -> Optional[Dict[str, Any]]:
+        self.loads += 1
+        if key in self._docs:
+            self.hits += 1
+            return self._docs[key]
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                # Dispatch once the current tick's callers have all queued their keys
+                loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+            future = loop.create_future()
+            self._pending[key] = future
+        return await future
+
+    async def load_many(self, keys: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        unique = list(dict.fromkeys(key for key in keys if key))
+        docs = await asyncio.gather(*[self.load(key) for key in unique])
+        return {key: doc for key, doc in zip(unique, docs) if doc is not None}
+
+    async def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        self.batches += 1
+        self.fetched += len(pending)
+        try:
+            found = await self._batch_fn(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in pending.items():
+            self._docs[key] = found.get(key)
+            if not future.done():
+                future.set_result(self._docs[key])
+
+    def prime(self, key: Any, doc: Optional[Dict[str, Any]]):
+        self._docs[key] = doc
+
+    def patch(self, key: Any, fields: Dict[str, Any]):
+        doc = self._docs.get(key)
+        if doc is not None:
+            doc.update(fields)
+
+    def stats(self) -> Dict[str, int]:
+        return {"loads": self.loads, "hits": self.hits, "batches": self.batches, "fetched": self.fetched}
+
+
+def fetch_by(collection, field: str, projection: Optional[Dict[str, Any]] = None):
+    """batch_fn for BatchLoader: one $in query on field"""
+    async def batch_fn(keys: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        docs = await collection.find({field: {"$in": keys}}, projection).to_list(None)
+        return {doc[field]: doc for doc in docs}
+    return batch_fn
+
+
 class AIActionExecutor:
-    def __init__(self, db, user_id: str, user_role: str, user_email: str = None):
+    def __init__(self, db, user_id: str, user_role: str, user_email: str = None,
+                 subordinate_cache=None, user_directory=None, stats_counters=None,
+                 user_context_cache=None):
         self.db = db
         self.user_id = user_id
         self.user_role = user_role
         self.user_email = user_email
+        # Shared server.SubordinateCache; falls back to direct queries when absent
+        self.subordinate_cache = subordinate_cache
+        # Shared server.UserDirectory for id/email -> name/email/role lookups
+        self.user_directory = user_directory
+        # Shared server.StatsCounters; write actions bump dashboard counters through it
+        self.stats_counters = stats_counters
+        # Shared server.UserContextCache; writes drop the affected users' AI snapshots
+        self.user_context_cache = user_context_cache
         self.action_registry = self._build_action_registry()
+        # Request-scoped loaders: one fetch per document per plan, coalesced per tick
+        self._users = BatchLoader(self._fetch_users)
+        self._users_by_email = BatchLoader(self._fetch_users_by_email)
+        self._tasks = BatchLoader(fetch_by(db.tasks, "id"))
+        self._leaves = BatchLoader(fetch_by(db.leaves, "id"))
+        # Unit of work: inside execute_plan, writes queue here as (collection, op, owning result)
+        # and go out as one bulk_write per collection when the plan ends or a read needs them
+        self._deferring = False
+        self._pending_writes: List[Tuple[str, Any, Dict[str, Any]]] = []
+        self._action_writes: List[int] = []
+        # Counter bumps and snapshot invalidations wait for their action's writes:
+        # (owning result, [(user_ids, counter, args)]), applied by flush_writes if the writes landed
+        self._action_effects: List[Tuple[List[Optional[str]], Optional[str], tuple]] = []
+        self._pending_effects: List[Tuple[Dict[str, Any], List[Tuple[List[Optional[str]], Optional[str], tuple]]]] = []
+        self.bulk_writes = 0
+        self.writes_flushed = 0
     
     def _build_action_registry(self) -> Dict[str, Callable]:
         """Build registry of all available actions"""
@@ -46,19 +200,177 @@ class AIActionExecutor:
             if not action_func:
                 return {"success": False, "error": f"Unknown action: {action}", "action": action}
             
-            return await action_func(params)
+            self._action_writes = []
+            self._action_effects = []
+            result = await action_func(params)
+            for index in self._action_writes:
+                # Writes queued by this action report back into its result if the flush fails
+                collection_name, op, _ = self._pending_writes[index]
+                self._pending_writes[index] = (collection_name, op, result)
+            if self._action_effects:
+                self._pending_effects.append((result, self._action_effects))
+            return result
         except Exception as e:
             logger.error(f"Action execution error for {action}: {str(e)}")
             import traceback
             traceback.print_exc()
             return {"success": False, "error": str(e), "action": action}
     
+    async def execute_plan(self, actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Execute a parsed plan, running runs of adjacent reads concurrently.
+
+        Each write (or unknown action) is a barrier: it runs alone, after
+        everything before it and before anything after it, so a read that
+        follows a write still observes it. Results keep plan order.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(actions)
+        pending_reads: List[int] = []
+        
+        async def flush_reads():
+            if not pending_reads:
+                return
+            # Reads query the database directly, so queued writes must land first
+            await self.flush_writes()
+            batch = await asyncio.gather(*[
+                self.execute_action(actions[index].get("name"), actions[index].get("params", {}))
+                for index in pending_reads
+            ])
+            for index, result in zip(pending_reads, batch):
+                results[index] = result
+            pending_reads.clear()
+        
+        self._deferring = True
+        try:
+            for index, action in enumerate(actions):
+                if action.get("name") in READ_ONLY_ACTIONS:
+                    pending_reads.append(index)
+                    continue
+                await flush_reads()
+                results[index] = await self.execute_action(action.get("name"), action.get("params", {}))
+            await flush_reads()
+        finally:
+            self._deferring = False
+            await self.flush_writes()
+        
+        return results
+    
+    async def _write(self, collection_name: str, op: Any):
+        """Apply a write now, or queue it for the plan's bulk_write"""
+        if not self._deferring:
+            await self.db[collection_name].bulk_write([op])
+            return
+        self._action_writes.append(len(self._pending_writes))
+        self._pending_writes.append((collection_name, op, {}))
+    
+    async def flush_writes(self):
+        """Send queued writes as one ordered bulk_write per collection.
+
+        An action whose write fails has its result rewritten to a failure,
+        so the plan never reports a change that didn't land.
+        """
+        if not self._pending_writes:
+            return
+        pending, self._pending_writes = self._pending_writes, []
+        effects, self._pending_effects = self._pending_effects, []
+        by_collection: Dict[str, List[Tuple[Any, Dict[str, Any]]]] = {}
+        for collection_name, op, result in pending:
+            by_collection.setdefault(collection_name, []).append((op, result))
+        
+        for collection_name, entries in by_collection.items():
+            failed: Dict[int, str] = {}
+            try:
+                await self.db[collection_name].bulk_write([op for op, _ in entries], ordered=True)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    failed[error["index"]] = error.get("errmsg", "write failed")
+                # Ordered: everything after the first error was not attempted
+                first = min(failed) if failed else 0
+                for index in range(first, len(entries)):
+                    failed.setdefault(index, "Not applied: an earlier write in this plan failed")
+            except Exception as e:
+                logger.error(f"Bulk write to {collection_name} failed: {str(e)}")
+                failed = {index: str(e) for index in range(len(entries))}
+            self.bulk_writes += 1
+            self.writes_flushed += len(entries) - len(failed)
+            for index, message in failed.items():
+                result = entries[index][1]
+                result.update({"success": False, "error": f"Could not save change: {message}"})
+                result.pop("details", None)
+        
+        # Only now that the writes landed: counters and snapshots follow the database,
+        # and an action whose write failed (result rewritten above) leaves them untouched
+        for result, action_effects in effects:
+            if result.get("success") is False:
+                continue
+            for effect in action_effects:
+                await self._apply_effect(*effect)
+    
+    async def _task_status_totals(self, match: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+        """status -> {count, progress (sum)} for tasks matching match, grouped in the database"""
+        groups = await self.db.tasks.aggregate([
+            {"$match": match},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}, "progress": {"$sum": {"$ifNull": ["$progress", 0]}}}}
+        ]).to_list(None)
+        return {group["_id"]: {"count": group["count"], "progress": group["progress"]} for group in groups}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": self._users.stats(),
+            "users_by_email": self._users_by_email.stats(),
+            "tasks": self._tasks.stats(),
+            "leaves": self._leaves.stats(),
+            "bulk_writes": self.bulk_writes,
+            "writes_flushed": self.writes_flushed,
+        }
+    
+    async def _after_write(self, user_ids: List[Optional[str]], counter: Optional[str] = None, *args: Any):
+        """Bump a StatsCounters counter and drop users' AI snapshots for the current action's writes.
+
+        Inside a plan this waits for flush_writes and is skipped if the writes
+        fail; args are copied now since loader documents are patched in place.
+        """
+        effect = (user_ids, counter, tuple(dict(arg) if isinstance(arg, dict) else arg for arg in args))
+        if self._deferring and self._action_writes:
+            self._action_effects.append(effect)
+        else:
+            await self._apply_effect(*effect)
+    
+    async def _apply_effect(self, user_ids: List[Optional[str]], counter: Optional[str], args: tuple):
+        if counter and self.stats_counters is not None:
+            await getattr(self.stats_counters, counter)(self.db, *args)
+        if self.user_context_cache is not None:
+            self.user_context_cache.invalidate(*user_ids)
+    
+    async def _fetch_users(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # The shared directory already batches its misses into one $in query
+        if self.user_directory is not None:
+            return await self.user_directory.get_many(self.db, user_ids)
+        return await fetch_by(self.db.users, "id")(user_ids)
+    
+    async def _fetch_users_by_email(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        if self.user_directory is not None:
+            entries = await asyncio.gather(*[self.user_directory.get_by_email(self.db, email) for email in emails])
+            found = {entry["email"]: entry for entry in entries if entry}
+        else:
+            found = await fetch_by(self.db.users, "email")(emails)
+        for user in found.values():
+            self._users.prime(user["id"], user)
+        return found
+    
+    async def _find_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a user by id (directory first, then database), once per request"""
+        return await self._users.load(user_id)
+    
+    async def _find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Look up a user by email (directory first, then database), once per request"""
+        return await self._users_by_email.load(email)
+    
     async def _get_user_map(self, user_ids: List[str]) -> Dict[str, Dict[str, str]]:
         """Get a map of user_id -> {name, email, role} for enrichment"""
         if not user_ids:
             return {}
         
-        users = await self.db.users.find({"id": {"$in": user_ids}}).to_list(1000)
+        users = (await self._users.load_many(user_ids)).values()
         return {
             user["id"]: {
                 "name": user.get("name", "Unknown"),
@@ -73,8 +385,11 @@ class AIActionExecutor:
         if self.user_role != "team_lead":
             return []
         
+        if self.subordinate_cache is not None:
+            return await self.subordinate_cache.get_subordinate_ids(self.db, self.user_id)
+        
         # Get current user's department
-        current_user = await self.db.users.find_one({"id": self.user_id})
+        current_user = await self._find_user(self.user_id)
         if not current_user:
             return []
         
@@ -107,7 +422,7 @@ class AIActionExecutor:
         
         # If email is provided, look up user ID
         if assigned_to_email:
-            user = await self.db.users.find_one({"email": assigned_to_email})
+            user = await self._find_user_by_email(assigned_to_email)
             if user:
                 assigned_to = user["id"]
             else:
@@ -121,8 +436,8 @@ class AIActionExecutor:
         if not assigned_to:
             assigned_to = self.user_id
         
-        # Verify assignee exists
-        assignee = await self.db.users.find_one({"id": assigned_to})
+        # Verify assignee exists; creator info is needed for the reply either way
+        assignee, creator = await asyncio.gather(self._find_user(assigned_to), self._find_user(self.user_id))
         if not assignee:
             return {
                 "success": False,
@@ -139,16 +454,15 @@ class AIActionExecutor:
             "status": "todo",
             "priority": params.get("priority", "medium"),
             "progress": 0,
-            "deadline": params.get("deadline"),
+            "deadline": to_db_deadline(params.get("deadline")),
             "notes": "",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": db_now(),
+            "updated_at": db_now()
         }
         
-        await self.db.tasks.insert_one(task)
-        
-        # Get creator info
-        creator = await self.db.users.find_one({"id": self.user_id})
+        await self._write("tasks", InsertOne(task))
+        self._tasks.prime(task_id, task)
+        await self._after_write([assigned_to, self.user_id], "task_created", task)
         
         return {
             "success": True,
@@ -173,14 +487,14 @@ class AIActionExecutor:
         if not task_id:
             return {"success": False, "action": "update_task_status", "error": "task_id required"}
         
-        task = await self.db.tasks.find_one({"id": task_id})
+        task = await self._tasks.load(task_id)
         if not task:
             return {"success": False, "action": "update_task_status", "error": "Task not found"}
         
         if self.user_role not in ["admin", "hr", "team_lead"] and task["assigned_to"] != self.user_id:
             return {"success": False, "action": "update_task_status", "error": "Insufficient permissions"}
         
-        update_fields = {"updated_at": datetime.now(timezone.utc).isoformat()}
+        update_fields = {"updated_at": db_now()}
         
         if new_status:
             update_fields["status"] = new_status
@@ -192,7 +506,10 @@ class AIActionExecutor:
         if progress is not None:
             update_fields["progress"] = min(100, max(0, int(progress)))
         
-        await self.db.tasks.update_one({"id": task_id}, {"$set": update_fields})
+        previous_status = task.get("status")
+        await self._write("tasks", UpdateOne({"id": task_id}, {"$set": update_fields}))
+        await self._after_write([task["assigned_to"], task.get("created_by")], "task_status_changed", task, previous_status, new_status)
+        self._tasks.patch(task_id, update_fields)
         
         return {
             "success": True,
@@ -217,27 +534,27 @@ class AIActionExecutor:
         if not task_id:
             return {"success": False, "action": "reassign_task", "error": "task_id required"}
         
-        task = await self.db.tasks.find_one({"id": task_id})
+        # Task and new assignee are independent lookups
+        task, new_user = await asyncio.gather(
+            self._tasks.load(task_id),
+            self._find_user_by_email(new_assignee_email) if new_assignee_email else self._find_user(new_assignee_id)
+        )
         if not task:
             return {"success": False, "action": "reassign_task", "error": "Task not found"}
         
-        if new_assignee_email:
-            new_user = await self.db.users.find_one({"email": new_assignee_email})
-            if new_user:
-                new_assignee_id = new_user["id"]
+        if new_user:
+            new_assignee_id = new_user["id"]
+        elif new_assignee_id:
+            new_user = await self._find_user(new_assignee_id)
         
         if not new_assignee_id:
             return {"success": False, "action": "reassign_task", "error": "New assignee not found"}
         
-        await self.db.tasks.update_one(
-            {"id": task_id},
-            {"$set": {
-                "assigned_to": new_assignee_id,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
-        
-        new_user = await self.db.users.find_one({"id": new_assignee_id})
+        previous_assignee = task["assigned_to"]
+        update_fields = {"assigned_to": new_assignee_id, "updated_at": db_now()}
+        await self._write("tasks", UpdateOne({"id": task_id}, {"$set": update_fields}))
+        await self._after_write([previous_assignee, new_assignee_id, task.get("created_by")], "task_reassigned", task, new_assignee_id)
+        self._tasks.patch(task_id, update_fields)
         
         return {
             "success": True,
@@ -260,7 +577,7 @@ class AIActionExecutor:
         
         # If email provided, look up user_id
         if user_email and not user_id:
-            target_user = await self.db.users.find_one({"email": user_email})
+            target_user = await self._find_user_by_email(user_email)
             if target_user:
                 user_id = target_user["id"]
             else:
@@ -275,7 +592,7 @@ class AIActionExecutor:
             if created_by_email == "me" or created_by_email == self.user_email:
                 query["created_by"] = self.user_id
             else:
-                creator = await self.db.users.find_one({"email": created_by_email})
+                creator = await self._find_user_by_email(created_by_email)
                 if creator:
                     query["created_by"] = creator["id"]
                 else:
@@ -355,7 +672,7 @@ class AIActionExecutor:
         # Determine context for response
         context_msg = "tasks"
         if user_id:
-            target_user = await self.db.users.find_one({"id": user_id})
+            target_user = await self._find_user(user_id)
             target_name = target_user.get("name") if target_user else "the user"
             context_msg = f"tasks assigned to {target_name}"
         
@@ -397,8 +714,8 @@ class AIActionExecutor:
                     "action": "get_team_members",
                     "error": "Only Admin/HR can query other team leads' members"
                 }
-            team_lead_user = await self.db.users.find_one({"email": team_lead_email, "role": "team_lead"})
-            if not team_lead_user:
+            team_lead_user = await self._find_user_by_email(team_lead_email)
+            if not team_lead_user or team_lead_user.get("role") != "team_lead":
                 return {
                     "success": False,
                     "action": "get_team_members",
@@ -417,7 +734,7 @@ class AIActionExecutor:
                 }
         
         # Get team lead info
-        team_lead = await self.db.users.find_one({"id": team_lead_id})
+        team_lead = await self._find_user(team_lead_id)
         if not team_lead:
             return {
                 "success": False,
@@ -479,11 +796,13 @@ class AIActionExecutor:
             "end_date": end_date,
             "reason": params.get("reason", "Personal"),
             "status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": db_now(),
+            "updated_at": db_now()
         }
         
-        await self.db.leaves.insert_one(leave)
+        await self._write("leaves", InsertOne(leave))
+        self._leaves.prime(leave_id, leave)
+        await self._after_write([self.user_id], "leave_applied", self.user_id)
         
         return {
             "success": True,
@@ -504,20 +823,17 @@ class AIActionExecutor:
         if not leave_id:
             return {"success": False, "action": "cancel_leave", "error": "leave_id required"}
         
-        leave = await self.db.leaves.find_one({"id": leave_id, "user_id": self.user_id})
-        if not leave:
+        leave = await self._leaves.load(leave_id)
+        if not leave or leave["user_id"] != self.user_id:
             return {"success": False, "action": "cancel_leave", "error": "Leave not found or not yours"}
         
         if leave["status"] != "pending":
             return {"success": False, "action": "cancel_leave", "error": f"Cannot cancel {leave['status']} leave"}
         
-        await self.db.leaves.update_one(
-            {"id": leave_id},
-            {"$set": {
-                "status": "cancelled",
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        update_fields = {"status": "cancelled", "updated_at": db_now()}
+        await self._write("leaves", UpdateOne({"id": leave_id}, {"$set": update_fields}))
+        await self._after_write([self.user_id], "leave_status_changed", leave["status"], "cancelled")
+        self._leaves.patch(leave_id, update_fields)
         
         return {
             "success": True,
@@ -538,23 +854,19 @@ class AIActionExecutor:
         if not leave_id:
             return {"success": False, "action": "approve_leave", "error": "leave_id required"}
         
-        leave = await self.db.leaves.find_one({"id": leave_id})
+        leave = await self._leaves.load(leave_id)
         if not leave:
             return {"success": False, "action": "approve_leave", "error": "Leave request not found"}
         
         if leave["status"] != "pending":
             return {"success": False, "action": "approve_leave", "error": f"Leave is {leave['status']}, cannot approve"}
         
-        await self.db.leaves.update_one(
-            {"id": leave_id},
-            {"$set": {
-                "status": "approved",
-                "approved_by": self.user_id,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        update_fields = {"status": "approved", "approved_by": self.user_id, "updated_at": db_now()}
+        await self._write("leaves", UpdateOne({"id": leave_id}, {"$set": update_fields}))
+        await self._after_write([leave["user_id"]], "leave_status_changed", leave["status"], "approved")
+        self._leaves.patch(leave_id, update_fields)
         
-        user = await self.db.users.find_one({"id": leave["user_id"]})
+        user = await self._find_user(leave["user_id"])
         
         return {
             "success": True,
@@ -578,21 +890,16 @@ class AIActionExecutor:
         if not leave_id:
             return {"success": False, "action": "reject_leave", "error": "leave_id required"}
         
-        leave = await self.db.leaves.find_one({"id": leave_id})
+        leave = await self._leaves.load(leave_id)
         if not leave:
             return {"success": False, "action": "reject_leave", "error": "Leave request not found"}
         
-        await self.db.leaves.update_one(
-            {"id": leave_id},
-            {"$set": {
-                "status": "rejected",
-                "approved_by": self.user_id,
-                "rejection_reason": reason,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        update_fields = {"status": "rejected", "approved_by": self.user_id, "rejection_reason": reason, "updated_at": db_now()}
+        await self._write("leaves", UpdateOne({"id": leave_id}, {"$set": update_fields}))
+        await self._after_write([leave["user_id"]], "leave_status_changed", leave["status"], "rejected")
+        self._leaves.patch(leave_id, update_fields)
         
-        user = await self.db.users.find_one({"id": leave["user_id"]})
+        user = await self._find_user(leave["user_id"])
         
         return {
             "success": True,
@@ -611,10 +918,12 @@ class AIActionExecutor:
             return {"success": False, "action": "list_pending_leaves", "error": "Insufficient permissions"}
         
         leaves = await self.db.leaves.find({"status": "pending"}).to_list(100)
+        users = await self._users.load_many([leave["user_id"] for leave in leaves])
         
         leave_summaries = []
         for leave in leaves:
-            user = await self.db.users.find_one({"id": leave["user_id"]})
+            self._leaves.prime(leave["id"], leave)
+            user = users.get(leave["user_id"])
             leave_summaries.append({
                 "leave_id": leave["id"],
                 "user": user.get("name") if user else leave["user_id"],
@@ -638,6 +947,8 @@ class AIActionExecutor:
         """Mark attendance"""
         today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
         
+        # Looked up by (user, date) rather than id, so earlier queued writes must land first
+        await self.flush_writes()
         existing = await self.db.attendance.find_one({"user_id": self.user_id, "date": today})
         if existing:
             return {"success": False, "action": "mark_attendance", "error": "Already marked attendance for today"}
@@ -648,14 +959,15 @@ class AIActionExecutor:
             "id": str(uuid.uuid4()),
             "user_id": self.user_id,
             "date": today,
-            "check_in": datetime.now(timezone.utc).isoformat(),
+            "check_in": db_now(),
             "check_out": None,
             "status": "present" if work_mode == "wfo" else "wfh",
             "work_mode": work_mode,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": db_now()
         }
         
-        await self.db.attendance.insert_one(attendance)
+        await self._write("attendance", InsertOne(attendance))
+        await self._after_write([self.user_id], "attendance_marked", today, attendance["status"])
         
         return {
             "success": True,
@@ -676,17 +988,19 @@ class AIActionExecutor:
         if not work_mode:
             return {"success": False, "action": "update_work_mode", "error": "work_mode required (wfo/wfh/hybrid)"}
         
+        await self.flush_writes()
         attendance = await self.db.attendance.find_one({"user_id": self.user_id, "date": today})
         if not attendance:
             return {"success": False, "action": "update_work_mode", "error": "No attendance record for today. Mark attendance first"}
         
-        await self.db.attendance.update_one(
+        await self._write("attendance", UpdateOne(
             {"user_id": self.user_id, "date": today},
             {"$set": {
                 "work_mode": work_mode,
                 "status": "present" if work_mode == "wfo" else "wfh"
             }}
-        )
+        ))
+        await self._after_write([self.user_id])
         
         return {
             "success": True,
@@ -716,10 +1030,11 @@ class AIActionExecutor:
             "content": content,
             "created_by": self.user_id,
             "target_roles": params.get("target_roles", []),
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "audience": build_audience(None, params.get("target_roles")),
+            "created_at": db_now()
         }
         
-        await self.db.announcements.insert_one(announcement)
+        await self._write("announcements", InsertOne(announcement))
         
         return {
             "success": True,
@@ -770,13 +1085,13 @@ class AIActionExecutor:
         if self.user_role not in ["admin", "hr", "team_lead"]:
             return {"success": False, "action": "generate_team_summary", "error": "Only Team Leads can generate team summaries"}
         
-        tasks = await self.db.tasks.find({"created_by": self.user_id}).to_list(1000)
+        by_status = await self._task_status_totals({"created_by": self.user_id})
         
-        total_tasks = len(tasks)
-        completed = len([t for t in tasks if t["status"] == "completed"])
-        in_progress = len([t for t in tasks if t["status"] == "in_progress"])
-        pending = len([t for t in tasks if t["status"] == "todo"])
-        blocked = len([t for t in tasks if t["status"] == "blocked"])
+        total_tasks = sum(group["count"] for group in by_status.values())
+        completed = by_status.get("completed", {}).get("count", 0)
+        in_progress = by_status.get("in_progress", {}).get("count", 0)
+        pending = by_status.get("todo", {}).get("count", 0)
+        blocked = by_status.get("blocked", {}).get("count", 0)
         
         return {
             "success": True,
@@ -800,27 +1115,26 @@ class AIActionExecutor:
         if not employee_email:
             return {"success": False, "action": "generate_employee_report", "error": "employee_email required"}
         
-        employee = await self.db.users.find_one({"email": employee_email})
+        employee = await self._find_user_by_email(employee_email)
         if not employee:
             return {"success": False, "action": "generate_employee_report", "error": "Employee not found"}
         
         employee_id = employee["id"]
         
-        tasks = await self.db.tasks.find({"assigned_to": employee_id}).to_list(1000)
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t["status"] == "completed"])
-        
         end_date = datetime.now(timezone.utc).strftime('%Y-%m-%d')
         start_date = (datetime.now(timezone.utc) - timedelta(days=30)).strftime('%Y-%m-%d')
-        attendance = await self.db.attendance.find({
-            "user_id": employee_id,
-            "date": {"$gte": start_date, "$lte": end_date}
-        }).to_list(100)
-        
-        present_days = len([a for a in attendance if a["status"] in ["present", "wfh"]])
-        
-        leaves = await self.db.leaves.find({"user_id": employee_id}).to_list(100)
-        total_leaves = len(leaves)
+        # Counts only: nothing but the numbers leaves the database
+        by_status, present_days, total_leaves = await asyncio.gather(
+            self._task_status_totals({"assigned_to": employee_id}),
+            self.db.attendance.count_documents({
+                "user_id": employee_id,
+                "date": {"$gte": start_date, "$lte": end_date},
+                "status": {"$in": ["present", "wfh"]}
+            }),
+            self.db.leaves.count_documents({"user_id": employee_id})
+        )
+        total_tasks = sum(group["count"] for group in by_status.values())
+        completed_tasks = by_status.get("completed", {}).get("count", 0)
         
         return {
             "success": True,
@@ -854,20 +1168,31 @@ class AIActionExecutor:
         if not intern_email:
             return {"success": False, "action": "generate_intern_evaluation", "error": "intern_email required"}
         
-        intern = await self.db.users.find_one({"email": intern_email, "role": "intern"})
-        if not intern:
+        intern = await self._find_user_by_email(intern_email)
+        if not intern or intern.get("role") != "intern":
             return {"success": False, "action": "generate_intern_evaluation", "error": "Intern not found"}
         
         intern_id = intern["id"]
         
-        tasks = await self.db.tasks.find({"assigned_to": intern_id}).to_list(1000)
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t["status"] == "completed"])
-        avg_progress = sum([t.get("progress", 0) for t in tasks]) / total_tasks if total_tasks > 0 else 0
+        by_status, attendance_facets = await asyncio.gather(
+            self._task_status_totals({"assigned_to": intern_id}),
+            self.db.attendance.aggregate([
+                {"$match": {"user_id": intern_id}},
+                {"$group": {
+                    "_id": None,
+                    "total_days": {"$sum": 1},
+                    "present_days": {"$sum": {"$cond": [{"$in": ["$status", ["present", "wfh"]]}, 1, 0]}}
+                }}
+            ]).to_list(1)
+        )
+        total_tasks = sum(group["count"] for group in by_status.values())
+        completed_tasks = by_status.get("completed", {}).get("count", 0)
+        total_progress = sum(group["progress"] for group in by_status.values())
+        avg_progress = total_progress / total_tasks if total_tasks > 0 else 0
         
-        attendance = await self.db.attendance.find({"user_id": intern_id}).to_list(1000)
-        total_days = len(attendance)
-        present_days = len([a for a in attendance if a["status"] in ["present", "wfh"]])
+        attendance_totals = attendance_facets[0] if attendance_facets else {"total_days": 0, "present_days": 0}
+        total_days = attendance_totals["total_days"]
+        present_days = attendance_totals["present_days"]
         
         performance_score = (completed_tasks / total_tasks * 50 + avg_progress * 0.3 + present_days / total_days * 20) if total_tasks > 0 and total_days > 0 else 0
         
@@ -895,7 +1220,28 @@ class AIActionExecutor:
     async def _summarize_tasks(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Summarize current user's tasks with urgent task identification"""
         try:
-            tasks = await self.db.tasks.find({"assigned_to": self.user_id}).sort("created_at", -1).to_list(100)
+            # Window, counts and the top 5 are all computed server-side over the
+            # 100 most recent tasks; only the five urgent tasks come back as documents
+            facets = await self.db.tasks.aggregate([
+                {"$match": {"assigned_to": self.user_id}},
+                {"$sort": {"created_at": -1}},
+                {"$limit": 100},
+                {"$facet": {
+                    "total": [{"$count": "count"}],
+                    "by_status": [
+                        {"$group": {"_id": {"$cond": [{"$eq": [{"$type": "$status"}, "missing"]}, "todo", "$status"]}, "count": {"$sum": 1}}}
+                    ],
+                    "urgent": [
+                        {"$match": {"status": {"$in": ["todo", "in_progress"]}}},
+                        {"$addFields": URGENT_SORT_FIELDS},
+                        {"$sort": {"_deadline_unset": 1, "_deadline_at": 1, "_priority_rank": 1, "created_at": -1}},
+                        {"$limit": 5},
+                        {"$project": {"_id": 0, "id": 1, "title": 1, "status": 1, "priority": 1, "deadline": 1,
+                                      "progress": 1, "assigned_to": 1, "created_by": 1}}
+                    ]
+                }}
+            ]).to_list(1)
+            facet = facets[0] if facets else {"total": [], "by_status": [], "urgent": []}
             
             status_counts = {
                 "todo": 0,
@@ -903,22 +1249,11 @@ class AIActionExecutor:
                 "completed": 0,
                 "blocked": 0
             }
+            for group in facet["by_status"]:
+                if group["_id"] in status_counts:
+                    status_counts[group["_id"]] = group["count"]
             
-            for task in tasks:
-                status = task.get("status", "todo")
-                if status in status_counts:
-                    status_counts[status] += 1
-            
-            urgent_tasks = []
-            for task in tasks:
-                if task.get("status") in ["todo", "in_progress"]:
-                    urgent_tasks.append(task)
-            
-            priority_order = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
-            urgent_tasks.sort(key=lambda t: (
-                t.get("deadline", "9999-12-31"),
-                priority_order.get(t.get("priority", "medium"), 2)
-            ))
+            urgent_tasks = facet["urgent"]
             
             # Get user info for enrichment
             all_user_ids = list(set([task["assigned_to"] for task in urgent_tasks[:5]] + [task["created_by"] for task in urgent_tasks[:5]]))
@@ -941,7 +1276,7 @@ class AIActionExecutor:
                 "success": True,
                 "action": "summarize_tasks",
                 "details": {
-                    "total": len(tasks),
+                    "total": facet["total"][0]["count"] if facet["total"] else 0,
                     "by_status": status_counts,
                     "urgent_tasks": top_tasks
                 }
@@ -956,13 +1291,9 @@ class AIActionExecutor:
     async def _summarize_notifications(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Summarize recent notifications for current user"""
         try:
-            query = {
-                "$or": [
-                    {"user_id": self.user_id},
-                    {"target_roles": self.user_role}
-                ]
-            }
+            query = {"audience": {"$in": audience_keys(self.user_id, self.user_role)}}
             notifications = await self.db.notifications.find(query).sort("created_at", -1).limit(20).to_list(20)
+            read_state = await self.db.notification_reads.find_one({"_id": self.user_id})
             
             type_counts = {}
             unread_count = 0
@@ -970,12 +1301,12 @@ class AIActionExecutor:
             for notif in notifications:
                 notif_type = notif.get("type", "other")
                 type_counts[notif_type] = type_counts.get(notif_type, 0) + 1
-                if not notif.get("is_read", False):
+                if not is_notification_read(notif, read_state, self.user_id):
                     unread_count += 1
             
             recent_unread = []
             for notif in notifications:
-                if not notif.get("is_read", False) and len(recent_unread) < 5:
+                if not is_notification_read(notif, read_state, self.user_id) and len(recent_unread) < 5:
                     recent_unread.append({
                         "title": notif.get("title"),
                         "type": notif.get("type"),
@@ -1008,7 +1339,7 @@ class AIActionExecutor:
             
             # If email provided, look up user_id
             if target_user_email and not target_user_id:
-                target_user = await self.db.users.find_one({"email": target_user_email})
+                target_user = await self._find_user_by_email(target_user_email)
                 if target_user:
                     target_user_id = target_user["id"]
                 else:
@@ -1046,7 +1377,7 @@ class AIActionExecutor:
                     }
             
             # Get target user info
-            target_user = await self.db.users.find_one({"id": target_user_id})
+            target_user = await self._find_user(target_user_id)
             if not target_user:
                 return {
                     "success": False,
@@ -1122,10 +1453,15 @@ class AIActionExecutor:
 
 
 def get_action_definitions() -> List[Dict[str, Any]]:
-    """Return available actions with descriptions"""
+    """Return available actions with descriptions.
+
+    "access" is "read" for actions that only query and "write" for actions
+    that change data; reads may run concurrently and their plans be cached.
+    """
     return [
         {
             "name": "create_task",
+            "access": "write",
             "description": "Create a new task and assign it to a user",
             "parameters": {
                 "title": "Task title (required)",
@@ -1139,6 +1475,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "update_task_status",
+            "access": "write",
             "description": "Update status or progress of a task",
             "parameters": {
                 "task_id": "Task ID (required)",
@@ -1149,6 +1486,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "reassign_task",
+            "access": "write",
             "description": "Reassign a task to another user",
             "parameters": {
                 "task_id": "Task ID (required)",
@@ -1158,6 +1496,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "list_user_tasks",
+            "access": "read",
             "description": "List tasks for current user or specified user (with hierarchy checks)",
             "parameters": {
                 "user_id": "User ID (optional, defaults to current user)",
@@ -1170,6 +1509,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "get_team_members",
+            "access": "read",
             "description": "Get team members under a team lead based on department",
             "parameters": {
                 "team_lead_email": "Team lead email (optional, used by HR/Admin to inspect specific team)"
@@ -1178,12 +1518,14 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "summarize_tasks",
+            "access": "read",
             "description": "Summarize current user's tasks with counts by status and highlight top 5 urgent tasks",
             "parameters": {},
             "permissions": ["admin", "hr", "team_lead", "employee", "intern"]
         },
         {
             "name": "apply_leave",
+            "access": "write",
             "description": "Apply for leave",
             "parameters": {
                 "leave_type": "sick/casual/earned/unpaid (optional, default: casual)",
@@ -1195,6 +1537,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "cancel_leave",
+            "access": "write",
             "description": "Cancel own pending leave request",
             "parameters": {
                 "leave_id": "Leave ID (required)"
@@ -1203,6 +1546,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "approve_leave",
+            "access": "write",
             "description": "Approve a pending leave request",
             "parameters": {
                 "leave_id": "Leave ID (required)"
@@ -1211,6 +1555,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "reject_leave",
+            "access": "write",
             "description": "Reject a leave request",
             "parameters": {
                 "leave_id": "Leave ID (required)",
@@ -1220,12 +1565,14 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "list_pending_leaves",
+            "access": "read",
             "description": "List all pending leave requests",
             "parameters": {},
             "permissions": ["admin", "hr", "team_lead"]
         },
         {
             "name": "mark_attendance",
+            "access": "write",
             "description": "Mark attendance for today",
             "parameters": {
                 "work_mode": "wfo/wfh/hybrid (required)"
@@ -1234,6 +1581,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "update_work_mode",
+            "access": "write",
             "description": "Update work mode for today",
             "parameters": {
                 "work_mode": "wfo/wfh/hybrid (required)"
@@ -1242,6 +1590,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "get_attendance_summary",
+            "access": "read",
             "description": "Get today's attendance and last 7-day summary for a user (self by default, or specify user_email/user_id with proper permissions)",
             "parameters": {
                 "user_id": "Optional: target user id (admin/hr/team_lead only for subordinates)",
@@ -1251,6 +1600,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "create_announcement",
+            "access": "write",
             "description": "Create company announcement",
             "parameters": {
                 "title": "Announcement title (required)",
@@ -1261,18 +1611,21 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "list_team_tasks",
+            "access": "read",
             "description": "List all tasks for the team",
             "parameters": {},
             "permissions": ["admin", "hr", "team_lead"]
         },
         {
             "name": "generate_team_summary",
+            "access": "read",
             "description": "Generate team performance summary",
             "parameters": {},
             "permissions": ["admin", "hr", "team_lead"]
         },
         {
             "name": "generate_employee_report",
+            "access": "read",
             "description": "Generate detailed employee report",
             "parameters": {
                 "employee_email": "Employee email (required)"
@@ -1281,6 +1634,7 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "generate_intern_evaluation",
+            "access": "read",
             "description": "Generate intern performance evaluation",
             "parameters": {
                 "intern_email": "Intern email (required)"
@@ -1289,8 +1643,13 @@ def get_action_definitions() -> List[Dict[str, Any]]:
         },
         {
             "name": "summarize_notifications",
+            "access": "read",
             "description": "Summarize recent notifications for current user with counts by type and unread items",
             "parameters": {},
             "permissions": ["admin", "hr", "team_lead", "employee", "intern"]
         }
     ]
+
+
+# Derived from the access tags above: plans made solely of these are safe to cache and replay
+READ_ONLY_ACTIONS = frozenset(a["name"] for a in get_action_definitions() if a["access"] == "read")
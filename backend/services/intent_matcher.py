@@ -0,0 +1,239 @@
+"""Deterministic intent matcher for the most common /api/ai/execute phrasings.
+
+Covers the English and Hindi-English commands the execute system prompt
+enumerates ("show my tasks", "mera task dikhao", "aaj WFH mark karo",
+"kal ka leave laga do", ...). A message is only matched when exactly one
+intent fires and nearly every token is known vocabulary; anything else is
+left to the LLM. Matches are returned in the same {"thought", "actions"}
+shape the LLM produces, so the executor path is identical.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+import re
+
+DEFAULT_MIN_CONFIDENCE = 0.9
+
+# Multi-word phrases are folded into single tokens before matching
+PHRASES = {
+    "check in": "checkin",
+    "check-in": "checkin",
+    "work from home": "wfh",
+    "work from office": "wfo",
+    "ghar se": "wfh",
+    "in progress": "in_progress",
+    "in-progress": "in_progress",
+    "what should i do": "whatnext",
+    "kya karna hai": "whatnext",
+    "team members": "team_members",
+    "team member": "team_members",
+    "who is in my team": "team_members",
+    "mere team mein kaun hai": "team_members",
+    "day after tomorrow": "parso",
+    "created by me": "created_by_me",
+    "i assigned": "created_by_me",
+    "maine assign": "created_by_me",
+    "maine diye": "created_by_me",
+}
+
+FILLER = {
+    "my", "mera", "meri", "mere", "me", "mujhe", "i", "apna", "apni", "apne",
+    "the", "a", "an", "please", "pls", "plz", "kindly", "hi", "hey", "ok", "okay",
+    "karo", "kar", "kardo", "krdo", "kro", "karna", "karein", "do", "de", "dedo", "dena", "dijiye",
+    "ka", "ki", "ke", "ko", "for", "of", "hai", "hain", "kya", "what", "are", "is", "am",
+    "can", "you", "could", "would", "show", "list", "dikhao", "dikha", "dikhado", "dikhana",
+    "batao", "bata", "btao", "see", "view", "check", "get", "give", "tell", "about", "all",
+    "current", "status", "now", "abhi", "to", "se", "tak", "mein", "main", "mai", "want", "need",
+    "sab", "saare", "sare", "with", "on", "from", "as", "liye", "chahta", "chahti", "hoon", "hu",
+}
+TASK_WORDS = {"task", "tasks", "kaam", "todo", "todos"}
+WORK_WORDS = {"work"}
+SUMMARY_WORDS = {"summary", "summarize", "summarise", "overview", "recap", "whatnext"}
+ATTENDANCE_WORDS = {"attendance", "hazri", "haazri", "hajri"}
+MARK_WORDS = {"mark", "checkin", "laga", "lagao", "lagado", "lagana", "lagwa"}
+CHANGE_WORDS = {"change", "update", "switch", "badlo", "badal", "badaldo"}
+WORK_MODE_WORDS = {"wfh": "wfh", "wfo": "wfo", "office": "wfo", "hybrid": "hybrid", "mode": None}
+LEAVE_WORDS = {"leave", "leaves", "chutti", "chhutti", "chhuti", "chuti", "holiday", "off"}
+APPLY_WORDS = {"apply", "laga", "lagao", "lagado", "chahiye", "request", "take", "lena", "le", "lelo", "book"}
+SICK_WORDS = {"sick", "bimar", "beemar", "unwell", "ill", "bukhar", "fever"}
+TEAM_WORDS = {"team_members", "team", "members", "member", "log", "kaun", "who", "reports"}
+NOTIFICATION_WORDS = {"notification", "notifications", "alerts", "alert", "updates"}
+TASK_STATUS_WORDS = {
+    "pending": "todo", "todo": "todo", "baaki": "todo", "baki": "todo",
+    "active": "in_progress", "ongoing": "in_progress", "in_progress": "in_progress", "chal": "in_progress",
+    "completed": "completed", "done": "completed", "finished": "completed", "khatam": "completed",
+    "blocked": "blocked",
+}
+DATE_WORDS = {"aaj": 0, "aj": 0, "today": 0, "kal": 1, "kl": 1, "tomorrow": 1, "parso": 2, "parson": 2}
+NEXT_WORDS = {"next", "agle", "agla", "agli", "coming", "this"}
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "somvar": 0, "tuesday": 1, "tue": 1, "mangalvar": 1,
+    "wednesday": 2, "wed": 2, "budhvar": 2, "thursday": 3, "thu": 3, "guruvar": 3,
+    "friday": 4, "fri": 4, "shukravar": 4, "saturday": 5, "sat": 5, "shanivar": 5,
+    "sunday": 6, "sun": 6, "ravivar": 6,
+}
+SHOW_WORDS = {"show", "list", "dikhao", "dikha", "dikhado", "batao", "bata", "btao", "see", "view", "check", "status", "kya", "what"}
+# Verbs that mean the user wants something the matcher can't express (ids, other people)
+UNSUPPORTED_VERBS = {
+    "create", "banao", "bana", "assign", "reassign", "delete", "cancel", "approve", "reject",
+    "complete", "extend", "badha", "badhao", "badhado", "aage", "mat", "nahi", "dont", "not", "no",
+}
+# Questions and statements about leave/attendance ("am i on leave today", "why is my wfh
+# rejected") must never turn into writes. "do" only counts up front: "laga do" is imperative.
+QUESTION_WORDS = {"am", "is", "are", "was", "were", "should", "shall", "why", "how", "when", "will", "did", "does"}
+LEADING_QUESTION_WORDS = QUESTION_WORDS | {"do", "can", "could", "would", "kya", "what"}
+# Someone other than the caller is the subject ("my colleague is on leave tomorrow")
+THIRD_PARTY_WORDS = {
+    "he", "she", "they", "him", "her", "his", "their", "them", "colleague", "colleagues", "teammate", "teammates",
+    "manager", "boss", "friend", "someone", "somebody", "everyone", "everybody", "sir", "maam",
+    "uska", "uski", "uske", "unka", "unki", "unke", "wo", "woh", "vo", "voh", "yeh",
+}
+WRITE_INTENTS = {"apply_leave", "mark_attendance", "update_work_mode"}
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+KNOWN = (
+    FILLER | TASK_WORDS | WORK_WORDS | SUMMARY_WORDS | ATTENDANCE_WORDS | MARK_WORDS | CHANGE_WORDS
+    | set(WORK_MODE_WORDS) | LEAVE_WORDS | APPLY_WORDS | SICK_WORDS | TEAM_WORDS | NOTIFICATION_WORDS
+    | set(TASK_STATUS_WORDS) | set(DATE_WORDS) | NEXT_WORDS | set(WEEKDAYS) | {"created_by_me", "assigned"}
+)
+
+
+@dataclass
+class IntentMatch:
+    intent: str
+    confidence: float
+    thought: str
+    actions: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def plan(self) -> Dict[str, Any]:
+        return {"thought": self.thought, "actions": self.actions}
+
+
+def normalize(message: str) -> List[str]:
+    text = " " + message.lower().strip() + " "
+    text = re.sub(r"[^\w@.\-\s]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    for phrase, token in PHRASES.items():
+        text = text.replace(f" {phrase} ", f" {token} ")
+    return [token.strip(".-") for token in text.split() if token.strip(".-")]
+
+
+def _resolve_dates(tokens: List[str], today: datetime) -> List[str]:
+    dates = []
+    for index, token in enumerate(tokens):
+        if token in DATE_WORDS:
+            dates.append(today + timedelta(days=DATE_WORDS[token]))
+        elif token in WEEKDAYS:
+            ahead = (WEEKDAYS[token] - today.weekday()) % 7
+            if ahead == 0 or (index > 0 and tokens[index - 1] in NEXT_WORDS and tokens[index - 1] != "this"):
+                # "next friday" on a Friday, or a bare weekday naming today, means a week out
+                ahead = ahead or 7
+            dates.append(today + timedelta(days=ahead))
+        elif ISO_DATE.match(token):
+            try:
+                dates.append(datetime.strptime(token, "%Y-%m-%d"))
+            except ValueError:
+                continue
+    return [date.strftime("%Y-%m-%d") for date in dates]
+
+
+def match_intent(
+    message: str,
+    allowed_actions: Optional[Set[str]] = None,
+    today: Optional[datetime] = None,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+) -> Optional[IntentMatch]:
+    """Return a single-action plan for a confidently recognised command, else None"""
+    tokens = normalize(message)
+    if not tokens:
+        return None
+    today = today or datetime.now(timezone.utc)
+    words = set(tokens)
+
+    known = sum(1 for token in tokens if token in KNOWN or ISO_DATE.match(token))
+    confidence = known / len(tokens)
+    if confidence < min_confidence or words & UNSUPPORTED_VERBS or any("@" in token for token in tokens):
+        return None
+
+    dates = _resolve_dates(tokens, today)
+    # Writes are only matched for first-person imperatives; anything else goes to the LLM
+    not_a_command = (
+        message.strip().endswith("?")
+        or tokens[0] in LEADING_QUESTION_WORDS
+        or bool(words & QUESTION_WORDS - {"am", "is", "are"})
+        or bool(words & (THIRD_PARTY_WORDS | TEAM_WORDS))
+    )
+    candidates: List[IntentMatch] = []
+
+    if words & NOTIFICATION_WORDS:
+        candidates.append(IntentMatch("summarize_notifications", confidence, "User wants a summary of their notifications",
+                                      [{"name": "summarize_notifications", "params": {}}]))
+
+    if "team_members" in words or ("team" in words and words & {"members", "member", "log", "kaun", "who", "reports"}):
+        candidates.append(IntentMatch("get_team_members", confidence, "User wants to see their direct reports",
+                                      [{"name": "get_team_members", "params": {}}]))
+
+    if words & LEAVE_WORDS and not words & TASK_WORDS:
+        # Only an explicit apply verb ("kal ka leave laga do") applies; "tomorrow is holiday",
+        # "am i on leave today" and "show my leaves for today" are for the LLM
+        if dates and words & APPLY_WORDS and not not_a_command:
+            leave_type = "sick" if words & SICK_WORDS else "casual"
+            candidates.append(IntentMatch("apply_leave", confidence, f"User wants to apply {leave_type} leave",
+                                          [{"name": "apply_leave", "params": {
+                                              "start_date": dates[0],
+                                              "end_date": dates[-1],
+                                              "leave_type": leave_type,
+                                              "reason": "Sick" if leave_type == "sick" else "Personal",
+                                          }}]))
+        else:
+            # "leave" without a date (policy questions, pending approvals) needs the LLM
+            return None
+
+    modes = [WORK_MODE_WORDS[token] for token in tokens if WORK_MODE_WORDS.get(token)]
+    if words & ATTENDANCE_WORDS or modes or "checkin" in words or "mode" in words:
+        if any(date != today.strftime("%Y-%m-%d") for date in dates):
+            # Attendance actions only act on today; "kal wfh" needs the LLM
+            return None
+        work_mode = modes[0] if modes else "wfo"
+        if words & CHANGE_WORDS:
+            if not modes:
+                return None
+            candidates.append(IntentMatch("update_work_mode", confidence, f"User wants to switch today's work mode to {work_mode.upper()}",
+                                          [{"name": "update_work_mode", "params": {"work_mode": work_mode}}]))
+        elif words & MARK_WORDS or modes:
+            candidates.append(IntentMatch("mark_attendance", confidence, f"User wants to mark attendance as {work_mode.upper()}",
+                                          [{"name": "mark_attendance", "params": {"work_mode": work_mode}}]))
+        else:
+            candidates.append(IntentMatch("get_attendance_summary", confidence, "User wants to see their attendance summary",
+                                          [{"name": "get_attendance_summary", "params": {}}]))
+
+    if words & TASK_WORDS or (words & WORK_WORDS and "mode" not in words) or "whatnext" in words:
+        if words & TEAM_WORDS:
+            # "show team tasks" wants a team-scoped action, not the caller's own list
+            return None
+        if words & SUMMARY_WORDS or "whatnext" in words or (words & WORK_WORDS and not words & TASK_WORDS):
+            candidates.append(IntentMatch("summarize_tasks", confidence, "User wants a summary of their tasks with urgent items highlighted",
+                                          [{"name": "summarize_tasks", "params": {}}]))
+        else:
+            params: Dict[str, Any] = {}
+            statuses = [TASK_STATUS_WORDS[token] for token in tokens if token in TASK_STATUS_WORDS]
+            if len(set(statuses)) > 1:
+                return None
+            if statuses:
+                params["status"] = statuses[0]
+            if "created_by_me" in words:
+                params["created_by_email"] = "me"
+            candidates.append(IntentMatch("list_user_tasks", confidence, "User wants to see their tasks",
+                                          [{"name": "list_user_tasks", "params": params}]))
+
+    if len(candidates) != 1:
+        # Nothing recognised, or a compound request ("tasks and attendance") the LLM should plan
+        return None
+    match = candidates[0]
+    if match.intent in WRITE_INTENTS and not_a_command:
+        return None
+    if allowed_actions is not None and any(action["name"] not in allowed_actions for action in match.actions):
+        return None
+    return match
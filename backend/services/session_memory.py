@@ -0,0 +1,161 @@
+"""Bounded per-session conversation memory for the AI endpoints.
+
+Each (user, session) gets one document in db.ai_sessions holding the last
+few turns verbatim plus a rolling summary. When a turn falls out of the
+verbatim window it is folded into the summary as a single clipped line, and
+the summary itself drops its oldest lines past its own budget, so the
+document - and the prompt block rendered from it - stays bounded however
+long the session runs. Folding is extractive: no extra LLM call on the
+request path.
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+import os
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.services.storage import db_now
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TURNS = int(os.environ.get('SESSION_MEMORY_TURNS', '6'))
+DEFAULT_SUMMARY_TOKENS = int(os.environ.get('SESSION_SUMMARY_TOKENS', '400'))
+# Verbatim turns are clipped so one pasted wall of text can't crowd out the rest
+TURN_MAX_CHARS = 1200
+SUMMARY_LINE_MAX_CHARS = 160
+MAX_WRITE_ATTEMPTS = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap provider-agnostic estimate (~4 characters per token)"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class SessionMemory:
+    """Load, render and incrementally update session memory documents"""
+
+    def __init__(self, max_turns: int = DEFAULT_MAX_TURNS, summary_tokens: int = DEFAULT_SUMMARY_TOKENS):
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.loads = 0
+        self.records = 0
+        self.folded_turns = 0
+        self.dropped_summary_lines = 0
+        self.conflicts = 0
+        self.budget_trims = 0
+
+    @staticmethod
+    def _key(user_id: str, session_id: str) -> str:
+        return f"{user_id}:{session_id}"
+
+    async def load(self, db, user_id: str, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not session_id:
+            return None
+        self.loads += 1
+        return await db.ai_sessions.find_one({"_id": self._key(user_id, session_id)}, {"turns": 1, "summary": 1})
+
+    def render(self, memory: Optional[Dict[str, Any]], token_budget: int) -> str:
+        """Prompt block for the session, newest turns first into the budget.
+
+        Older verbatim turns are dropped before newer ones, and the summary
+        is added only if it still fits after the turns.
+        """
+        if not memory or token_budget <= 0:
+            return ""
+        header = "\n\nCONVERSATION SO FAR IN THIS SESSION:\n"
+        remaining = token_budget - estimate_tokens(header)
+
+        turn_lines: List[str] = []
+        turns = memory.get("turns", [])
+        for turn in reversed(turns):
+            line = f"User: {turn['user']}\nAssistant: {turn['assistant']}\n"
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            turn_lines.insert(0, line)
+            remaining -= cost
+
+        summary_block = ""
+        summary = memory.get("summary", [])
+        if summary:
+            summary_block = "Earlier in this session:\n" + "\n".join(f"  - {line}" for line in summary) + "\n"
+            if estimate_tokens(summary_block) > remaining:
+                summary_block = ""
+
+        if len(turn_lines) < len(turns) or (summary and not summary_block):
+            self.budget_trims += 1
+        if not turn_lines and not summary_block:
+            return ""
+        return header + summary_block + "".join(turn_lines)
+
+    def _fold(self, turns: List[Dict[str, Any]], summary: List[str]):
+        while len(turns) > self.max_turns:
+            oldest = turns.pop(0)
+            summary.append(_clip(f"User asked: {oldest['user']} -> {oldest['assistant']}", SUMMARY_LINE_MAX_CHARS))
+            self.folded_turns += 1
+        while summary and estimate_tokens("\n".join(summary)) > self.summary_tokens:
+            summary.pop(0)
+            self.dropped_summary_lines += 1
+
+    async def record(self, db, user_id: str, session_id: Optional[str], message: str, response: str):
+        """Append a turn, folding overflow into the summary.
+
+        Writes are compare-and-swap on a version counter so concurrent turns
+        in the same session don't overwrite each other.
+        """
+        if not session_id:
+            return
+        self.records += 1
+        key = self._key(user_id, session_id)
+        turn = {"user": _clip(message, TURN_MAX_CHARS), "assistant": _clip(response, TURN_MAX_CHARS)}
+
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            doc = await db.ai_sessions.find_one({"_id": key})
+            version = doc.get("version", 0) if doc else 0
+            turns = (doc.get("turns", []) if doc else []) + [turn]
+            summary = list(doc.get("summary", [])) if doc else []
+            self._fold(turns, summary)
+
+            update = {"$set": {
+                "user_id": user_id,
+                "session_id": session_id,
+                "turns": turns,
+                "summary": summary,
+                "version": version + 1,
+                "updated_at": db_now(),
+            }}
+            if doc is None:
+                try:
+                    # Filter misses any doc a concurrent first turn just created, so the upsert collides instead of overwriting
+                    await db.ai_sessions.update_one(
+                        {"_id": key, "version": {"$exists": False}},
+                        {**update, "$setOnInsert": {"created_at": db_now()}},
+                        upsert=True
+                    )
+                    return
+                except DuplicateKeyError:
+                    pass
+            else:
+                result = await db.ai_sessions.update_one({"_id": key, "version": version}, update)
+                if result.modified_count:
+                    return
+            self.conflicts += 1
+        logger.warning(f"Session memory update for {key} lost after {MAX_WRITE_ATTEMPTS} attempts")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_turns": self.max_turns,
+            "summary_tokens": self.summary_tokens,
+            "loads": self.loads,
+            "records": self.records,
+            "folded_turns": self.folded_turns,
+            "dropped_summary_lines": self.dropped_summary_lines,
+            "budget_trims": self.budget_trims,
+            "conflicts": self.conflicts,
+        }
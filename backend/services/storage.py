@@ -0,0 +1,62 @@
+"""Storage conventions shared by server.py and the services.
+
+Datetime representation (DATETIME_STORAGE), notification/announcement
+audiences and per-user notification read state are defined once here so the
+API handlers and the AI executor can't drift apart.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import os
+
+# Datetime storage: "bson" writes native BSON dates, "iso" keeps the legacy
+# isoformat strings. Reads accept both while the backfill migration runs.
+DATETIME_STORAGE = os.environ.get('DATETIME_STORAGE', 'bson')
+
+
+def parse_db_datetime(value: Any) -> Any:
+    """Dual-read a stored datetime: native BSON date or legacy ISO string -> aware datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def to_db_datetime(value: Any) -> Any:
+    """Convert a datetime into the configured storage representation"""
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    if DATETIME_STORAGE == 'iso':
+        return value.isoformat()
+    return value
+
+
+def db_now() -> Any:
+    return to_db_datetime(datetime.now(timezone.utc))
+
+
+def build_audience(user_id: Optional[str], target_roles: Optional[List[str]]) -> List[str]:
+    """Multikey audience for notifications/announcements: user:<id>, role:<role>, or all"""
+    audience = [f"user:{user_id}"] if user_id else []
+    audience.extend(f"role:{role}" for role in target_roles or [])
+    return audience or ["all"]
+
+
+def audience_keys(user_id: str, role: str) -> List[str]:
+    """Every audience value a given user belongs to (the feed's $in list)"""
+    return [f"user:{user_id}", f"role:{role}", "all"]
+
+
+def is_notification_read(notification: Dict[str, Any], read_state: Optional[Dict[str, Any]], user_id: str) -> bool:
+    """Per-user watermark plus sparse read ids, from db.notification_reads"""
+    read_state = read_state or {}
+    last_read_at = parse_db_datetime(read_state.get("last_read_at"))
+    if last_read_at and parse_db_datetime(notification.get("created_at")) <= last_read_at:
+        return True
+    if notification.get("id") in read_state.get("read_ids", []):
+        return True
+    # Legacy per-document flag is only trustworthy on user-targeted notifications
+    return notification.get("user_id") == user_id and notification.get("is_read", False)
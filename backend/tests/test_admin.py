@@ -0,0 +1,99 @@
+"""
+Tests for admin maintenance endpoints
+"""
+
+import pytest
+from .conftest import auth_headers
+
+
+@pytest.mark.asyncio
+async def test_admin_can_sync_and_report_indexes(client, admin_token):
+    """Test index manifest can be applied and reported on"""
+    headers = auth_headers(admin_token)
+
+    response = await client.post("/api/admin/indexes/sync", headers=headers)
+    assert response.status_code == 200
+    assert "email_unique" in response.json()["applied"]["users"]
+
+    response = await client.get("/api/admin/indexes", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert "tasks" in data
+    assert data["users"]["missing"] == []
+    index_names = [index["name"] for index in data["attendance"]["indexes"]]
+    assert "user_date_unique" in index_names
+    for index in data["tasks"]["indexes"]:
+        assert "ops" in index
+
+
+@pytest.mark.asyncio
+async def test_non_admin_cannot_view_index_report(client, hr_token):
+    """Test HR cannot access the index report"""
+    headers = auth_headers(hr_token)
+
+    response = await client.get("/api/admin/indexes", headers=headers)
+
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_admin_can_run_datetime_migration(client, admin_token):
+    """Test datetime backfill can be started and its status reported"""
+    headers = auth_headers(admin_token)
+
+    response = await client.post("/api/admin/migrations/datetimes?restart=true", headers=headers)
+    assert response.status_code in [200, 409]
+
+    response = await client.get("/api/admin/migrations/datetimes", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["storage"] in ["bson", "iso"]
+    assert "running" in data
+
+
+@pytest.mark.asyncio
+async def test_datetime_migration_rescans_strings_written_after_a_pass(client, test_db):
+    """Test a later pass converts ISO strings written after an earlier pass finished"""
+    from datetime import datetime
+    from server import migrate_datetimes
+    await test_db.tasks.insert_one({"id": "legacy-1", "created_at": "2025-01-02T03:04:05+00:00"})
+    await migrate_datetimes()
+    await test_db.tasks.insert_one({"id": "legacy-2", "created_at": "2025-02-03T04:05:06+00:00"})
+    progress = await migrate_datetimes()
+
+    for task_id in ["legacy-1", "legacy-2"]:
+        doc = await test_db.tasks.find_one({"id": task_id})
+        assert isinstance(doc["created_at"], datetime)
+    assert progress["tasks"]["passes"] == 2
+    assert progress["tasks"]["last_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_admin_metrics_report_cache_counters(client, admin_token, team_lead_token):
+    """Test subordinate cache counters are exposed"""
+    lead_headers = auth_headers(team_lead_token["token"])
+    await client.get("/api/tasks", headers=lead_headers)
+    await client.get("/api/tasks", headers=lead_headers)
+
+    response = await client.get("/api/admin/metrics", headers=auth_headers(admin_token))
+
+    assert response.status_code == 200
+    stats = response.json()["subordinate_cache"]
+    assert stats["hits"] >= 1
+    assert "misses" in stats
+
+
+@pytest.mark.asyncio
+async def test_admin_metrics_report_llm_pools(client, admin_token):
+    """Test LLM provider pool saturation stats are exposed"""
+    from server import llm_registry
+    llm_registry.pool("sk-test-metrics-key")
+    response = await client.get("/api/admin/metrics", headers=auth_headers(admin_token))
+    
+    assert response.status_code == 200
+    pools = response.json()["llm_pools"]
+    assert len(pools) >= 1
+    for pool in pools:
+        assert pool["in_flight"] <= pool["max_concurrency"]
+        assert "saturated" in pool
@@ -2,6 +2,7 @@
 Tests for AI assistant endpoints with mocked LLM calls
 """
 
+import json
 import pytest
 from unittest.mock import AsyncMock, patch
 from .conftest import auth_headers
@@ -301,3 +302,427 @@ async def test_ai_history_endpoint(client, employee_token, test_db):
     assert len(history) == 2
     assert history[0]["message"] == "First message"
     assert history[1]["message"] == "Second message"
+
+
+@pytest.mark.asyncio
+async def test_ai_chat_streams_server_sent_events(client, employee_token):
+    """Test /api/ai/chat streams tokens as SSE and saves the full reply"""
+    headers = auth_headers(employee_token["token"])
+    headers["Accept"] = "text/event-stream"
+    
+    async def fake_stream(user_message):
+        for text in ["Hello", ", ", "world"]:
+            yield text
+    
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.stream_message = fake_stream
+        mock_llm_class.return_value = mock_instance
+        
+        ai_request = {"message": "Hi", "session_id": "stream-session"}
+        response = await client.post("/api/ai/chat", json=ai_request, headers=headers)
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert events[0] == 'event: token\ndata: {"text": "Hello"}'
+    assert events[-1].startswith("event: done")
+    done = json.loads(events[-1].split("data: ", 1)[1])
+    assert done["session_id"] == "stream-session"
+    assert done["ttft_ms"] <= done["total_ms"]
+    
+    history = (await client.get("/api/ai/history?session_id=stream-session", headers=auth_headers(employee_token["token"]))).json()
+    assert history[-1]["response"] == "Hello, world"
+
+
+@pytest.mark.asyncio
+async def test_ai_execute_prompt_has_stable_role_prefix(client, employee_token, intern_token):
+    """Test per-role prompt prefix is identical across users and only context differs"""
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(return_value='{"thought": "Nothing to do", "actions": []}')
+        mock_llm_class.return_value = mock_instance
+        
+        ai_request = {"message": "hello", "session_id": "prompt-session"}
+        await client.post("/api/ai/execute", json=ai_request, headers=auth_headers(employee_token["token"]))
+        await client.post("/api/ai/execute", json=ai_request, headers=auth_headers(employee_token["token"]))
+        await client.post("/api/ai/execute", json=ai_request, headers=auth_headers(intern_token))
+        prompts = [call.kwargs["system_message"] for call in mock_llm_class.call_args_list]
+    
+    employee_prefix = prompts[0].split("CURRENT CONTEXT:")[0]
+    assert prompts[1].startswith(employee_prefix)
+    assert "Role: employee" in prompts[0].split("CURRENT CONTEXT:")[1]
+    assert "Role: intern" in prompts[2].split("CURRENT CONTEXT:")[1]
+    assert "@TOMORROW@" not in prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_ai_context_snapshot_cached_until_write(client, employee_token):
+    """Test repeated AI calls reuse the context snapshot and writes refresh it"""
+    headers = auth_headers(employee_token["token"])
+    ai_request = {"message": "hello", "session_id": "context-session"}
+    
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(return_value='{"thought": "Nothing to do", "actions": []}')
+        mock_llm_class.return_value = mock_instance
+        
+        await client.post("/api/ai/execute", json=ai_request, headers=headers)
+        await client.post("/api/ai/execute", json=ai_request, headers=headers)
+        leave_data = {"leave_type": "sick", "start_date": "2030-04-01", "end_date": "2030-04-02", "reason": "Flu"}
+        await client.post("/api/leave", json=leave_data, headers=headers)
+        await client.post("/api/ai/execute", json=ai_request, headers=headers)
+        prompts = [call.kwargs["system_message"] for call in mock_llm_class.call_args_list]
+    
+    assert prompts[0] == prompts[1]
+    assert "sick (2030-04-01 to 2030-04-02): pending" not in prompts[1]
+    assert "sick (2030-04-01 to 2030-04-02): pending" in prompts[2]
+
+
+@pytest.mark.asyncio
+async def test_ai_execute_replays_cached_read_only_plan(client, employee_token):
+    """Test a repeated read-only request reuses the cached plan instead of the LLM"""
+    headers = auth_headers(employee_token["token"])
+    read_plan = '{"thought": "Team overview", "actions": [{"name": "summarize_tasks", "params": {}}, {"name": "summarize_notifications", "params": {}}]}'
+    
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(return_value=read_plan)
+        mock_llm_class.return_value = mock_instance
+        
+        ai_request = {"message": "How is everything looking overall?", "session_id": "plan-cache"}
+        first = await client.post("/api/ai/execute", json=ai_request, headers=headers)
+        ai_request["message"] = "how is everything looking overall"
+        second = await client.post("/api/ai/execute", json=ai_request, headers=headers)
+        
+        assert mock_instance.send_message.await_count == 1
+    
+    assert [r["action"] for r in second.json()["actionsExecuted"]] == ["summarize_tasks", "summarize_notifications"]
+    assert first.json()["thought"] == second.json()["thought"]
+
+
+@pytest.mark.asyncio
+async def test_ai_execute_never_caches_write_plans(client, employee_token):
+    """Test plans containing write actions always go back to the LLM"""
+    headers = auth_headers(employee_token["token"])
+    write_plan = '{"thought": "Leave", "actions": [{"name": "apply_leave", "params": {"start_date": "2030-05-01", "end_date": "2030-05-01"}}]}'
+    
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(return_value=write_plan)
+        mock_llm_class.return_value = mock_instance
+        
+        ai_request = {"message": "I would like the first of May off please", "session_id": "plan-cache-write"}
+        await client.post("/api/ai/execute", json=ai_request, headers=headers)
+        await client.post("/api/ai/execute", json=ai_request, headers=headers)
+        
+        assert mock_instance.send_message.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_ai_execute_reads_after_write_see_the_write(client, employee_token):
+    """Test reads run concurrently but never ahead of an earlier write in the plan"""
+    headers = auth_headers(employee_token["token"])
+    plan = (
+        '{"thought": "Check in then review", "actions": ['
+        '{"name": "summarize_tasks", "params": {}}, '
+        '{"name": "summarize_notifications", "params": {}}, '
+        '{"name": "mark_attendance", "params": {"work_mode": "wfh"}}, '
+        '{"name": "get_attendance_summary", "params": {}}, '
+        '{"name": "list_user_tasks", "params": {}}]}'
+    )
+    
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(return_value=plan)
+        mock_llm_class.return_value = mock_instance
+        
+        ai_request = {"message": "Check me in from home and give me a rundown", "session_id": "plan-order"}
+        response = await client.post("/api/ai/execute", json=ai_request, headers=headers)
+    
+    results = response.json()["actionsExecuted"]
+    assert [r["action"] for r in results] == [
+        "summarize_tasks", "summarize_notifications", "mark_attendance", "get_attendance_summary", "list_user_tasks"
+    ]
+    assert all(r["success"] for r in results)
+    assert results[3]["details"]["today"]["work_mode"] == "wfh"
+
+
+@pytest.mark.asyncio
+async def test_ai_execute_plans_locally_when_llm_unavailable(client, employee_token):
+    """Test a timed-out or short-circuited LLM call falls back to the local intent matcher"""
+    from server import LlmUnavailableError
+    headers = auth_headers(employee_token["token"])
+    
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(side_effect=LlmUnavailableError("circuit_open"))
+        mock_llm_class.return_value = mock_instance
+        
+        ai_request = {"message": "show my tasks for the sprint", "session_id": "llm-fallback"}
+        response = await client.post("/api/ai/execute", json=ai_request, headers=headers)
+    
+    assert response.status_code == 200
+    assert [r["action"] for r in response.json()["actionsExecuted"]] == ["list_user_tasks"]
+    
+    from server import intent_fast_path
+    # Writes are never planned locally during an outage, however confident the match
+    assert intent_fast_path.fallback("aaj WFH mark karo", "employee") is None
+    assert intent_fast_path.fallback("kal ka leave laga do", "employee") is None
+
+
+@pytest.mark.asyncio
+async def test_provider_pool_only_counts_provider_faults():
+    """Test non-transient errors fail once and local queueing never trips the breaker"""
+    import asyncio
+    from server import LlmUnavailableError, ProviderPool
+    pool = ProviderPool("openai", "test-model", object(), max_concurrency=1)
+    attempts = 0
+    
+    async def blocked(client):
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("Response blocked by safety filters")
+    
+    with pytest.raises(ValueError):
+        await pool.call(blocked)
+    assert attempts == 1
+    
+    async def slow(client):
+        await asyncio.sleep(0.2)
+        return "ok"
+    
+    with patch('server.LLM_DEADLINE_SECONDS', 0.1):
+        await pool._semaphore.acquire()
+        with pytest.raises(LlmUnavailableError) as exc_info:
+            await pool.call(slow)
+        pool._semaphore.release()
+    assert exc_info.value.reason == "saturated"
+    assert pool.breaker.stats()["consecutive_failures"] == 0
+    assert pool.stats()["non_retryable"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ai_chat_carries_session_memory_into_prompt(client, employee_token, test_db):
+    """Test earlier turns of a session are fed back, and other sessions stay separate"""
+    headers = auth_headers(employee_token["token"])
+    
+    with patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(return_value="Noted, the Falcon report is due Friday.")
+        mock_llm_class.return_value = mock_instance
+        
+        await client.post("/api/ai/chat", json={"message": "Remind me the Falcon report is due Friday", "session_id": "memory-a"}, headers=headers)
+        await client.post("/api/ai/chat", json={"message": "When is it due?", "session_id": "memory-a"}, headers=headers)
+        await client.post("/api/ai/chat", json={"message": "When is it due?", "session_id": "memory-b"}, headers=headers)
+        prompts = [call.kwargs["system_message"] for call in mock_llm_class.call_args_list]
+    
+    assert "Falcon report" not in prompts[0]
+    assert "User: Remind me the Falcon report is due Friday" in prompts[1]
+    assert "Assistant: Noted, the Falcon report is due Friday." in prompts[1]
+    assert "Falcon report" not in prompts[2]
+    
+    session = await test_db.ai_sessions.find_one({"session_id": "memory-a"})
+    assert len(session["turns"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_ai_transcripts_are_written_behind(client, employee_token, test_db):
+    """Test chat transcripts are queued off the response path and flushed for history reads"""
+    from server import AIMessageWriter
+    headers = auth_headers(employee_token["token"])
+    writer = AIMessageWriter(flush_seconds=60)
+    
+    with patch('server.ai_message_writer', writer), patch('server.LlmChat') as mock_llm_class:
+        mock_instance = AsyncMock()
+        mock_instance.send_message = AsyncMock(return_value="Queued response")
+        mock_llm_class.return_value = mock_instance
+        writer.start()
+        try:
+            await client.post("/api/ai/chat", json={"message": "Log me later", "session_id": "write-behind"}, headers=headers)
+            assert await test_db.ai_messages.count_documents({"session_id": "write-behind"}) == 0
+            
+            response = await client.get("/api/ai/history?session_id=write-behind", headers=headers)
+            assert [m["response"] for m in response.json()] == ["Queued response"]
+        finally:
+            await writer.stop()
+    
+    assert writer.stats()["queued"] == 1
+    assert writer.stats()["sync_writes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_executor_batches_lookups_and_writes_per_plan(client, team_lead_token, employee_token, test_db):
+    """Test a multi-approval plan loads each user once and lands its writes in one bulk_write"""
+    from backend.services.ai_actions import AIActionExecutor
+    emp_headers = auth_headers(employee_token["token"])
+    leave_ids = []
+    for day in ["2030-06-01", "2030-06-08", "2030-06-15"]:
+        leave_data = {"leave_type": "casual", "start_date": day, "end_date": day, "reason": "Trip"}
+        leave_ids.append((await client.post("/api/leave", json=leave_data, headers=emp_headers)).json()["id"])
+    
+    executor = AIActionExecutor(test_db, team_lead_token["user_id"], "team_lead", "lead@test.com")
+    plan = [{"name": "list_pending_leaves", "params": {}}]
+    plan += [{"name": "approve_leave", "params": {"leave_id": leave_id}} for leave_id in leave_ids]
+    results = await executor.execute_plan(plan)
+    
+    assert results[0]["details"]["count"] == 3
+    assert [r["details"]["user"] for r in results[1:]] == ["Test Employee"] * 3
+    stats = executor.stats()
+    assert stats["users"]["batches"] == 1
+    assert stats["leaves"]["batches"] == 0
+    assert stats["bulk_writes"] == 1
+    assert stats["writes_flushed"] == 3
+    statuses = await test_db.leaves.distinct("status", {"id": {"$in": leave_ids}})
+    assert statuses == ["approved"]
+
+
+
+@pytest.mark.asyncio
+async def test_executor_counts_only_writes_that_land(employee_token, test_db, monkeypatch):
+    """Test a plan whose bulk_write fails leaves the dashboard counters untouched"""
+    from motor.motor_asyncio import AsyncIOMotorCollection
+    from server import stats_counters
+    from backend.services.ai_actions import AIActionExecutor
+    counter_key = f"user:{employee_token['user_id']}"
+    before = await test_db.stats_counters.find_one({"_id": counter_key}) or {}
+    
+    original_bulk_write = AsyncIOMotorCollection.bulk_write
+    async def failing_bulk_write(self, requests, **kwargs):
+        if self.name == "leaves":
+            raise ConnectionError("primary stepped down")
+        return await original_bulk_write(self, requests, **kwargs)
+    monkeypatch.setattr(AsyncIOMotorCollection, "bulk_write", failing_bulk_write)
+    
+    executor = AIActionExecutor(test_db, employee_token["user_id"], "employee", "employee@test.com",
+                                stats_counters=stats_counters)
+    plan = [{"name": "apply_leave", "params": {"start_date": "2030-07-01", "end_date": "2030-07-02"}}]
+    results = await executor.execute_plan(plan)
+    
+    assert results[0]["success"] is False
+    after = await test_db.stats_counters.find_one({"_id": counter_key}) or {}
+    assert after.get("leaves", 0) == before.get("leaves", 0)
+    assert await test_db.leaves.count_documents({"user_id": employee_token["user_id"]}) == 0
+
+async def _legacy_report_details(db, executor, action: str, params: dict) -> dict:
+    """Reference: the document-pulling implementation the report pipelines replaced"""
+    from datetime import datetime, timedelta, timezone
+    from backend.services.ai_actions import deadline_sort_key
+    if action == "generate_team_summary":
+        tasks = await db.tasks.find({"created_by": executor.user_id}).to_list(1000)
+        completed = len([t for t in tasks if t["status"] == "completed"])
+        return {
+            "total_tasks": len(tasks),
+            "completed": completed,
+            "in_progress": len([t for t in tasks if t["status"] == "in_progress"]),
+            "pending": len([t for t in tasks if t["status"] == "todo"]),
+            "blocked": len([t for t in tasks if t["status"] == "blocked"]),
+            "completion_rate": f"{(completed/len(tasks)*100):.1f}%" if tasks else "0%"
+        }
+    if action == "generate_employee_report":
+        employee = await db.users.find_one({"email": params["employee_email"]})
+        tasks = await db.tasks.find({"assigned_to": employee["id"]}).to_list(1000)
+        completed = len([t for t in tasks if t["status"] == "completed"])
+        end_date = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        start_date = (datetime.now(timezone.utc) - timedelta(days=30)).strftime('%Y-%m-%d')
+        attendance = await db.attendance.find({"user_id": employee["id"], "date": {"$gte": start_date, "$lte": end_date}}).to_list(100)
+        present_days = len([a for a in attendance if a["status"] in ["present", "wfh"]])
+        leaves = await db.leaves.find({"user_id": employee["id"]}).to_list(100)
+        return {
+            "employee": employee.get("name"),
+            "email": params["employee_email"],
+            "role": employee.get("role"),
+            "tasks": {"total": len(tasks), "completed": completed,
+                      "completion_rate": f"{(completed/len(tasks)*100):.1f}%" if tasks else "0%"},
+            "attendance": {"present_days": present_days, "period": "last_30_days",
+                           "attendance_rate": f"{(present_days/30*100):.1f}%"},
+            "leaves": {"total_requests": len(leaves)}
+        }
+    if action == "generate_intern_evaluation":
+        intern = await db.users.find_one({"email": params["intern_email"]})
+        tasks = await db.tasks.find({"assigned_to": intern["id"]}).to_list(1000)
+        completed = len([t for t in tasks if t["status"] == "completed"])
+        avg_progress = sum([t.get("progress", 0) for t in tasks]) / len(tasks) if tasks else 0
+        attendance = await db.attendance.find({"user_id": intern["id"]}).to_list(1000)
+        present_days = len([a for a in attendance if a["status"] in ["present", "wfh"]])
+        score = (completed / len(tasks) * 50 + avg_progress * 0.3 + present_days / len(attendance) * 20) if tasks and attendance else 0
+        return {
+            "intern": intern.get("name"),
+            "email": params["intern_email"],
+            "tasks": {"total": len(tasks), "completed": completed, "avg_progress": f"{avg_progress:.1f}%"},
+            "attendance": {"total_days": len(attendance), "present_days": present_days,
+                           "rate": f"{(present_days/len(attendance)*100):.1f}%" if attendance else "0%"},
+            "performance_score": f"{score:.1f}/100",
+            "recommendation": "Good performance" if score > 70 else "Needs improvement"
+        }
+    # summarize_tasks
+    tasks = await db.tasks.find({"assigned_to": executor.user_id}).sort("created_at", -1).to_list(100)
+    status_counts = {"todo": 0, "in_progress": 0, "completed": 0, "blocked": 0}
+    for task in tasks:
+        if task.get("status", "todo") in status_counts:
+            status_counts[task.get("status", "todo")] += 1
+    priority_order = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
+    urgent = sorted([t for t in tasks if t.get("status") in ["todo", "in_progress"]], key=lambda t: (
+        deadline_sort_key(t.get("deadline")), priority_order.get(t.get("priority", "medium"), 2)))[:5]
+    names = {u["id"]: u["name"] async for u in db.users.find({"id": {"$in": [t["created_by"] for t in urgent]}})}
+    return {
+        "total": len(tasks),
+        "by_status": status_counts,
+        "urgent_tasks": [{
+            "id": t["id"], "title": t.get("title"), "status": t.get("status"), "priority": t.get("priority", "medium"),
+            "deadline": t.get("deadline", "No deadline"), "progress": t.get("progress", 0),
+            "created_by_name": names.get(t["created_by"], "Unknown")
+        } for t in urgent]
+    }
+
+
+@pytest.mark.asyncio
+async def test_report_pipelines_match_document_scan(client, hr_token, team_lead_token, employee_token, intern_token, test_db):
+    """Test the aggregation-backed reports return exactly what scanning the documents did"""
+    from datetime import datetime, timedelta, timezone
+    from backend.services.ai_actions import AIActionExecutor
+    lead_id, employee_id = team_lead_token["user_id"], employee_token["user_id"]
+    intern_id = (await test_db.users.find_one({"email": "intern@test.com"}))["id"]
+    hr_id = (await test_db.users.find_one({"email": "hr@test.com"}))["id"]
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    # Mixed deadline shapes (date, ISO string, date-only, unparseable, missing) and priorities exercise the urgent ordering
+    deadlines = [now + timedelta(days=3), "2030-01-05T10:00:00", "2030-01-05", "soon", None, now - timedelta(days=1)]
+    statuses = ["todo", "in_progress", "completed", "blocked", "todo", "in_progress", "completed"]
+    priorities = ["low", "urgent", "medium", "high", None]
+    tasks = []
+    for i in range(24):
+        task = {
+            "id": f"report-task-{i}",
+            "title": f"Report task {i}",
+            "assigned_to": intern_id if i % 3 == 0 else employee_id,
+            "created_by": lead_id,
+            "status": statuses[i % len(statuses)],
+            "progress": (i * 13) % 101,
+            "created_at": now - timedelta(hours=i),
+        }
+        if deadlines[i % len(deadlines)] is not None:
+            task["deadline"] = deadlines[i % len(deadlines)]
+        if priorities[i % len(priorities)] is not None:
+            task["priority"] = priorities[i % len(priorities)]
+        if i % 11 == 0:
+            del task["progress"]
+        tasks.append(task)
+    await test_db.tasks.insert_many(tasks)
+    await test_db.attendance.insert_many([{
+        "id": f"report-att-{user_id}-{day}",
+        "user_id": user_id,
+        "date": (now - timedelta(days=day)).strftime('%Y-%m-%d'),
+        "status": ["present", "wfh", "absent", "half_day"][day % 4],
+    } for user_id in (employee_id, intern_id) for day in range(0, 45, 2)])
+    await test_db.leaves.insert_many([{"id": f"report-leave-{i}", "user_id": employee_id, "status": "pending"} for i in range(3)])
+    
+    cases = [
+        (AIActionExecutor(test_db, lead_id, "team_lead", "lead@test.com"), "generate_team_summary", {}),
+        (AIActionExecutor(test_db, hr_id, "hr", "hr@test.com"), "generate_employee_report", {"employee_email": "employee@test.com"}),
+        (AIActionExecutor(test_db, hr_id, "hr", "hr@test.com"), "generate_intern_evaluation", {"intern_email": "intern@test.com"}),
+        (AIActionExecutor(test_db, employee_id, "employee", "employee@test.com"), "summarize_tasks", {}),
+    ]
+    for executor, action, params in cases:
+        result = await executor.execute_action(action, params)
+        assert result["success"], result
+        assert result["details"] == await _legacy_report_details(test_db, executor, action, params), action
@@ -2,6 +2,7 @@
 Tests for attendance endpoints
 """
 
+import json
 import pytest
 from datetime import datetime, timezone
 from .conftest import auth_headers
@@ -213,3 +214,25 @@ async def test_multiple_employees_can_check_in_same_day(client):
                                      json={"work_mode": "wfo"}, 
                                      headers=headers)
         assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_hr_can_stream_attendance_as_ndjson(client, hr_token, employee_token):
+    """Test attendance export streams one JSON record per line"""
+    emp_headers = auth_headers(employee_token["token"])
+    await client.post("/api/attendance/check-in", json={"work_mode": "wfh"}, headers=emp_headers)
+    
+    hr_headers = auth_headers(hr_token)
+    hr_headers["Accept"] = "application/x-ndjson"
+    response = await client.get(
+        f"/api/attendance?user_id={employee_token['user_id']}",
+        headers=hr_headers
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [line for line in response.text.splitlines() if line]
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["user_id"] == employee_token["user_id"]
+    assert record["work_mode"] == "wfh"
@@ -159,3 +159,89 @@ async def test_register_all_roles(client):
         response = await client.post("/api/auth/register", json=register_data)
         assert response.status_code == 200
         assert response.json()["role"] == role
+
+
+@pytest.mark.asyncio
+async def test_login_rejected_with_429_when_hash_pool_saturated(client):
+    """Test logins are shed with 429 instead of queueing once the bcrypt pool is full"""
+    from unittest.mock import patch
+    from server import password_hasher
+    register_data = {
+        "email": "burst@test.com",
+        "name": "Burst User",
+        "password": "password123",
+        "role": "employee"
+    }
+    await client.post("/api/auth/register", json=register_data)
+    login_data = {"email": "burst@test.com", "password": "password123"}
+    
+    completed = password_hasher.completed
+    with patch.object(password_hasher, "pending", password_hasher.max_pending):
+        response = await client.post("/api/auth/login", json=login_data)
+    
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert password_hasher.completed == completed
+    
+    response = await client.post("/api/auth/login", json=login_data)
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_holds_cancelled_jobs_until_they_finish():
+    """Test a cancelled verify keeps its pool slot until the bcrypt worker is done with it"""
+    import asyncio
+    import threading
+    from unittest.mock import patch
+    from fastapi import HTTPException
+    from server import PasswordHasher, pwd_context
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+    
+    with patch.object(pwd_context, "verify", lambda plain, hashed: release.wait(5)):
+        running = asyncio.create_task(hasher.verify("password123", "hash"))
+        queued = asyncio.create_task(hasher.verify("password123", "hash"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        
+        assert hasher.pending == 2
+        with pytest.raises(HTTPException) as exc_info:
+            await hasher.verify("password123", "hash")
+        assert exc_info.value.status_code == 429
+        
+        release.set()
+        assert await running is True
+        for _ in range(100):
+            if hasher.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+    
+    assert hasher.pending == 0
+    assert hasher.completed == 2
+    hasher.close()
+
+
+@pytest.mark.asyncio
+async def test_cached_token_rejected_after_deactivation(client, employee_token, test_db):
+    """Test repeat requests hit the token cache and deactivation still takes effect"""
+    from server import token_cache
+    headers = auth_headers(employee_token["token"])
+    
+    hits = token_cache.hits
+    for _ in range(3):
+        response = await client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200
+    assert token_cache.hits >= hits + 2
+    
+    await test_db.users.update_one({"id": employee_token["user_id"]}, {"$set": {"is_active": False}})
+    await token_cache.refresh_revocations(test_db)
+    response = await client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 403
+    assert "inactive" in response.json()["detail"].lower()
+    
+    await test_db.users.update_one({"id": employee_token["user_id"]}, {"$set": {"is_active": True}})
+    await token_cache.refresh_revocations(test_db)
+    response = await client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
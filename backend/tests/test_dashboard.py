@@ -0,0 +1,101 @@
+"""
+Tests for dashboard stats endpoint
+"""
+
+import pytest
+from .conftest import auth_headers
+
+
+@pytest.mark.asyncio
+async def test_team_lead_dashboard_stats(client, team_lead_token, employee_token):
+    """Test team lead stats count created tasks by status"""
+    headers = auth_headers(team_lead_token["token"])
+    created = []
+    for title in ["Stats A", "Stats B", "Stats C"]:
+        task_data = {"title": title, "assigned_to": employee_token["user_id"]}
+        created.append((await client.post("/api/tasks", json=task_data, headers=headers)).json())
+    await client.patch(f"/api/tasks/{created[0]['id']}", json={"status": "completed"}, headers=headers)
+    
+    response = await client.get("/api/dashboard/stats", headers=headers)
+    
+    assert response.status_code == 200
+    assert response.json() == {
+        "my_tasks": 0,
+        "team_tasks": 3,
+        "team_tasks_completed": 1,
+        "team_tasks_pending": 2
+    }
+
+
+@pytest.mark.asyncio
+async def test_employee_dashboard_stats(client, team_lead_token, employee_token):
+    """Test employee stats split pending and completed tasks"""
+    lead_headers = auth_headers(team_lead_token["token"])
+    for title in ["Mine A", "Mine B"]:
+        task_data = {"title": title, "assigned_to": employee_token["user_id"]}
+        await client.post("/api/tasks", json=task_data, headers=lead_headers)
+    
+    response = await client.get("/api/dashboard/stats", headers=auth_headers(employee_token["token"]))
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["my_tasks"] == 2
+    assert data["pending_tasks"] == 2
+    assert data["completed_tasks"] == 0
+    assert data["my_leaves"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hr_dashboard_stats(client, hr_token, employee_token):
+    """Test HR stats include pending leaves and today's attendance"""
+    emp_headers = auth_headers(employee_token["token"])
+    await client.post("/api/attendance/check-in", json={"work_mode": "wfh"}, headers=emp_headers)
+    leave_data = {"leave_type": "sick", "start_date": "2030-01-01", "end_date": "2030-01-02", "reason": "Flu"}
+    await client.post("/api/leave", json=leave_data, headers=emp_headers)
+    
+    response = await client.get("/api/dashboard/stats", headers=auth_headers(hr_token))
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_employees"] >= 2
+    assert data["pending_leaves"] == 1
+    assert data["present_today"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dashboard_counters_track_writes_after_reconcile(client, admin_token, hr_token, team_lead_token, employee_token):
+    """Test materialized counters stay in step with task, leave and attendance writes"""
+    lead_headers = auth_headers(team_lead_token["token"])
+    emp_headers = auth_headers(employee_token["token"])
+    task_data = {"title": "Before reconcile", "assigned_to": employee_token["user_id"]}
+    await client.post("/api/tasks", json=task_data, headers=lead_headers)
+    
+    response = await client.post("/api/admin/stats/reconcile", headers=auth_headers(admin_token))
+    assert response.status_code == 200
+    
+    task_data = {"title": "After reconcile", "assigned_to": employee_token["user_id"]}
+    task = (await client.post("/api/tasks", json=task_data, headers=lead_headers)).json()
+    await client.patch(f"/api/tasks/{task['id']}", json={"status": "completed"}, headers=lead_headers)
+    await client.post("/api/attendance/check-in", json={"work_mode": "wfo"}, headers=emp_headers)
+    leave_data = {"leave_type": "casual", "start_date": "2030-02-01", "end_date": "2030-02-01", "reason": "Errand"}
+    leave = (await client.post("/api/leave", json=leave_data, headers=emp_headers)).json()
+    await client.patch(f"/api/leave/{leave['id']}", json={"status": "approved"}, headers=auth_headers(hr_token))
+    
+    response = await client.get("/api/dashboard/stats", headers=lead_headers)
+    assert response.json() == {
+        "my_tasks": 0,
+        "team_tasks": 2,
+        "team_tasks_completed": 1,
+        "team_tasks_pending": 1
+    }
+    
+    data = (await client.get("/api/dashboard/stats", headers=emp_headers)).json()
+    assert data == {"my_tasks": 2, "pending_tasks": 1, "completed_tasks": 1, "my_leaves": 1}
+    
+    data = (await client.get("/api/dashboard/stats", headers=auth_headers(hr_token))).json()
+    assert data["total_tasks"] == 2
+    assert data["pending_leaves"] == 0
+    assert data["present_today"] == 1
+    
+    metrics = (await client.get("/api/admin/metrics", headers=auth_headers(admin_token))).json()
+    assert metrics["stats_counters"]["increments"] >= 1
@@ -0,0 +1,85 @@
+"""
+Tests for the local intent fast path used by /api/ai/execute
+"""
+
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from backend.services.intent_matcher import match_intent
+from .conftest import auth_headers
+
+# A Friday, so weekday arithmetic is easy to check
+TODAY = datetime(2026, 10, 16, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("message, action, params", [
+    ("show my tasks", "list_user_tasks", {}),
+    ("mera task dikhao", "list_user_tasks", {}),
+    ("pending tasks kya hain", "list_user_tasks", {"status": "todo"}),
+    ("summarize my tasks", "summarize_tasks", {}),
+    ("check my attendance", "get_attendance_summary", {}),
+    ("aaj WFH mark karo", "mark_attendance", {"work_mode": "wfh"}),
+    ("kal ka leave laga do", "apply_leave",
+     {"start_date": "2026-10-17", "end_date": "2026-10-17", "leave_type": "casual", "reason": "Personal"}),
+    ("next friday sick leave chahiye", "apply_leave",
+     {"start_date": "2026-10-23", "end_date": "2026-10-23", "leave_type": "sick", "reason": "Sick"}),
+])
+def test_common_phrasings_match(message, action, params):
+    """Test enumerated English and Hinglish commands map to a single action"""
+    match = match_intent(message, today=TODAY)
+    
+    assert match is not None
+    assert match.plan["actions"] == [{"name": action, "params": params}]
+
+
+@pytest.mark.parametrize("message", [
+    "Hello",
+    "Give me a full summary",
+    "intern ka attendance dikhado",
+    "Show pending tasks for lead@operai.demo",
+    "summarize my tasks and attendance",
+    "kal leave mat lagao",
+    "leave policy kya hai",
+])
+def test_ambiguous_input_falls_back_to_llm(message):
+    """Test low-confidence, compound or targeted requests are left to the LLM"""
+    assert match_intent(message, today=TODAY) is None
+
+
+@pytest.mark.parametrize("message", [
+    "am i on leave today",
+    "tomorrow is holiday",
+    "should I take leave tomorrow",
+    "my colleague is on leave tomorrow",
+    "do I have leave tomorrow",
+    "is office open tomorrow",
+    "why is my wfh rejected",
+    "kal wfh",
+    "work from home tomorrow",
+    "show team tasks",
+])
+@pytest.mark.parametrize("min_confidence", [0.9, 0.6, 0.0])
+def test_questions_and_statements_never_match_writes(message, min_confidence):
+    """Test questions, third-party statements, future attendance and team task lookups go to the LLM"""
+    assert match_intent(message, today=TODAY, min_confidence=min_confidence) is None
+
+
+def test_match_respects_role_permissions():
+    """Test a matched action outside the caller's allowed set is not returned"""
+    assert match_intent("show my team members", allowed_actions={"list_user_tasks"}, today=TODAY) is None
+
+
+@pytest.mark.asyncio
+async def test_ai_execute_fast_path_skips_llm(client, employee_token, admin_token):
+    """Test a recognised command executes without calling the LLM"""
+    with patch('server.LlmChat') as mock_llm_class:
+        ai_request = {"message": "check my attendance", "session_id": "fast-path"}
+        response = await client.post("/api/ai/execute", json=ai_request, headers=auth_headers(employee_token["token"]))
+        
+        assert not mock_llm_class.called
+    
+    data = response.json()
+    assert data["actionsExecuted"][0]["action"] == "get_attendance_summary"
+    
+    metrics = (await client.get("/api/admin/metrics", headers=auth_headers(admin_token))).json()
+    assert metrics["intent_fast_path"]["hits"] >= 1
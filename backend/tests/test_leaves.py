@@ -258,3 +258,48 @@ async def test_leave_status_update_modifies_updated_at(client, hr_token, employe
     updated_leave = response.json()
     assert updated_leave["updated_at"] != created_at  # Should be different
     assert updated_leave["status"] == "approved"
+
+
+@pytest.mark.asyncio
+async def test_leaves_keyset_pagination(client, employee_token):
+    """Test cursor pagination walks all leaves without overlap"""
+    headers = auth_headers(employee_token["token"])
+    
+    today = datetime.now(timezone.utc)
+    for i in range(5):
+        leave_data = {
+            "leave_type": "casual",
+            "start_date": (today + timedelta(days=i + 1)).strftime('%Y-%m-%d'),
+            "end_date": (today + timedelta(days=i + 1)).strftime('%Y-%m-%d'),
+            "reason": f"Leave {i}"
+        }
+        await client.post("/api/leave", json=leave_data, headers=headers)
+    
+    seen = []
+    cursor = None
+    for _ in range(3):
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/leave", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert page["limit"] == 2
+        seen.extend(leave["id"] for leave in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+    assert cursor is None
+
+
+@pytest.mark.asyncio
+async def test_leaves_invalid_cursor_rejected(client, employee_token):
+    """Test a malformed cursor returns 400"""
+    headers = auth_headers(employee_token["token"])
+    
+    response = await client.get("/api/leave", params={"cursor": "not-a-cursor"}, headers=headers)
+    
+    assert response.status_code == 400
@@ -0,0 +1,79 @@
+"""
+Tests for notification feed and per-user read state
+"""
+
+import pytest
+from .conftest import auth_headers
+
+
+async def _announce(client, hr_token, title, target_roles=None):
+    announcement = {"title": title, "content": f"{title} body", "target_roles": target_roles or []}
+    response = await client.post("/api/announcements", json=announcement, headers=auth_headers(hr_token))
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_mark_all_read_is_per_user(client, hr_token, employee_token, team_lead_token):
+    """Test marking broadcasts read for one user leaves them unread for others"""
+    await _announce(client, hr_token, "Office closed Friday")
+    await _announce(client, hr_token, "New laptop policy")
+    emp_headers = auth_headers(employee_token["token"])
+    lead_headers = auth_headers(team_lead_token["token"])
+    
+    response = await client.get("/api/notifications/unread-count", headers=emp_headers)
+    assert response.json() == {"unread": 2}
+    
+    response = await client.patch("/api/notifications/mark-all-read", headers=emp_headers)
+    assert response.status_code == 200
+    
+    response = await client.get("/api/notifications/unread-count", headers=emp_headers)
+    assert response.json() == {"unread": 0}
+    notifications = (await client.get("/api/notifications", headers=emp_headers)).json()
+    assert all(n["is_read"] for n in notifications)
+    
+    response = await client.get("/api/notifications/unread-count", headers=lead_headers)
+    assert response.json() == {"unread": 2}
+    notifications = (await client.get("/api/notifications", headers=lead_headers)).json()
+    assert not any(n["is_read"] for n in notifications)
+
+
+@pytest.mark.asyncio
+async def test_mark_single_notification_read(client, hr_token, employee_token):
+    """Test individually read notifications after the watermark are tracked"""
+    emp_headers = auth_headers(employee_token["token"])
+    await _announce(client, hr_token, "Old news")
+    await client.patch("/api/notifications/mark-all-read", headers=emp_headers)
+    await _announce(client, hr_token, "Fresh news A")
+    await _announce(client, hr_token, "Fresh news B")
+    
+    notifications = (await client.get("/api/notifications", headers=emp_headers)).json()
+    fresh = next(n for n in notifications if n["title"] == "Fresh news A")
+    
+    response = await client.patch(f"/api/notifications/{fresh['id']}/read", headers=emp_headers)
+    assert response.status_code == 200
+    
+    response = await client.get("/api/notifications/unread-count", headers=emp_headers)
+    assert response.json() == {"unread": 1}
+    notifications = (await client.get("/api/notifications", headers=emp_headers)).json()
+    unread_titles = [n["title"] for n in notifications if not n["is_read"]]
+    assert unread_titles == ["Fresh news B"]
+
+
+@pytest.mark.asyncio
+async def test_feed_matches_audience(client, hr_token, team_lead_token, employee_token):
+    """Test role-targeted, user-targeted and company-wide notifications reach the right feeds"""
+    await _announce(client, hr_token, "Everyone")
+    await _announce(client, hr_token, "Leads only", target_roles=["team_lead"])
+    lead_headers = auth_headers(team_lead_token["token"])
+    task_data = {"title": "Audience task", "assigned_to": employee_token["user_id"]}
+    task = (await client.post("/api/tasks", json=task_data, headers=lead_headers)).json()
+    await client.patch(f"/api/tasks/{task['id']}", json={"deadline": "2030-03-01T00:00:00Z"}, headers=lead_headers)
+    
+    emp_feed = (await client.get("/api/notifications", headers=auth_headers(employee_token["token"]))).json()
+    lead_feed = (await client.get("/api/notifications", headers=lead_headers)).json()
+    
+    assert sorted(n["title"] for n in emp_feed) == ["Everyone", "Task deadline updated"]
+    assert sorted(n["title"] for n in lead_feed) == ["Everyone", "Leads only"]
+    
+    announcements = (await client.get("/api/announcements", headers=auth_headers(employee_token["token"]))).json()
+    assert [a["title"] for a in announcements] == ["Everyone"]
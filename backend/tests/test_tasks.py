@@ -254,3 +254,74 @@ async def test_hr_can_view_all_tasks(client, hr_token, team_lead_token, employee
     assert response.status_code == 200
     tasks = response.json()
     assert len(tasks) >= 2  # Should see at least the 2 tasks created
+
+
+@pytest.mark.asyncio
+async def test_task_deadline_round_trips_as_datetime(client, team_lead_token, employee_token):
+    """Test that deadlines stored as native dates come back with the same instant"""
+    headers = auth_headers(team_lead_token["token"])
+    deadline = datetime(2030, 1, 15, 17, 30, tzinfo=timezone.utc)
+    
+    task_data = {
+        "title": "Deadline Task",
+        "assigned_to": employee_token["user_id"],
+        "deadline": deadline.isoformat()
+    }
+    create_response = await client.post("/api/tasks", json=task_data, headers=headers)
+    task_id = create_response.json()["id"]
+    
+    response = await client.get(f"/api/tasks/{task_id}", headers=headers)
+    
+    assert response.status_code == 200
+    returned = datetime.fromisoformat(response.json()["deadline"].replace("Z", "+00:00"))
+    assert returned == deadline
+
+
+@pytest.mark.asyncio
+async def test_team_lead_sees_new_subordinate_tasks_immediately(client, team_lead_token, hr_token):
+    """Test registering a user invalidates the cached subordinate list"""
+    lead_headers = auth_headers(team_lead_token["token"])
+    
+    # Warm the subordinate cache
+    response = await client.get("/api/tasks", headers=lead_headers)
+    assert response.status_code == 200
+    
+    register_data = {
+        "email": "newhire@test.com",
+        "name": "New Hire",
+        "password": "newhire123",
+        "role": "employee"
+    }
+    new_user = (await client.post("/api/auth/register", json=register_data)).json()
+    
+    task_data = {
+        "title": "Onboarding",
+        "assigned_to": new_user["id"],
+        "priority": "low"
+    }
+    await client.post("/api/tasks", json=task_data, headers=auth_headers(hr_token))
+    
+    response = await client.get("/api/tasks", headers=lead_headers)
+    
+    assert response.status_code == 200
+    assert "Onboarding" in [task["title"] for task in response.json()]
+
+
+@pytest.mark.asyncio
+async def test_task_list_enriched_with_user_names(client, team_lead_token, employee_token):
+    """Test tasks carry assignee/creator names resolved from the user directory"""
+    headers = auth_headers(team_lead_token["token"])
+    task_data = {
+        "title": "Enriched Task",
+        "assigned_to": employee_token["user_id"],
+        "priority": "medium"
+    }
+    await client.post("/api/tasks", json=task_data, headers=headers)
+    
+    response = await client.get("/api/tasks", headers=headers)
+    
+    assert response.status_code == 200
+    task = next(t for t in response.json() if t["title"] == "Enriched Task")
+    assert task["assigned_to_name"] == "Test Employee"
+    assert task["assigned_to_email"] == "employee@test.com"
+    assert task["created_by_name"] == "Test Lead"